@@ -0,0 +1,226 @@
+# acquisition_worker.py
+
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+N_CHANNELS = 160
+
+
+def place_scan(index_map, raw_data):
+    """
+    将一次 READ? 返回的读数放入 160 通道的数组中.
+    :param index_map: 扫描顺序中每个读数对应的全局通道索引 (ChannelMap.index_map)
+    :param raw_data: 读数列表, None 表示无效读数
+    :return: 长度 160 的数组，未扫描的通道为 NaN；读数个数与扫描列表不符时返回 None
+    """
+    if len(raw_data) != len(index_map):
+        print(f"警告: 读数个数 ({len(raw_data)}) 与扫描通道数 ({len(index_map)}) 不符，丢弃本次扫描")
+        return None
+    temps_160ch = np.full(N_CHANNELS, np.nan)
+    temps_160ch[index_map] = np.array([t if t is not None else np.nan for t in raw_data], dtype=float)
+    return temps_160ch
+
+
+def place_timestamped_scan(readings, tst, chan, channel_offset):
+    """
+    按读数附带的通道号放置一次带时间戳的扫描.
+    :param readings, tst, chan: KeithleyController.get_timestamped_data 的返回值
+    :return: (temps_160ch, offsets_160ch, duration)；offsets 为各通道相对本次扫描第一个读数的测量时刻 (秒)，
+             未扫描的通道为 NaN；duration 为第一个到最后一个读数的时间
+    """
+    slot, ch = np.divmod(chan, 100)
+    index = channel_offset + (slot - 1) * 40 + (ch - 1)
+    keep = (index >= 0) & (index < N_CHANNELS) & (ch >= 1) & (ch <= 40)
+    if not keep.all():
+        print(f"警告: {np.count_nonzero(~keep)} 个读数的通道号无法识别，已丢弃")
+    temps_160ch = np.full(N_CHANNELS, np.nan)
+    offsets_160ch = np.full(N_CHANNELS, np.nan)
+    if not keep.any():
+        return temps_160ch, offsets_160ch, 0.0
+    index, tst = index[keep], tst[keep]
+    temps_160ch[index] = readings[keep]
+    offsets_160ch[index] = tst - tst.min()
+    return temps_160ch, offsets_160ch, float(tst.max() - tst.min())
+
+
+def run_acquisition_loop(instrument, desired_period_M, stop_event, emit, channel_offset, is_ready=lambda: True):
+    """
+    实现自适应间隔定时的数据采集循环 (线程模式和进程模式共用).
+    :param desired_period_M: 用户期望的总周期 (秒)
+    :param emit: emit(read_time, temps_160ch, offsets_160ch) 输出一次扫描；仪器未启用时间戳时 offsets 为 None，
+                 启用时 read_time 为本次扫描第一个读数的时刻 (读取完成时间减去仪器记录的扫描时长)
+    :param is_ready: 仪器初始化完成前返回 False
+    """
+    index_map = None
+    while not stop_event.is_set():
+        if instrument and instrument.connected and is_ready():
+            try:
+                # 1. 记录循环开始的精确时间点
+                loop_start_time = time.time()
+
+                # 2. 执行数据读取 (耗时为 N)
+                if getattr(instrument, 'timestamps_enabled', False):
+                    # 带时间戳的读数按自带的通道号放置，行时间戳取本次扫描第一个读数的时刻
+                    readings, tst, chan = instrument.get_timestamped_data()
+                    read_time = time.time()
+                    if len(readings):
+                        temps_160ch, offsets_160ch, duration = place_timestamped_scan(readings, tst, chan,
+                                                                                      channel_offset)
+                        emit(read_time - duration, temps_160ch, offsets_160ch)
+                    raw_data = None
+                else:
+                    raw_data = instrument.get_data('READ?')
+                    # 3. 记录数据读取完成的时间点
+                    read_time = time.time()
+
+                if raw_data:
+                    # 扫描通道在初始化后才确定，第一次读到数据时计算放置索引
+                    if index_map is None:
+                        index_map = instrument.channel_map.index_map(channel_offset)
+                    temps_160ch = place_scan(index_map, raw_data)
+                    if temps_160ch is not None:
+                        emit(read_time, temps_160ch, None)
+
+                # 计算并执行动态等待
+                # 4. 计算本次扫描实际耗时 N
+                scan_duration_N = time.time() - loop_start_time
+
+                # 5. 计算需要等待的时间 T = M - N
+                delay_T = desired_period_M - scan_duration_N
+
+                # 6. 处理 N > M 的情况
+                if delay_T < 0:
+                    print(f"警告：扫描耗时({scan_duration_N:.2f}s)已超过目标周期({desired_period_M}s)。")
+                    delay_T = 0.2  # 设置为0.2秒
+
+                # 7. 执行等待 (可被停止信号打断)
+                stop_event.wait(delay_T)
+
+            except Exception as e:
+                print(f"数据读取错误: {e}")
+                stop_event.wait(desired_period_M)  # 发生错误时，按原周期等待
+        else:
+            stop_event.wait(0.05)
+
+
+class SharedScanBuffer:
+    """
+    共享内存中的扫描环形缓冲区，单写者 (采集进程) / 单读者 (界面进程).
+    布局: int64 头部 [写入序号, 容量, 通道数, 是否带时间偏移] + float64 行 [容量, 1 + 通道数 (+ 通道数)]
+    (时间戳 + 温度，启用仪器时间戳时再加每通道的测量时间偏移)。
+    写者先写完整行再递增序号 (对齐的 8 字节写入)，读者只读取序号之前的行，因此无需加锁。
+    """
+    HEADER_WORDS = 4
+
+    def __init__(self, name=None, n_channels=N_CHANNELS, capacity=8192, with_offsets=False):
+        if name is None:
+            size = (self.HEADER_WORDS + capacity * (1 + n_channels * (2 if with_offsets else 1))) * 8
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.header = np.ndarray((self.HEADER_WORDS,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self.header[:] = (0, capacity, n_channels, int(with_offsets))
+        self.capacity = int(self.header[1])
+        self.n_channels = int(self.header[2])
+        self.with_offsets = bool(self.header[3])
+        width = 1 + self.n_channels * (2 if self.with_offsets else 1)
+        self.rows = np.ndarray((self.capacity, width), dtype=np.float64, buffer=self.shm.buf,
+                               offset=self.HEADER_WORDS * 8)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def sequence(self):
+        return int(self.header[0])
+
+    def write(self, ts, temps, offsets=None):
+        """写入一次扫描 (仅采集进程调用)"""
+        seq = int(self.header[0])
+        row = self.rows[seq % self.capacity]
+        row[0] = ts
+        row[1:1 + self.n_channels] = temps
+        if self.with_offsets:
+            row[1 + self.n_channels:] = np.nan if offsets is None else offsets
+        self.header[0] = seq + 1  # 行写完后才发布
+
+    def split(self, block):
+        """read_since 返回的行拆分为 (时间戳, 温度, 时间偏移)，未启用时间偏移时后者为 None"""
+        n = self.n_channels
+        return block[:, 0], block[:, 1:1 + n], (block[:, 1 + n:] if self.with_offsets else None)
+
+    def read_since(self, last_seq):
+        """
+        读取 last_seq 之后的新扫描.
+        :return: (first_seq, end_seq, blocks)，blocks 为共享内存上的零拷贝视图 (最多两段，处理环绕)；
+                 视图在写者绕回覆盖之前有效，调用方应立即消费
+        """
+        end_seq = self.sequence
+        first_seq = max(last_seq, end_seq - self.capacity)
+        if first_seq > last_seq:
+            print(f"警告: 界面读取过慢，丢失 {first_seq - last_seq} 次扫描")
+        blocks = []
+        seq = first_seq
+        while seq < end_seq:
+            start = seq % self.capacity
+            stop = min(self.capacity, start + (end_seq - seq))
+            blocks.append(self.rows[start:stop])
+            seq += stop - start
+        return first_seq, end_seq, blocks
+
+    def overwritten_since(self, first_seq):
+        """读取期间写者是否已覆盖了 first_seq 开始的行"""
+        return self.sequence - self.capacity > first_seq
+
+    def close(self):
+        # 先释放 numpy 视图，否则 SharedMemory.close 会因缓冲区仍被引用而失败
+        self.header = None
+        self.rows = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def acquisition_process_main(buffer_name, conn_type, address, channel_offset, interval, thermocouple_type,
+                             stop_event, status_queue, scan_mask=None, speed=None, tc_types=None,
+                             timestamps=False):
+    """
+    采集进程入口：独占仪器连接，扫描数据直接写入共享内存，采样定时不受界面负载影响.
+    status_queue 用于向界面报告 ('ready', idn) / ('error', 信息) / ('stopped', None)。
+    scan_mask 为要扫描的全局通道 (布尔向量)，None 表示扫描全部已安装通道。
+    speed 为 ScanSpeed (按通道分组的 NPLC/自动调零/滤波)，None 时使用仪器默认的 NPLC 1。
+    tc_types 为每个全局通道的热电偶类型 (空字符串使用 thermocouple_type)。
+    timestamps 为 True 时读取仪器时间戳，共享缓冲区需以 with_offsets=True 创建。
+    """
+    from instrument_controller import KeithleyController
+
+    buffer = SharedScanBuffer(name=buffer_name)
+    instrument = KeithleyController(conn_type=conn_type, address=address)
+    try:
+        if not instrument.connect():
+            status_queue.put(('error', f"Acquisition process could not connect to {address}."))
+            return
+        if instrument.set_scan_channels(scan_mask, channel_offset) == 0:
+            status_queue.put(('error', "None of the selected scan channels is installed on this instrument."))
+            return
+        if not instrument.init_temperature_scan(thermocouple_type=thermocouple_type, speed=speed,
+                                                channel_offset=channel_offset, tc_types=tc_types,
+                                                timestamps=timestamps):
+            status_queue.put(('error', "Acquisition process failed to initialise the scan."))
+            return
+        status_queue.put(('ready', instrument.idn))
+        run_acquisition_loop(instrument, interval, stop_event, buffer.write, channel_offset)
+    except Exception as e:
+        status_queue.put(('error', f"Acquisition process error: {e}"))
+    finally:
+        instrument.close()
+        buffer.close()
+        status_queue.put(('stopped', None))
@@ -0,0 +1,272 @@
+# channel_config.py
+
+import csv
+import os
+import numpy as np
+
+# 仪器支持的热电偶类型 (SENS:TEMP:TC:TYPE)
+TC_TYPES = ("J", "K", "T", "E", "R", "S", "B", "N")
+
+
+class ChannelConfigModel:
+    """
+    通道配置模型：位置/阈值在编辑提交时解析一次，保存为数组形式，
+    供表格刷新、报警高亮与报告直接读取预先计算好的向量。
+    tc_types 为每个通道的热电偶类型，空字符串表示使用扫描设置中的默认类型。
+    """
+    __slots__ = ('n_channels', 'locations', 'threshold_strs', 'thresholds', 'threshold_valid',
+                 'alarm_limits', 'tc_types', 'version', '_observers')
+
+    FIELDS = ('location', 'threshold', 'tc_type')
+    # Treeview 列号 -> 配置字段
+    FIELD_BY_COLUMN = {1: 'location', 4: 'threshold', 5: 'tc_type'}
+
+    def __init__(self, n_channels=160):
+        self.n_channels = n_channels
+        self.locations = [''] * n_channels
+        self.threshold_strs = [''] * n_channels
+        self.thresholds = np.full(n_channels, np.nan)
+        self.threshold_valid = np.zeros(n_channels, dtype=bool)
+        # 报警比较用：无效阈值视为 +inf，temps > alarm_limits 即为超限
+        self.alarm_limits = np.full(n_channels, np.inf)
+        self.tc_types = [''] * n_channels
+        self.version = 0
+        self._observers = []
+
+    def __len__(self):
+        return self.n_channels
+
+    def __getitem__(self, index):
+        """兼容旧的 dict 访问方式: configs[i]['location'] / configs[i]['threshold']"""
+        return {'location': self.locations[index], 'threshold': self.threshold_strs[index],
+                'tc_type': self.tc_types[index]}
+
+    @staticmethod
+    def parse_threshold(text):
+        """
+        解析阈值字符串.
+        :return: (float 值, 是否有效)；空字符串或非法输入返回 (nan, False)
+        """
+        text = (text or '').strip()
+        if text == '':
+            return np.nan, False
+        try:
+            value = float(text)
+        except ValueError:
+            return np.nan, False
+        if np.isnan(value):
+            return np.nan, False
+        return value, True
+
+    @staticmethod
+    def parse_tc_type(text):
+        """
+        解析热电偶类型 (不区分大小写).
+        :return: (类型, 是否有效)；空字符串有效，表示使用默认类型
+        """
+        text = str(text or '').strip().upper()
+        return (text, True) if text == '' or text in TC_TYPES else ('', False)
+
+    def effective_tc_types(self, default='K'):
+        """每个通道实际使用的热电偶类型 (未单独设置的通道使用 default)"""
+        return [tc or default for tc in self.tc_types]
+
+    def subscribe(self, callback):
+        """注册观察者, callback(model, changed_indices) 在配置变化后调用"""
+        if callback not in self._observers:
+            self._observers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._observers:
+            self._observers.remove(callback)
+
+    def _notify(self, changed_indices):
+        self.version += 1
+        for callback in list(self._observers):
+            try:
+                callback(self, changed_indices)
+            except Exception as e:
+                print(f"通道配置观察者回调出错: {e}")
+
+    def _set_field(self, index, field, value):
+        if field == 'location':
+            self.locations[index] = value
+        elif field == 'threshold':
+            self.threshold_strs[index] = value
+            parsed, valid = self.parse_threshold(value)
+            self.thresholds[index] = parsed
+            self.threshold_valid[index] = valid
+            self.alarm_limits[index] = parsed if valid else np.inf
+        elif field == 'tc_type':
+            # 无效类型按默认类型处理，界面和导入在提交前已校验
+            self.tc_types[index] = self.parse_tc_type(value)[0]
+        else:
+            raise KeyError(field)
+
+    def set_field(self, index, field, value):
+        """修改单个通道的单个字段并通知观察者"""
+        if not 0 <= index < self.n_channels:
+            return
+        self._set_field(index, field, value)
+        self._notify([index])
+
+    def bulk_update(self, updates):
+        """
+        批量修改, 只通知一次.
+        :param updates: {通道索引: {'location': ..., 'threshold': ..., 'tc_type': ...}}
+        """
+        changed = []
+        for index, fields in updates.items():
+            if not 0 <= index < self.n_channels:
+                continue
+            for field, value in fields.items():
+                self._set_field(index, field, value)
+            changed.append(index)
+        if changed:
+            self._notify(sorted(changed))
+        return changed
+
+    def snapshot(self):
+        """导出所有非空通道的配置 {通道索引: {'location': ..., 'threshold': ..., 'tc_type': ...}}"""
+        return {i: {'location': self.locations[i], 'threshold': self.threshold_strs[i], 'tc_type': self.tc_types[i]}
+                for i in range(self.n_channels) if self.locations[i] or self.threshold_strs[i] or self.tc_types[i]}
+
+    def replace_all(self, configs):
+        """用新配置整体替换（未给出的通道清空），只通知一次"""
+        updates = {i: dict.fromkeys(self.FIELDS, '') for i in range(self.n_channels)}
+        for index, fields in configs.items():
+            if 0 <= index < self.n_channels:
+                updates[index].update(fields)
+        return self.bulk_update(updates)
+
+    def over_threshold(self, temps):
+        """返回超过阈值的布尔掩码 (NaN 温度不报警)"""
+        with np.errstate(invalid='ignore'):
+            return np.asarray(temps) > self.alarm_limits
+
+    def status_codes(self, max_temps):
+        """按 P/F/N/A 规则给出每个通道的判定结果数组"""
+        status = np.full(self.n_channels, "N/A", dtype=object)
+        with np.errstate(invalid='ignore'):
+            failed = np.asarray(max_temps) > self.thresholds
+        status[self.threshold_valid & failed] = "F"
+        status[self.threshold_valid & ~failed] = "P"
+        return status
+
+
+# --- 批量导入 (剪贴板粘贴 / CSV / XLSX) ---
+
+_HEADER_ALIASES = {
+    'channel': ('channel', 'channel no.', 'channel no', 'ch', 'chan', '通道'),
+    'location': ('location', 'test location', 'loc', '位置'),
+    'threshold': ('threshold', 'threshold (°c)', 'limit', 'limit(°c)', 'limit (°c)', '阈值'),
+    'tc_type': ('tc type', 'tc_type', 'type', 'thermocouple', 'thermocouple type', '热电偶类型', '类型'),
+}
+
+
+def _match_header(row):
+    """识别表头行，返回 {字段: 列号}；不是表头则返回 None"""
+    columns = {}
+    for col, cell in enumerate(row):
+        name = str(cell if cell is not None else '').strip().lower()
+        for field, aliases in _HEADER_ALIASES.items():
+            if name in aliases and field not in columns:
+                columns[field] = col
+    return columns if 'channel' in columns else None
+
+
+def parse_config_rows(rows, n_channels=160):
+    """
+    一次性校验导入的通道配置行.
+    无表头时按 (通道号, 位置, 阈值, 热电偶类型) 的列顺序解析；有表头时按列名匹配。
+    :param rows: 二维列表 (单元格可以是字符串、数字或 None)
+    :return: (updates, errors) updates 可直接传给 ChannelConfigModel.bulk_update
+    """
+    rows = [list(r) for r in rows if r and any(c not in (None, '') for c in r)]
+    columns = {'channel': 0, 'location': 1, 'threshold': 2, 'tc_type': 3}
+    start = 0
+    if rows:
+        header = _match_header(rows[0])
+        if header is not None:
+            columns = header
+            start = 1
+
+    updates = {}
+    errors = []
+    for line_no, row in enumerate(rows[start:], start=start + 1):
+        def cell(field):
+            col = columns.get(field)
+            if col is None or col >= len(row) or row[col] is None:
+                return None
+            value = row[col]
+            # xlsx 中的整数阈值会读成 float，去掉多余的 .0
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            return str(value).strip()
+
+        channel_str = cell('channel')
+        try:
+            channel = int(float(channel_str))
+        except (TypeError, ValueError):
+            errors.append(f"Row {line_no}: invalid channel '{channel_str}'")
+            continue
+        if not 1 <= channel <= n_channels:
+            errors.append(f"Row {line_no}: channel {channel} out of range 1-{n_channels}")
+            continue
+        index = channel - 1
+        if index in updates:
+            errors.append(f"Row {line_no}: duplicate channel {channel}")
+            continue
+
+        fields = {}
+        location = cell('location')
+        if location is not None:
+            fields['location'] = location
+        threshold = cell('threshold')
+        if threshold is not None:
+            if threshold != '' and not ChannelConfigModel.parse_threshold(threshold)[1]:
+                errors.append(f"Row {line_no}: invalid threshold '{threshold}' for channel {channel}")
+                continue
+            fields['threshold'] = threshold
+        tc_type = cell('tc_type')
+        if tc_type is not None:
+            if not ChannelConfigModel.parse_tc_type(tc_type)[1]:
+                errors.append(f"Row {line_no}: invalid thermocouple type '{tc_type}' for channel {channel}")
+                continue
+            fields['tc_type'] = tc_type.upper()
+        if fields:
+            updates[index] = fields
+    return updates, errors
+
+
+def read_config_text(text):
+    """解析剪贴板文本：Excel 复制出来的是制表符分隔，其它情况按逗号/分号分隔"""
+    rows = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if '\t' in line:
+            rows.append(line.split('\t'))
+        else:
+            rows.append([c for c in (part.strip() for part in line.replace(';', ',').split(','))])
+    return rows
+
+
+def read_config_file(path):
+    """读取 CSV 或 XLSX 夹具表，返回二维列表"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            return [list(row) for row in wb.active.iter_rows(values_only=True)]
+        finally:
+            wb.close()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        return [row for row in csv.reader(f, dialect)]
@@ -0,0 +1,119 @@
+# channel_map.py
+
+import numpy as np
+
+# 每台主机 (2700/2701) 在全局通道空间中占 80 个通道: 2 个插槽 x 每槽 40
+SLOT_WIDTH = 40
+SLOTS_PER_MAINFRAME = 2
+MAINFRAME_WIDTH = SLOT_WIDTH * SLOTS_PER_MAINFRAME
+
+# 支持热电偶测量的扫描模块 -> 测量通道数 (电流通道等不能测温的通道不计入)
+MODULE_CHANNELS = {
+    '7700': 20,
+    '7702': 40,
+    '7706': 20,
+    '7708': 40,
+    '7710': 20,
+}
+
+
+def compress_channels(channels):
+    """
+    仪器通道号列表压缩为 SCPI 通道列表，连续通道合并为区间.
+    [101, 102, 103, 105, 201] -> "(@101:103,105,201)"
+    """
+    parts = []
+    channels = sorted(channels)
+    i = 0
+    while i < len(channels):
+        j = i
+        while j + 1 < len(channels) and channels[j + 1] == channels[j] + 1:
+            j += 1
+        parts.append(str(channels[i]) if i == j else f"{channels[i]}:{channels[j]}")
+        i = j + 1
+    return "(@" + ",".join(parts) + ")"
+
+
+class ChannelMap:
+    """
+    主机的模块配置与扫描通道表.
+    仪器通道号为 插槽*100 + 通道 (101-140, 201-240)；全局通道索引 (0 起始) 为
+    channel_offset + (插槽-1)*40 + (通道-1)，与界面中的 1-160 通道对应。
+    """
+
+    def __init__(self, modules):
+        """
+        :param modules: 每个插槽的模块型号 (None 表示空槽或不支持测温的模块)
+        """
+        self.modules = list(modules)
+        self.installed = [slot * 100 + ch
+                          for slot, model in enumerate(self.modules, start=1) if model in MODULE_CHANNELS
+                          for ch in range(1, MODULE_CHANNELS[model] + 1)]
+        self.channels = list(self.installed)
+
+    @classmethod
+    def from_opt(cls, response):
+        """解析 *OPT? 的返回值，例如 "7708,NONE" 或 "7702,7700" """
+        modules = []
+        for part in (response or "").split(",")[:SLOTS_PER_MAINFRAME]:
+            model = part.strip().upper()
+            if model and model not in MODULE_CHANNELS and model != 'NONE':
+                print(f"插槽 {len(modules) + 1} 的模块 {model} 不支持热电偶测量，已忽略")
+            modules.append(model if model in MODULE_CHANNELS else None)
+        return cls(modules)
+
+    @staticmethod
+    def to_global(channel, channel_offset=0):
+        slot, ch = divmod(channel, 100)
+        return channel_offset + (slot - 1) * SLOT_WIDTH + (ch - 1)
+
+    @staticmethod
+    def from_global(index, channel_offset=0):
+        local = index - channel_offset
+        if not 0 <= local < MAINFRAME_WIDTH:
+            return None
+        slot, ch = divmod(local, SLOT_WIDTH)
+        return (slot + 1) * 100 + ch + 1
+
+    def select(self, global_mask=None, channel_offset=0):
+        """
+        只扫描所选的通道 (全局布尔向量, None 表示全部已安装通道).
+        未接线的通道不在扫描列表中，扫描时间随通道数成比例缩短。
+        :return: 选中的仪器通道数
+        """
+        if global_mask is None:
+            self.channels = list(self.installed)
+        else:
+            self.channels = [ch for ch in self.installed if global_mask[self.to_global(ch, channel_offset)]]
+        return len(self.channels)
+
+    def group_by(self, key, channel_offset=0):
+        """
+        扫描通道按 key(全局通道索引) 的值分组，用于按组发送通道参数 (每组一条指令，通道列表压缩为区间).
+        :return: {值: [仪器通道号]}，组内按扫描顺序
+        """
+        groups = {}
+        for ch in self.channels:
+            groups.setdefault(key(self.to_global(ch, channel_offset)), []).append(ch)
+        return groups
+
+    @property
+    def scan_list(self):
+        return compress_channels(self.channels)
+
+    @property
+    def sample_count(self):
+        return len(self.channels)
+
+    def index_map(self, channel_offset=0):
+        """扫描顺序中每个读数对应的全局通道索引，用于 temps[index_map] = readings 的向量化放置"""
+        return np.array([self.to_global(ch, channel_offset) for ch in self.channels], dtype=np.intp)
+
+    def installed_mask(self, channel_offset=0, n_channels=160):
+        """已安装 (可测温) 的全局通道"""
+        mask = np.zeros(n_channels, dtype=bool)
+        mask[[self.to_global(ch, channel_offset) for ch in self.installed]] = True
+        return mask
+
+    def describe(self):
+        return ", ".join(f"slot {slot}: {model or 'none'}" for slot, model in enumerate(self.modules, start=1))
@@ -0,0 +1,180 @@
+# channel_selection.py
+
+import re
+from fnmatch import fnmatchcase
+from functools import lru_cache
+
+import numpy as np
+
+# 逗号/分号分隔，括号和引号内的逗号不拆分: "(1,40), !5, 'Motor, left'"
+_TOKEN_SPLIT = re.compile(r'''[,;]\s*(?![^()]*\))(?=(?:[^"']*["'][^"']*["'])*[^"']*$)''')
+_RANGE = re.compile(r'\(\s*(\d+)\s*,\s*(\d+)\s*\)|(\d+)\s*[-:]\s*(\d+)')
+_COMPARE = re.compile(r'(>=|<=|>|<)\s*(.+)')
+_LIMIT_WORDS = ('limit', 'threshold')
+
+
+class ChannelSelection:
+    """
+    编译后的通道选择: indices 为升序的 0 起始通道号数组 (可直接用于历史矩阵的列索引)，
+    mask 为对应的布尔向量，channels 为列表形式 (兼容原 parse_channel_selection 的返回值)。
+    """
+    __slots__ = ('indices', 'mask', 'channels', 'warnings')
+
+    def __init__(self, mask, warnings=()):
+        self.mask = mask
+        self.indices = np.flatnonzero(mask)
+        self.channels = self.indices.tolist()
+        self.warnings = tuple(warnings)
+
+    def __len__(self):
+        return len(self.indices)
+
+
+@lru_cache(maxsize=256)
+def parse_selection(text):
+    """
+    把选择字符串解析为项列表 (与通道配置无关，按输入字符串缓存).
+    语法 (逗号分隔，1 起始):
+      5          单个通道
+      1-40 / (1,40)   通道范围
+      all / *    全部通道
+      Motor*     位置名称匹配 (不区分大小写，支持 * ? 通配符，可加引号)
+      >80 / <=30 最高温度比较 (°C)
+      >limit     最高温度超过自身阈值的通道
+      !项        排除，例如 !5、!1-10、!PCB*
+    :return: (terms, errors)，term 为 (是否排除, 类型, 参数)
+    """
+    terms, errors = [], []
+    for token in _TOKEN_SPLIT.split((text or '').strip()):
+        token = token.strip()
+        if not token:
+            continue
+        negate = token.startswith('!')
+        body = token[1:].strip() if negate else token
+        range_match = _RANGE.fullmatch(body)
+        compare_match = _COMPARE.fullmatch(body)
+        if body.isdigit():
+            terms.append((negate, 'range', (int(body), int(body))))
+        elif range_match:
+            start, end = (int(g) for g in range_match.groups() if g is not None)
+            terms.append((negate, 'range', (min(start, end), max(start, end))))
+        elif body.lower() in ('all', '*'):
+            terms.append((negate, 'all', None))
+        elif compare_match:
+            op, value = compare_match.groups()
+            value = value.strip()
+            if value.lower() in _LIMIT_WORDS and op in ('>', '>='):
+                terms.append((negate, 'over_limit', op))
+                continue
+            try:
+                terms.append((negate, 'compare', (op, float(value))))
+            except ValueError:
+                errors.append(f"无法解析的比较条件 '{token}'")
+        elif body:
+            pattern = body.strip('"\'').strip().lower()
+            terms.append((negate, 'location', pattern))
+        else:
+            errors.append(f"无法解析的通道输入 '{token}'")
+    return tuple(terms), tuple(errors)
+
+
+class ChannelSelector:
+    """
+    通道选择编译器.
+    结果按 (输入字符串, 通道配置版本, 仪器通道表版本) 缓存；只含静态项 (通道号/位置名称) 的选择
+    直接返回缓存的 ChannelSelection，含温度条件的选择每次只做一次向量比较。
+    警告 (无法解析的输入、不在仪器通道表中的通道) 在编译时打印一次。
+    """
+
+    def __init__(self, n_channels=160):
+        self.n_channels = n_channels
+        self.available = np.ones(n_channels, dtype=bool)
+        self._available_version = 0
+        self._cache = {}
+
+    def set_available(self, mask):
+        """设置仪器实际扫描的通道 (布尔向量)；None 表示全部可用 (未连接仪器时)"""
+        mask = np.ones(self.n_channels, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if np.array_equal(mask, self.available):
+            return
+        self.available = mask
+        self._available_version += 1
+        self._cache.clear()
+
+    def _compile_static(self, text, configs):
+        """静态项合成为包含/排除掩码，温度条件留到 select 时计算"""
+        terms, errors = parse_selection(text)
+        warnings = list(errors)
+        n = self.n_channels
+        include = np.zeros(n, dtype=bool)
+        exclude = np.zeros(n, dtype=bool)
+        dynamic = []
+        has_positive = False
+        locations = [loc.lower() for loc in configs.locations] if configs is not None else None
+        for negate, kind, arg in terms:
+            target = exclude if negate else include
+            has_positive |= not negate
+            if kind == 'range':
+                start, end = arg
+                if start < 1 or end > n:
+                    warnings.append(f"通道 {start}-{end} 超出范围 1-{n}")
+                target[max(start, 1) - 1: min(end, n)] = True
+                missing = np.flatnonzero(~self.available[max(start, 1) - 1: min(end, n)]) + max(start, 1)
+                if not negate and len(missing):
+                    shown = ", ".join(str(ch) for ch in missing[:10]) + (" ..." if len(missing) > 10 else "")
+                    warnings.append(f"通道 {shown} 不在仪器的扫描通道中")
+            elif kind == 'all':
+                target[:] = True
+            elif kind == 'location':
+                if locations is None:
+                    warnings.append(f"没有通道配置，无法按位置 '{arg}' 选择")
+                    continue
+                matched = [i for i, loc in enumerate(locations) if loc and fnmatchcase(loc, arg)]
+                if not matched and not negate:
+                    warnings.append(f"没有位置匹配 '{arg}' 的通道")
+                target[matched] = True
+            else:
+                dynamic.append((negate, kind, arg))
+        if terms and not has_positive:
+            # 只有排除项时，从全部通道中排除 (空输入仍为空选择)
+            include[:] = True
+        return include, exclude, tuple(dynamic), tuple(warnings)
+
+    @staticmethod
+    def _dynamic_mask(kind, arg, configs, max_temps):
+        with np.errstate(invalid='ignore'):
+            if kind == 'over_limit':
+                limits = configs.alarm_limits if configs is not None else np.inf
+                return max_temps >= limits if arg == '>=' else max_temps > limits
+            op, value = arg
+            return {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}[op](max_temps, value)
+
+    def select(self, text, configs=None, max_temps=None):
+        """
+        编译并求值一个选择字符串.
+        :param configs: ChannelConfigModel，用于位置名称与 >limit
+        :param max_temps: 各通道当前最高温度 (温度条件用)，没有时温度条件不匹配任何通道
+        :return: ChannelSelection
+        """
+        key = (text, configs.version if configs is not None else None, self._available_version)
+        entry = self._cache.get(key)
+        if entry is None:
+            include, exclude, dynamic, warnings = self._compile_static(text, configs)
+            for warning in warnings:
+                print(f"警告: {warning}")
+            static = None
+            if not dynamic:
+                static = ChannelSelection(include & ~exclude & self.available, warnings)
+            if len(self._cache) > 256:
+                self._cache.clear()
+            entry = self._cache[key] = (include, exclude, dynamic, warnings, static)
+        include, exclude, dynamic, warnings, static = entry
+        if static is not None:
+            return static
+        include, exclude = include.copy(), exclude.copy()
+        for negate, kind, arg in dynamic:
+            if max_temps is None:
+                continue
+            matched = self._dynamic_mask(kind, arg, configs, np.asarray(max_temps, dtype=float))
+            (exclude if negate else include)[matched] = True
+        return ChannelSelection(include & ~exclude & self.available, warnings)
@@ -1,478 +1,1033 @@
-# gui_frames.py
-
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
-import numpy as np
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-import matplotlib.pyplot as plt
-from datetime import datetime
-import os
-import time
-import webbrowser
-
-try:
-    import openpyxl
-except ImportError:
-    openpyxl = None
-
-
-class ScanSettingsDialog(tk.Toplevel):
-    def __init__(self, parent, current_settings):
-        super().__init__(parent)
-        self.transient(parent)
-        self.title("Scan Settings")
-        self.geometry("360x200+400+200")
-        self.parent = parent
-        self.result = None
-
-        # UI 控件
-        frame = ttk.Frame(self, padding="10")
-        frame.pack(expand=True, fill="both")
-
-        # 扫描间隔 (Cycle)
-        ttk.Label(frame, text="Cycle/s:").grid(row=0, column=0, sticky="w", pady=5)
-        self.interval_entry = ttk.Entry(frame)
-        self.interval_entry.grid(row=0, column=1, pady=5)
-        self.interval_entry.insert(0, current_settings.get('interval', '10'))
-
-        # 环境通道 (Ambient Channel)
-        ttk.Label(frame, text="Ambient Channel:").grid(row=1, column=0, sticky="w", pady=5)
-        self.ambient_entry = ttk.Entry(frame)
-        self.ambient_entry.grid(row=1, column=1, pady=5)
-        self.ambient_entry.insert(0, current_settings.get('ambient', '1'))
-
-        # 热电偶类型 (Thermocouple Type)
-        ttk.Label(frame, text="Thermocouple Type:").grid(row=2, column=0, sticky="w", pady=5)
-        self.tc_type_var = tk.StringVar(value=current_settings.get('tc_type', 'K'))
-        self.tc_type_combo = ttk.Combobox(frame, textvariable=self.tc_type_var, state="readonly",
-                                          values=["J", "K", "T", "E", "R", "S", "B", "N"])
-        self.tc_type_combo.grid(row=2, column=1, pady=5)
-
-        # 按钮
-        button_frame = ttk.Frame(self, padding="10")
-        button_frame.pack(fill="x")
-        ttk.Button(button_frame, text="Save", command=self.on_save).pack(side="right", padx=5)
-        ttk.Button(button_frame, text="Cancel", command=self.on_cancel).pack(side="right")
-
-        # 窗口行为
-        self.protocol("WM_DELETE_WINDOW", self.on_cancel)
-        self.grab_set()  # 模态化，阻止与其他窗口交互
-        self.wait_window(self)
-
-    def on_save(self):
-        # 验证输入
-        if not self.interval_entry.get().isdigit() or not self.ambient_entry.get().isdigit():
-            messagebox.showerror("Invalid Input", "Cycle and Ambient Channel must be numbers.", parent=self)
-            return
-
-        self.result = {
-            'interval': self.interval_entry.get(),
-            'ambient': self.ambient_entry.get(),
-            'tc_type': self.tc_type_var.get()
-        }
-        self.destroy()
-
-    def on_cancel(self):
-        self.result = None
-        self.destroy()
-
-# ConnectionFrame (已支持GPIB)
-class ConnectionFrame(ttk.Frame):
-    def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
-
-        self.columnconfigure(0, weight=1)
-        self.columnconfigure(1, weight=0)  # 主内容列
-        self.columnconfigure(2, weight=1)
-
-        # 仪器选择
-        ttk.Label(self, text="Select Instrument:", font=("Helvetica", 12)).grid(row=0, column=1, pady=(20, 5))
-        self.instrument_var = tk.StringVar()
-        self.instrument_selector = ttk.Combobox(self, textvariable=self.instrument_var, state="readonly", width=35)
-        self.instrument_selector['values'] = ('Keithley 2701 (TCP/IP)', 'Keithley 2700 (GPIB)')
-        self.instrument_selector.current(0)
-        self.instrument_selector.grid(row=1, column=1, pady=5, ipady=4)
-        self.instrument_selector.bind("<<ComboboxSelected>>", self.on_instrument_select)
-
-        # 地址输入
-        self.address_label = ttk.Label(self, text="IP Address:", font=("Helvetica", 12))
-        self.address_label.grid(row=2, column=1, pady=(10, 5))
-
-        self.address_entry = ttk.Entry(self, width=38)
-        self.address_entry.grid(row=3, column=1, pady=5, ipady=4)
-
-        # 初始状态
-        self.on_instrument_select(None)  # 初始化标签和默认地址
-
-        # 通道范围选择
-        self.device_type_var = tk.StringVar(value="1-80")
-        device_selector_frame = ttk.Frame(self)
-        device_selector_frame.grid(row=4, column=1, pady=5)
-        ttk.Label(device_selector_frame, text="Channel Range:").pack(side="left", padx=5)
-        ttk.Radiobutton(device_selector_frame, text="1-80", variable=self.device_type_var, value="1-80").pack(
-            side="left")
-        ttk.Radiobutton(device_selector_frame, text="81-160", variable=self.device_type_var, value="81-160").pack(
-            side="left")
-
-        # 按钮和状态
-        button_frame = ttk.Frame(self)
-        button_frame.grid(row=5, column=1, pady=10)
-        self.connect_button = ttk.Button(button_frame, text="Connect", command=self.connect_device)
-        self.connect_button.pack(side="left", padx=5)
-        self.disconnect_button = ttk.Button(button_frame, text="Disable Connect", command=self.disconnect_device,
-                                            state="disabled")
-        self.disconnect_button.pack(side="left", padx=5)
-
-        self.status_label = ttk.Label(self, text="Status: Not Connected", foreground="red")
-        self.status_label.grid(row=6, column=1, pady=5)
-        self.device_id_label = ttk.Label(self, text="Instrument: N/A")
-        self.device_id_label.grid(row=7, column=1, pady=5)
-        self.next_button = ttk.Button(self, text="Continue to Test", state="disabled",
-                                      command=lambda: controller.show_frame("RunningFrame"))
-        self.next_button.grid(row=8, column=1, pady=20)
-
-        about_button = ttk.Button(self, text="About", command=self.open_github_link)
-        about_button.grid(row=9, column=1, pady=10)
-
-    def on_instrument_select(self, event):
-        """当用户切换仪器选项时，更新地址标签和默认值。"""
-        selection = self.instrument_var.get()
-        self.address_entry.delete(0, tk.END)
-        if "TCP/IP" in selection:
-            self.address_label.config(text="IP Address:")
-            self.address_entry.insert(0, "192.168.1.100::1394")
-        elif "GPIB" in selection:
-            self.address_label.config(text="GPIB Address (e.g., 22):")
-            self.address_entry.insert(0, "22")
-
-    def open_github_link(self):
-        url = "https://github.com/Ashes2Ashes233/TemPyScan"
-        webbrowser.open_new(url)
-
-    def connect_device(self):
-        address = self.address_entry.get()
-        device_type = self.device_type_var.get()
-        instrument_selection = self.instrument_var.get()
-
-        if not address:
-            messagebox.showerror("Error", "Address cannot be empty.")
-            return
-
-        conn_type = 'TCPIP' if 'TCP/IP' in instrument_selection else 'GPIB'
-
-        if self.controller.connect_instrument(conn_type, address, device_type):
-            self.status_label.config(text="Status: Connected", foreground="green")
-            self.device_id_label.config(text=f"Instrument: {self.controller.get_device_id()}")
-            self.connect_button.config(state="disabled")
-            self.disconnect_button.config(state="normal")
-            self.next_button.config(state="normal")
-            self.instrument_selector.config(state="disabled")
-        else:
-            self.status_label.config(text="Status: Connection Failed", foreground="red")
-            self.device_id_label.config(text="Instrument: N/A")
-            messagebox.showerror("Connection Failed", f"Could not connect to device at {address} via {conn_type}.")
-
-    def disconnect_device(self):
-        self.controller.disconnect_instrument()
-        self.status_label.config(text="Status: Not Connected", foreground="red")
-        self.device_id_label.config(text="Instrument: N/A")
-        self.connect_button.config(state="normal")
-        self.disconnect_button.config(state="disabled")
-        self.next_button.config(state="disabled")
-        self.instrument_selector.config(state="normal")
-
-
-# --- SettingsFrame ---
-class SettingsFrame(ttk.Frame):
-    def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
-        self.entries = {}
-        frame = ttk.Frame(self)
-        frame.pack(pady=20, padx=20)
-        ttk.Label(self, text="Report Configuration", font=("Helvetica", 16, "bold")).pack(pady=10)
-        fields = [
-            ("Test type", "Combobox", ["Normal", "Abnormal"]), ("Test name", "Entry", ""),
-            ("Operating Voltage", "Entry", ""), ("Operating Frequency", "Entry", ""),
-            ("Operating Duration", "Entry", ""),
-            ("Rating Voltage", "Entry", ""), ("Rating Frequency", "Entry", ""),
-            ("Temperature contrast with limit", "Entry", ""), ("Lab request", "Entry", ""),
-            ("Sample number", "Entry", ""), ("Model number", "Entry", ""),
-            ("Sample Characteristics", "Text", ""), ("Tester", "Entry", ""),
-            ("Equipment", "Entry", ""),
-        ]
-        for i, (label_text, widget_type, default_value) in enumerate(fields):
-            label = ttk.Label(frame, text=label_text + ":")
-            label.grid(row=i, column=0, sticky="w", padx=5, pady=5)
-            if widget_type == "Entry":
-                widget = ttk.Entry(frame, width=40)
-                widget.insert(0, default_value)
-            elif widget_type == "Combobox":
-                widget = ttk.Combobox(frame, values=default_value, width=38)
-                if default_value:
-                    widget.current(0)
-            elif widget_type == "Text":
-                widget = scrolledtext.ScrolledText(frame, width=30, height=4, wrap=tk.WORD)
-            widget.grid(row=i, column=1, sticky="ew", padx=5, pady=5)
-            self.entries[label_text] = widget
-
-        last_row = len(fields)
-
-        grouping_label = ttk.Label(frame, text="Channels per Graph:")
-        grouping_label.grid(row=last_row, column=0, sticky="w", padx=5, pady=5)
-
-        self.grouping_entry = ttk.Entry(frame, width=40)
-        self.grouping_entry.grid(row=last_row, column=1, sticky="ew", padx=5, pady=5)
-        self.grouping_entry.insert(0, "")  # 默认留空
-
-        button_frame = ttk.Frame(self)
-        button_frame.pack(pady=10)
-        ttk.Button(button_frame, text="Clear Info", command=self.clear_info).pack(side="left", padx=10)
-        ttk.Button(button_frame, text="Generate Report & Data Table", command=self.confirm_and_generate_report).pack(
-            side="left", padx=10)
-        ttk.Button(button_frame, text="Back to Test", command=lambda: self.controller.show_frame("RunningFrame")).pack(
-            side="left", padx=10)
-
-    def clear_info(self):
-        for widget in self.entries.values():
-            if isinstance(widget, ttk.Entry):
-                widget.delete(0, tk.END)
-            elif isinstance(widget, ttk.Combobox):
-                widget.set('')
-            elif isinstance(widget, scrolledtext.ScrolledText):
-                widget.delete('1.0', tk.END)
-
-    def confirm_and_generate_report(self):
-        settings = {}
-        for key, widget in self.entries.items():
-            if isinstance(widget, (ttk.Entry, ttk.Combobox)):
-                settings[key] = widget.get()
-            elif isinstance(widget, scrolledtext.ScrolledText):
-                settings[key] = widget.get('1.0', tk.END).strip()
-        # 将分组数量也存入settings
-        settings['Channels per Graph'] = self.grouping_entry.get().strip()
-
-        self.controller.settings = settings
-        print("Final report settings confirmed.")
-        self.controller.generate_final_report()
-
-
-# --- RunningFrame ---
-class RunningFrame(ttk.Frame):
-    def __init__(self, parent, controller):
-        super().__init__(parent)
-        self.controller = controller
-
-        # 存储扫描参数
-        self.scan_interval = "2"  # 默认值
-        self.ambient_channel_str = "1"  # 默认值
-        self.thermocouple_type = "K"  # 默认值
-
-        main_pane = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
-        main_pane.pack(fill=tk.BOTH, expand=True)
-        left_frame = ttk.Frame(main_pane)
-        main_pane.add(left_frame, weight=2)
-        control_frame = ttk.Frame(left_frame)
-        control_frame.pack(fill=tk.X, pady=5, padx=5)
-
-        self.start_button = ttk.Button(control_frame, text="Start", command=self.start_test)
-        self.start_button.pack(side="left", padx=5)
-        self.stop_button = ttk.Button(control_frame, text="Stop", command=self.stop_test, state="disabled")
-        self.stop_button.pack(side="left", padx=5)
-
-        # 用一个按钮替换多个输入框
-        self.scan_settings_button = ttk.Button(control_frame, text="Scan Settings", command=self.open_scan_settings)
-        self.scan_settings_button.pack(side="left", padx=(10, 0))
-
-        table_frame = ttk.Frame(left_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        cols = ("Channel", "Location", "Current Temp (°C)", "Max Temp (°C)", "Threshold (°C)")
-        self.tree = ttk.Treeview(table_frame, columns=cols, show='headings', height=25)
-        for col in cols: self.tree.heading(col, text=col)
-        self.tree.column("Channel", width=60, anchor='center')
-        self.tree.column("Location", width=150, anchor='w')
-        self.tree.column("Current Temp (°C)", width=120, anchor='center')
-        self.tree.column("Max Temp (°C)", width=120, anchor='center')
-        self.tree.column("Threshold (°C)", width=120, anchor='center')
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.tree.tag_configure('over_threshold', foreground='white', background='red', font=('Consolas', 10, 'bold'))
-        self.tree.bind("<Double-1>", self.on_double_click)
-        right_pane = ttk.PanedWindow(main_pane, orient=tk.VERTICAL)
-        main_pane.add(right_pane, weight=3)
-        plot_frame = ttk.LabelFrame(right_pane, text="Graph Panel - Use toolbar to Pan/Zoom")
-        right_pane.add(plot_frame, weight=2)
-        self.fig = Figure(figsize=(8, 6), dpi=100)
-        self.ax = self.fig.add_subplot(111)
-        self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
-        self.canvas_widget = self.canvas.get_tk_widget()
-        self.canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        self.toolbar = NavigationToolbar2Tk(self.canvas, plot_frame)
-        self.toolbar.update()
-        ch_select_frame = ttk.Frame(plot_frame)
-        ch_select_frame.pack(fill=tk.X, pady=(0, 5))
-        ttk.Label(ch_select_frame, text="Channels:").pack(side=tk.LEFT, padx=5)
-        self.plot_channels_entry = ttk.Entry(ch_select_frame)
-        self.plot_channels_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        time_frame = ttk.Frame(plot_frame)
-        time_frame.pack(fill=tk.X, pady=(2, 5))
-        ttk.Label(time_frame, text="Time Range (s):").pack(side=tk.LEFT, padx=5)
-        ttk.Label(time_frame, text="Start:").pack(side=tk.LEFT)
-        self.start_time_entry = ttk.Entry(time_frame, width=8)
-        self.start_time_entry.pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Label(time_frame, text="End:").pack(side=tk.LEFT)
-        self.end_time_entry = ttk.Entry(time_frame, width=8)
-        self.end_time_entry.pack(side=tk.LEFT)
-        self.update_plot_button = ttk.Button(time_frame, text="Update Plot", command=self.redraw_historical_plot)
-        self.update_plot_button.pack(side=tk.RIGHT, padx=5)
-        y_frame = ttk.Frame(plot_frame)
-        y_frame.pack(fill=tk.X, pady=(2, 5))
-        ttk.Label(y_frame, text="Y Range (°C):").pack(side=tk.LEFT, padx=5)
-        ttk.Label(y_frame, text="Min:").pack(side=tk.LEFT)
-        self.y_min_entry = ttk.Entry(y_frame, width=8)
-        self.y_min_entry.pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Label(y_frame, text="Max:").pack(side=tk.LEFT)
-        self.y_max_entry = ttk.Entry(y_frame, width=8)
-        self.y_max_entry.pack(side=tk.LEFT)
-        report_build_frame = ttk.Frame(right_pane)
-        right_pane.add(report_build_frame, weight=1)
-        report_info_frame = ttk.LabelFrame(report_build_frame, text="Report Notes")
-        report_info_frame.pack(fill="both", expand=True, padx=5, pady=5)
-        report_info_frame.columnconfigure(1, weight=1)
-        ttk.Label(report_info_frame, text="Phenomena&Result:").grid(row=0, column=0, sticky='nw', padx=5, pady=2)
-        self.phenomena_text = scrolledtext.ScrolledText(report_info_frame, height=3)
-        self.phenomena_text.grid(row=0, column=1, sticky='nsew', padx=5, pady=2)
-        ttk.Label(report_info_frame, text="Notes:").grid(row=1, column=0, sticky='nw', padx=5, pady=2)
-        self.notes_text = scrolledtext.ScrolledText(report_info_frame, height=3)
-        self.notes_text.grid(row=1, column=1, sticky='nsew', padx=5, pady=2)
-        report_info_frame.rowconfigure(0, weight=1)
-        report_info_frame.rowconfigure(1, weight=1)
-        export_button_frame = ttk.Frame(report_build_frame)
-        export_button_frame.pack(pady=10)
-        self.create_report_button = ttk.Button(export_button_frame, text="Proceed to Report Settings",
-                                               command=self.proceed_to_report)
-        self.create_report_button.pack(side="left", padx=10)
-
-    # 打开弹窗的方法
-    def open_scan_settings(self):
-        current_settings = {
-            'interval': self.scan_interval,
-            'ambient': self.ambient_channel_str,
-            'tc_type': self.thermocouple_type
-        }
-        dialog = ScanSettingsDialog(self, current_settings)
-        # dialog.wait_window() 会在弹窗关闭后才继续执行
-        if dialog.result:
-            self.scan_interval = dialog.result['interval']
-            self.ambient_channel_str = dialog.result['ambient']
-            self.thermocouple_type = dialog.result['tc_type']
-            print(f"Scan settings updated: Interval={self.scan_interval}s, "
-                  f"Ambient Ch={self.ambient_channel_str}, TC Type={self.thermocouple_type}")
-
-    def start_test(self):
-        self.tree.delete(*self.tree.get_children())
-        configs = self.controller.get_channel_configs()
-        for i, config in enumerate(configs):
-            self.tree.insert("", "end", iid=i, values=(i + 1, config['location'], "N/A", "N/A", config['threshold']))
-
-        # 从实例变量读取参数
-        self.controller.start_data_acquisition(
-            int(self.scan_interval),
-            self.ambient_channel_str,
-            self.thermocouple_type
-        )
-
-        self.start_button.config(state="disabled")
-        self.stop_button.config(state="normal")
-
-    def on_double_click(self, event):
-        region = self.tree.identify("region", event.x, event.y)
-        if region != "cell": return
-        column_id = self.tree.identify_column(event.x)
-        column_index = int(column_id.replace('#', '')) - 1
-        if column_index not in [1, 4]: return
-        row_id = self.tree.focus()
-        x, y, width, height = self.tree.bbox(row_id, column_id)
-        entry = ttk.Entry(self.tree)
-        entry.place(x=x, y=y, width=width, height=height)
-        current_value = self.tree.item(row_id, "values")[column_index]
-        entry.insert(0, current_value)
-        entry.focus()
-        entry.bind("<FocusOut>", lambda e: entry.destroy())
-        entry.bind("<Return>", lambda e: self.save_edit(entry, row_id, column_index))
-
-    def save_edit(self, entry, row_id, column_index):
-        new_value = entry.get()
-        values = list(self.tree.item(row_id, "values"))
-        values[column_index] = new_value
-        self.tree.item(row_id, values=values)
-        self.controller.update_channel_config(int(row_id), column_index, new_value)
-        entry.destroy()
-
-    def stop_test(self):
-        self.controller.stop_data_acquisition()
-        self.start_button.config(state="normal")
-        self.stop_button.config(state="disabled")
-
-    def redraw_historical_plot(self, **kwargs):
-        self.ax.clear()
-        self.ax.grid(True)
-        self.ax.set_title(kwargs.get('title', "Temperature History"))
-        self.ax.set_xlabel("Time (seconds)")
-        self.ax.set_ylabel("Temperature (°C)")
-        channels_to_plot = kwargs.get('channels_to_plot',
-                                      self.controller.parse_channel_selection(self.plot_channels_entry.get()))
-        start_time_str = kwargs.get('start_time', self.start_time_entry.get())
-        end_time_str = kwargs.get('end_time', self.end_time_entry.get())
-        sliced_data = self.controller.get_sliced_data(channels_to_plot, start_time_str, end_time_str)
-        if not sliced_data: self.canvas.draw(); return
-        sliced_history = sliced_data['history']
-        slice_start_ts = sliced_data['actual_start_ts']
-        colors = plt.get_cmap('tab20').colors
-        plotted_something = False
-        for i in channels_to_plot:
-            if i in sliced_history and sliced_history[i]:
-                timestamps, temps_y = zip(*sliced_history[i])
-                elapsed_time = [ts - slice_start_ts for ts in timestamps]
-                self.ax.plot(elapsed_time, temps_y, label=f"Ch {i + 1}", color=colors[i % len(colors)])
-                plotted_something = True
-        y_min = kwargs.get('y_min', self.y_min_entry.get())
-        y_max = kwargs.get('y_max', self.y_max_entry.get())
-        try:
-            if y_min and y_min.strip() != '': self.ax.set_ylim(bottom=float(y_min))
-            if y_max and y_max.strip() != '': self.ax.set_ylim(top=float(y_max))
-        except ValueError:
-            pass
-        if plotted_something: self.ax.legend(loc='upper left', fontsize='small')
-        self.canvas.draw()
-
-    def update_ui(self, temps, max_temps):
-        if temps is None: return
-        channel_configs = self.controller.get_channel_configs()
-        for i in range(160):
-            temp = temps[i]
-            if np.isnan(temp): continue
-            try:
-                threshold = float(channel_configs[i]['threshold'])
-            except (ValueError, KeyError):
-                threshold = float('inf')
-            max_temp_val = max_temps[i]
-            max_temp_str = f"{max_temp_val:.2f}" if not np.isinf(max_temp_val) else "N/A"
-            tag = 'over_threshold' if temp > threshold else ''
-            self.tree.item(i, values=(
-                i + 1, channel_configs[i]['location'], f"{temp:.2f}", max_temp_str, channel_configs[i]['threshold']),
-                           tags=(tag,))
-        self.redraw_historical_plot(title="Live Temperature View", start_time="", end_time="",
-                                    y_min=self.y_min_entry.get(), y_max=self.y_max_entry.get())
-
-    def proceed_to_report(self):
-        notes = {'phenomena': self.phenomena_text.get("1.0", tk.END).strip(),
-                 'notes': self.notes_text.get("1.0", tk.END).strip()}
-        channels_str = self.plot_channels_entry.get()
-        time_range = {'start': self.start_time_entry.get(), 'end': self.end_time_entry.get()}
-        self.controller.prepare_for_report(notes, channels_str, time_range)
+# gui_frames.py
+
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+from datetime import datetime
+import os
+import time
+import webbrowser
+from lazy_imports import lazy_module
+
+# 连接界面不需要 numpy/matplotlib，这些模块在 RunningFrame 创建时才加载
+np = lazy_module('numpy')
+channel_config = lazy_module('channel_config')
+scan_speed = lazy_module('scan_speed')
+run_log = lazy_module('run_log')
+
+
+class ScanSettingsDialog(tk.Toplevel):
+    def __init__(self, parent, current_settings, predict=None):
+        """
+        :param predict: predict(scan_channels, profile, overrides, autozero, ambient) -> (预计扫描耗时, 通道数)，
+                        用于在开始测试前显示扫描时间
+        """
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("Scan Settings")
+        self.geometry("420x610+400+200")
+        self.parent = parent
+        self.predict = predict
+        self.result = None
+
+        # UI 控件
+        frame = ttk.Frame(self, padding="10")
+        frame.pack(expand=True, fill="both")
+
+        # 扫描间隔 (Cycle)
+        ttk.Label(frame, text="Cycle/s:").grid(row=0, column=0, sticky="w", pady=5)
+        self.interval_entry = ttk.Entry(frame)
+        self.interval_entry.grid(row=0, column=1, pady=5)
+        self.interval_entry.insert(0, current_settings.get('interval', '10'))
+
+        # 环境通道 (Ambient Channel)
+        ttk.Label(frame, text="Ambient Channel:").grid(row=1, column=0, sticky="w", pady=5)
+        self.ambient_entry = ttk.Entry(frame)
+        self.ambient_entry.grid(row=1, column=1, pady=5)
+        self.ambient_entry.insert(0, current_settings.get('ambient', '1'))
+
+        # 热电偶类型 (Thermocouple Type)，表格中未单独设置类型的通道使用该类型
+        ttk.Label(frame, text="Default TC Type:").grid(row=2, column=0, sticky="w", pady=5)
+        self.tc_type_var = tk.StringVar(value=current_settings.get('tc_type', 'K'))
+        self.tc_type_combo = ttk.Combobox(frame, textvariable=self.tc_type_var, state="readonly",
+                                          values=["J", "K", "T", "E", "R", "S", "B", "N"])
+        self.tc_type_combo.grid(row=2, column=1, pady=5)
+
+        # 界面刷新频率 (与扫描周期无关)
+        ttk.Label(frame, text="Table Refresh/Hz:").grid(row=3, column=0, sticky="w", pady=5)
+        self.table_hz_entry = ttk.Entry(frame)
+        self.table_hz_entry.grid(row=3, column=1, pady=5)
+        self.table_hz_entry.insert(0, current_settings.get('table_hz', '2'))
+
+        ttk.Label(frame, text="Plot Refresh/Hz:").grid(row=4, column=0, sticky="w", pady=5)
+        self.plot_hz_entry = ttk.Entry(frame)
+        self.plot_hz_entry.grid(row=4, column=1, pady=5)
+        self.plot_hz_entry.insert(0, current_settings.get('plot_hz', '0.5'))
+
+        # 热稳定判据: 窗口时长内温度变化速率低于设定值
+        ttk.Label(frame, text="Steady Window/min:").grid(row=5, column=0, sticky="w", pady=5)
+        self.steady_window_entry = ttk.Entry(frame)
+        self.steady_window_entry.grid(row=5, column=1, pady=5)
+        self.steady_window_entry.insert(0, current_settings.get('steady_window_min', '60'))
+
+        ttk.Label(frame, text="Steady Rate/(K/h):").grid(row=6, column=0, sticky="w", pady=5)
+        self.steady_rate_entry = ttk.Entry(frame)
+        self.steady_rate_entry.grid(row=6, column=1, pady=5)
+        self.steady_rate_entry.insert(0, current_settings.get('steady_rate', '1.0'))
+
+        self.auto_stop_var = tk.BooleanVar(value=current_settings.get('auto_stop', False))
+        ttk.Checkbutton(frame, text="Stop automatically when all channels are stable",
+                        variable=self.auto_stop_var).grid(row=7, column=0, columnspan=2, sticky="w", pady=5)
+
+        # 只扫描接线的通道 (通道选择语法，留空扫描全部已安装通道)，扫描时间随通道数缩短
+        ttk.Label(frame, text="Scan Channels:").grid(row=8, column=0, sticky="w", pady=5)
+        self.scan_channels_entry = ttk.Entry(frame)
+        self.scan_channels_entry.grid(row=8, column=1, pady=5)
+        self.scan_channels_entry.insert(0, current_settings.get('scan_channels', ''))
+
+        # 扫描速度: 预设决定 NPLC/自动调零/滤波，分组覆盖按通道单独设置 NPLC 和滤波
+        ttk.Label(frame, text="Scan Speed:").grid(row=9, column=0, sticky="w", pady=5)
+        self.speed_profile_var = tk.StringVar(value=current_settings.get('speed_profile', 'balanced'))
+        ttk.Combobox(frame, textvariable=self.speed_profile_var, state="readonly",
+                     values=scan_speed.PROFILE_NAMES).grid(row=9, column=1, pady=5)
+
+        self.autozero_var = tk.BooleanVar(value=current_settings.get('autozero', True))
+        self.autozero_check = ttk.Checkbutton(frame, text="Autozero (custom profile)", variable=self.autozero_var)
+        self.autozero_check.grid(row=10, column=0, columnspan=2, sticky="w", pady=5)
+
+        ttk.Label(frame, text="Channel NPLC/Filter:").grid(row=11, column=0, sticky="w", pady=5)
+        self.speed_overrides_entry = ttk.Entry(frame)
+        self.speed_overrides_entry.grid(row=11, column=1, pady=5)
+        self.speed_overrides_entry.insert(0, current_settings.get('speed_overrides', ''))
+        ttk.Label(frame, text="e.g. 1-5: nplc=0.1; Motor*: nplc=5 filter=10",
+                  foreground="gray").grid(row=12, column=0, columnspan=2, sticky="w")
+
+        # 仪器时间戳: 每个读数记录实际测量时刻，曲线和导出按各通道自身的时间对齐
+        self.hw_timestamps_var = tk.BooleanVar(value=current_settings.get('hw_timestamps', False))
+        ttk.Checkbutton(frame, text="Use instrument timestamps per reading",
+                        variable=self.hw_timestamps_var).grid(row=13, column=0, columnspan=2, sticky="w", pady=5)
+
+        self.prediction_label = ttk.Label(frame, text="", wraplength=380)
+        self.prediction_label.grid(row=14, column=0, columnspan=2, sticky="w", pady=5)
+
+        self.speed_profile_var.trace_add("write", lambda *args: self.update_prediction())
+        self.autozero_var.trace_add("write", lambda *args: self.update_prediction())
+        for entry in (self.interval_entry, self.ambient_entry, self.scan_channels_entry, self.speed_overrides_entry):
+            entry.bind("<KeyRelease>", lambda e: self.update_prediction())
+        self.update_prediction()
+
+        # 按钮
+        button_frame = ttk.Frame(self, padding="10")
+        button_frame.pack(fill="x")
+        ttk.Button(button_frame, text="Save", command=self.on_save).pack(side="right", padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.on_cancel).pack(side="right")
+
+        # 窗口行为
+        self.protocol("WM_DELETE_WINDOW", self.on_cancel)
+        self.grab_set()  # 模态化，阻止与其他窗口交互
+        self.wait_window(self)
+
+    def speed_settings(self):
+        """当前的速度设置: (预设, 分组覆盖, 自动调零)，自动调零只在 custom 预设时生效"""
+        profile = self.speed_profile_var.get()
+        autozero = self.autozero_var.get() if profile == 'custom' else None
+        return profile, self.speed_overrides_entry.get().strip(), autozero
+
+    def update_prediction(self):
+        """显示按当前设置估算的每次扫描耗时，超过扫描周期时给出提示"""
+        profile, overrides, autozero = self.speed_settings()
+        self.autozero_check.config(state="normal" if profile == 'custom' else "disabled")
+        if self.predict is None:
+            return
+        _, errors = scan_speed.parse_overrides(overrides)
+        if errors:
+            self.prediction_label.config(text=f"Channel NPLC/Filter: {errors[0]}", foreground="red")
+            return
+        seconds, n_channels = self.predict(self.scan_channels_entry.get(), profile, overrides, autozero,
+                                           self.ambient_entry.get())
+        text = f"Predicted scan time: {seconds:.2f} s for {n_channels} channels"
+        try:
+            too_slow = seconds > float(self.interval_entry.get())
+        except ValueError:
+            too_slow = False
+        if too_slow:
+            text += " (longer than the cycle)"
+        self.prediction_label.config(text=text, foreground="red" if too_slow else "")
+
+    def on_save(self):
+        # 验证输入
+        if not self.interval_entry.get().isdigit() or not self.ambient_entry.get().isdigit():
+            messagebox.showerror("Invalid Input", "Cycle and Ambient Channel must be numbers.", parent=self)
+            return
+        if not 1 <= int(self.ambient_entry.get()) <= 160:
+            messagebox.showerror("Invalid Input", "Ambient Channel must be between 1 and 160.", parent=self)
+            return
+        try:
+            if float(self.table_hz_entry.get()) <= 0 or float(self.plot_hz_entry.get()) <= 0: raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Refresh rates must be positive numbers.", parent=self)
+            return
+        try:
+            if float(self.steady_window_entry.get()) <= 0 or float(self.steady_rate_entry.get()) <= 0: raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Steady window and rate must be positive numbers.", parent=self)
+            return
+        profile, overrides, autozero = self.speed_settings()
+        _, errors = scan_speed.parse_overrides(overrides)
+        if errors:
+            messagebox.showerror("Invalid Input", "Channel NPLC/Filter:\n" + "\n".join(errors), parent=self)
+            return
+
+        self.result = {
+            'interval': self.interval_entry.get(),
+            'ambient': self.ambient_entry.get(),
+            'tc_type': self.tc_type_var.get(),
+            'table_hz': self.table_hz_entry.get().strip(),
+            'plot_hz': self.plot_hz_entry.get().strip(),
+            'steady_window_min': self.steady_window_entry.get().strip(),
+            'steady_rate': self.steady_rate_entry.get().strip(),
+            'auto_stop': self.auto_stop_var.get(),
+            'scan_channels': self.scan_channels_entry.get().strip(),
+            'speed_profile': profile,
+            'autozero': self.autozero_var.get(),
+            'speed_overrides': overrides,
+            'hw_timestamps': self.hw_timestamps_var.get()
+        }
+        self.destroy()
+
+    def on_cancel(self):
+        self.result = None
+        self.destroy()
+
+
+class ProfileDialog(tk.Toplevel):
+    """选择/命名测试配置 (profile) 的弹窗, mode 为 'load' 或 'save'"""
+
+    def __init__(self, parent, mode, profile_names, on_delete=None):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("Load Profile" if mode == 'load' else "Save Profile")
+        self.geometry("320x300+400+200")
+        self.mode = mode
+        self.on_delete = on_delete
+        self.result = None
+
+        frame = ttk.Frame(self, padding="10")
+        frame.pack(expand=True, fill="both")
+        ttk.Label(frame, text="Profiles:").pack(anchor="w")
+        self.listbox = tk.Listbox(frame, height=8, exportselection=False)
+        self.listbox.pack(fill="both", expand=True, pady=5)
+        for name in profile_names:
+            self.listbox.insert(tk.END, name)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<Double-1>", lambda e: self.on_ok())
+
+        ttk.Label(frame, text="Name:").pack(anchor="w")
+        self.name_entry = ttk.Entry(frame)
+        self.name_entry.pack(fill="x", pady=5)
+        if mode == 'load':
+            self.name_entry.config(state="readonly")
+
+        button_frame = ttk.Frame(self, padding="10")
+        button_frame.pack(fill="x")
+        ttk.Button(button_frame, text="Load" if mode == 'load' else "Save", command=self.on_ok).pack(side="right",
+                                                                                                    padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.on_cancel).pack(side="right")
+        if on_delete:
+            ttk.Button(button_frame, text="Delete", command=self.on_delete_click).pack(side="left")
+
+        self.protocol("WM_DELETE_WINDOW", self.on_cancel)
+        self.grab_set()
+        self.wait_window(self)
+
+    def on_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection: return
+        state = self.name_entry.cget("state")
+        self.name_entry.config(state="normal")
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.insert(0, self.listbox.get(selection[0]))
+        self.name_entry.config(state=state)
+
+    def on_delete_click(self):
+        selection = self.listbox.curselection()
+        if not selection: return
+        name = self.listbox.get(selection[0])
+        if messagebox.askyesno("Delete Profile", f"Delete profile '{name}'?", parent=self):
+            self.on_delete(name)
+            self.listbox.delete(selection[0])
+
+    def on_ok(self):
+        name = self.name_entry.get().strip()
+        if not name:
+            messagebox.showerror("Invalid Input", "Please select or enter a profile name.", parent=self)
+            return
+        if self.mode == 'save' and name in self.listbox.get(0, tk.END):
+            if not messagebox.askyesno("Overwrite", f"Profile '{name}' already exists. Overwrite?", parent=self):
+                return
+        self.result = name
+        self.destroy()
+
+    def on_cancel(self):
+        self.result = None
+        self.destroy()
+
+# ConnectionFrame (已支持GPIB)
+class ConnectionFrame(ttk.Frame):
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+
+        self.columnconfigure(0, weight=1)
+        self.columnconfigure(1, weight=0)  # 主内容列
+        self.columnconfigure(2, weight=1)
+
+        # 仪器选择
+        ttk.Label(self, text="Select Instrument:", font=("Helvetica", 12)).grid(row=0, column=1, pady=(20, 5))
+        self.instrument_var = tk.StringVar()
+        self.instrument_selector = ttk.Combobox(self, textvariable=self.instrument_var, state="readonly", width=35)
+        self.instrument_selector['values'] = ('Keithley 2701 (TCP/IP)', 'Keithley 2700 (GPIB)')
+        self.instrument_selector.current(0)
+        self.instrument_selector.grid(row=1, column=1, pady=5, ipady=4)
+        self.instrument_selector.bind("<<ComboboxSelected>>", self.on_instrument_select)
+
+        # 地址输入
+        self.address_label = ttk.Label(self, text="IP Address:", font=("Helvetica", 12))
+        self.address_label.grid(row=2, column=1, pady=(10, 5))
+
+        self.address_entry = ttk.Entry(self, width=38)
+        self.address_entry.grid(row=3, column=1, pady=5, ipady=4)
+
+        # 初始状态
+        self.on_instrument_select(None)  # 初始化标签和默认地址
+
+        # 通道范围选择
+        self.device_type_var = tk.StringVar(value="1-80")
+        device_selector_frame = ttk.Frame(self)
+        device_selector_frame.grid(row=4, column=1, pady=5)
+        ttk.Label(device_selector_frame, text="Channel Range:").pack(side="left", padx=5)
+        ttk.Radiobutton(device_selector_frame, text="1-80", variable=self.device_type_var, value="1-80").pack(
+            side="left")
+        ttk.Radiobutton(device_selector_frame, text="81-160", variable=self.device_type_var, value="81-160").pack(
+            side="left")
+
+        # 按钮和状态
+        button_frame = ttk.Frame(self)
+        button_frame.grid(row=5, column=1, pady=10)
+        self.connect_button = ttk.Button(button_frame, text="Connect", command=self.connect_device)
+        self.connect_button.pack(side="left", padx=5)
+        self.disconnect_button = ttk.Button(button_frame, text="Disable Connect", command=self.disconnect_device,
+                                            state="disabled")
+        self.disconnect_button.pack(side="left", padx=5)
+
+        self.status_label = ttk.Label(self, text="Status: Not Connected", foreground="red")
+        self.status_label.grid(row=6, column=1, pady=5)
+        self.device_id_label = ttk.Label(self, text="Instrument: N/A")
+        self.device_id_label.grid(row=7, column=1, pady=5)
+        self.next_button = ttk.Button(self, text="Continue to Test", state="disabled",
+                                      command=lambda: controller.show_frame("RunningFrame"))
+        self.next_button.grid(row=8, column=1, pady=20)
+
+        # 不连接仪器，打开已记录的测试查看曲线并生成报告
+        ttk.Button(self, text="Open Run...", command=self.open_run).grid(row=9, column=1, pady=(0, 10))
+
+        about_button = ttk.Button(self, text="About", command=self.open_github_link)
+        about_button.grid(row=10, column=1, pady=10)
+
+    def on_instrument_select(self, event):
+        """当用户切换仪器选项时，更新地址标签和默认值。"""
+        selection = self.instrument_var.get()
+        self.address_entry.delete(0, tk.END)
+        if "TCP/IP" in selection:
+            self.address_label.config(text="IP Address:")
+            self.address_entry.insert(0, "192.168.1.100::1394")
+        elif "GPIB" in selection:
+            self.address_label.config(text="GPIB Address (e.g., 22):")
+            self.address_entry.insert(0, "22")
+
+    def open_github_link(self):
+        url = "https://github.com/Ashes2Ashes233/TemPyScan"
+        webbrowser.open_new(url)
+
+    def connect_device(self):
+        address = self.address_entry.get()
+        device_type = self.device_type_var.get()
+        instrument_selection = self.instrument_var.get()
+
+        if not address:
+            messagebox.showerror("Error", "Address cannot be empty.")
+            return
+
+        conn_type = 'TCPIP' if 'TCP/IP' in instrument_selection else 'GPIB'
+
+        if self.controller.connect_instrument(conn_type, address, device_type):
+            self.status_label.config(text="Status: Connected", foreground="green")
+            self.device_id_label.config(text=f"Instrument: {self.controller.get_device_id()}")
+            self.connect_button.config(state="disabled")
+            self.disconnect_button.config(state="normal")
+            self.next_button.config(state="normal")
+            self.instrument_selector.config(state="disabled")
+        else:
+            self.status_label.config(text="Status: Connection Failed", foreground="red")
+            self.device_id_label.config(text="Instrument: N/A")
+            messagebox.showerror("Connection Failed", f"Could not connect to device at {address} via {conn_type}.")
+
+    def open_run(self):
+        run_dir = run_log.default_run_dir()
+        filepath = filedialog.askopenfilename(
+            title="Open Recorded Run", initialdir=run_dir if os.path.isdir(run_dir) else None,
+            filetypes=[("Recorded runs", "*.tprun *.xlsx *.csv"), ("Run logs", "*.tprun"),
+                       ("Exported data", "*.xlsx *.csv")])
+        if not filepath: return
+        self.controller.open_run(filepath)
+
+    def disconnect_device(self):
+        self.controller.disconnect_instrument()
+        self.status_label.config(text="Status: Not Connected", foreground="red")
+        self.device_id_label.config(text="Instrument: N/A")
+        self.connect_button.config(state="normal")
+        self.disconnect_button.config(state="disabled")
+        self.next_button.config(state="disabled")
+        self.instrument_selector.config(state="normal")
+
+
+# --- SettingsFrame ---
+class SettingsFrame(ttk.Frame):
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+        self.entries = {}
+        frame = ttk.Frame(self)
+        frame.pack(pady=20, padx=20)
+        ttk.Label(self, text="Report Configuration", font=("Helvetica", 16, "bold")).pack(pady=10)
+        fields = [
+            ("Test type", "Combobox", ["Normal", "Abnormal"]), ("Test name", "Entry", ""),
+            ("Operating Voltage", "Entry", ""), ("Operating Frequency", "Entry", ""),
+            ("Operating Duration", "Entry", ""),
+            ("Rating Voltage", "Entry", ""), ("Rating Frequency", "Entry", ""),
+            ("Temperature contrast with limit", "Entry", ""), ("Lab request", "Entry", ""),
+            ("Sample number", "Entry", ""), ("Model number", "Entry", ""),
+            ("Sample Characteristics", "Text", ""), ("Tester", "Entry", ""),
+            ("Equipment", "Entry", ""),
+        ]
+        for i, (label_text, widget_type, default_value) in enumerate(fields):
+            label = ttk.Label(frame, text=label_text + ":")
+            label.grid(row=i, column=0, sticky="w", padx=5, pady=5)
+            if widget_type == "Entry":
+                widget = ttk.Entry(frame, width=40)
+                widget.insert(0, default_value)
+            elif widget_type == "Combobox":
+                widget = ttk.Combobox(frame, values=default_value, width=38)
+                if default_value:
+                    widget.current(0)
+            elif widget_type == "Text":
+                widget = scrolledtext.ScrolledText(frame, width=30, height=4, wrap=tk.WORD)
+            widget.grid(row=i, column=1, sticky="ew", padx=5, pady=5)
+            self.entries[label_text] = widget
+
+        last_row = len(fields)
+
+        grouping_label = ttk.Label(frame, text="Channels per Graph:")
+        grouping_label.grid(row=last_row, column=0, sticky="w", padx=5, pady=5)
+
+        self.grouping_entry = ttk.Entry(frame, width=40)
+        self.grouping_entry.grid(row=last_row, column=1, sticky="ew", padx=5, pady=5)
+        self.grouping_entry.insert(0, "")  # 默认留空
+
+        # 报告模板 (内置 default + 模板目录中的客户模板)，打开下拉列表时重新扫描模板目录
+        ttk.Label(frame, text="Report Template:").grid(row=last_row + 1, column=0, sticky="w", padx=5, pady=5)
+        self.template_combo = ttk.Combobox(frame, state="readonly", width=38, postcommand=self.refresh_templates)
+        self.template_combo.grid(row=last_row + 1, column=1, sticky="ew", padx=5, pady=5)
+        self.template_combo.set("default")
+
+        # 报告曲线和数据导出的等间隔重采样 (间隔留空时使用原始扫描数据)
+        ttk.Label(frame, text="Resample Step/s:").grid(row=last_row + 2, column=0, sticky="w", padx=5, pady=5)
+        self.resample_entry = ttk.Entry(frame, width=40)
+        self.resample_entry.grid(row=last_row + 2, column=1, sticky="ew", padx=5, pady=5)
+        ttk.Label(frame, text="Resample Method:").grid(row=last_row + 3, column=0, sticky="w", padx=5, pady=5)
+        self.resample_combo = ttk.Combobox(frame, state="readonly", width=38, values=["linear", "mean", "max"])
+        self.resample_combo.grid(row=last_row + 3, column=1, sticky="ew", padx=5, pady=5)
+        self.resample_combo.set("linear")
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="Clear Info", command=self.clear_info).pack(side="left", padx=10)
+        ttk.Button(button_frame, text="Generate Report & Data Table", command=self.confirm_and_generate_report).pack(
+            side="left", padx=10)
+        ttk.Button(button_frame, text="Batch Reports...", command=self.confirm_and_generate_batch).pack(
+            side="left", padx=10)
+        ttk.Button(button_frame, text="Export CSV...", command=self.confirm_and_export_csv).pack(side="left", padx=10)
+        ttk.Button(button_frame, text="Back to Test", command=lambda: self.controller.show_frame("RunningFrame")).pack(
+            side="left", padx=10)
+
+    def refresh_templates(self):
+        self.template_combo['values'] = self.controller.report_templates.list_templates()
+
+    def clear_info(self):
+        for widget in self.entries.values():
+            if isinstance(widget, ttk.Entry):
+                widget.delete(0, tk.END)
+            elif isinstance(widget, ttk.Combobox):
+                widget.set('')
+            elif isinstance(widget, scrolledtext.ScrolledText):
+                widget.delete('1.0', tk.END)
+
+    def get_header_fields(self):
+        settings = {}
+        for key, widget in self.entries.items():
+            if isinstance(widget, (ttk.Entry, ttk.Combobox)):
+                settings[key] = widget.get()
+            elif isinstance(widget, scrolledtext.ScrolledText):
+                settings[key] = widget.get('1.0', tk.END).strip()
+        # 将分组数量也存入settings
+        settings['Channels per Graph'] = self.grouping_entry.get().strip()
+        settings['Report Template'] = self.template_combo.get() or "default"
+        settings['Resample Step'] = self.resample_entry.get().strip()
+        settings['Resample Method'] = self.resample_combo.get() or "linear"
+        return settings
+
+    def set_header_fields(self, fields):
+        for key, value in fields.items():
+            if key == 'Report Template':
+                self.template_combo.set(value or "default")
+                continue
+            if key == 'Resample Method':
+                self.resample_combo.set(value or "linear")
+                continue
+            widget = {'Channels per Graph': self.grouping_entry,
+                      'Resample Step': self.resample_entry}.get(key) or self.entries.get(key)
+            if widget is None: continue
+            if isinstance(widget, ttk.Combobox):
+                widget.set(value)
+            elif isinstance(widget, ttk.Entry):
+                widget.delete(0, tk.END)
+                widget.insert(0, value)
+            elif isinstance(widget, scrolledtext.ScrolledText):
+                widget.delete('1.0', tk.END)
+                widget.insert('1.0', value)
+
+    def confirm_and_generate_report(self):
+        settings = self.get_header_fields()
+
+        self.controller.settings = settings
+        print("Final report settings confirmed.")
+        self.controller.generate_final_report()
+
+    def confirm_and_export_csv(self):
+        self.controller.settings = self.get_header_fields()
+        self.controller.export_data_csv()
+
+    def confirm_and_generate_batch(self):
+        """从 CSV/XLSX 表读取多组表头 (每行一份报告)，用同一份数据批量生成报告"""
+        filepath = filedialog.askopenfilename(
+            title="Select Header Table (one report per row)",
+            filetypes=[("Header tables", "*.csv *.xlsx *.xlsm"), ("CSV", "*.csv"), ("Excel", "*.xlsx *.xlsm")])
+        if not filepath: return
+        try:
+            rows = channel_config.read_config_file(filepath)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read {filepath}:\n{e}")
+            return
+        from report_templates import parse_header_variants
+        variants, file_names = parse_header_variants(rows, list(self.entries))
+        if not variants:
+            messagebox.showwarning("Warning", f"No report rows found in {os.path.basename(filepath)}.")
+            return
+        output_dir = filedialog.askdirectory(title=f"Save {len(variants)} Reports To")
+        if not output_dir: return
+        self.controller.settings = self.get_header_fields()
+        self.controller.generate_batch_reports(variants, file_names, output_dir)
+
+
+# --- RunningFrame ---
+class RunningFrame(ttk.Frame):
+    ZOOM_DEBOUNCE_MS = 150  # 平移/缩放停止后多久重新加载数据
+
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+
+        # 存储扫描参数
+        self.scan_interval = "2"  # 默认值
+        self.ambient_channel_str = "1"  # 默认值
+        self.thermocouple_type = "K"  # 默认值
+        self.table_refresh_hz = "2"  # 表格最大刷新频率
+        self.plot_refresh_hz = "0.5"  # 曲线最大刷新频率
+        self.steady_window_min = "60"  # 热稳定判据窗口 (分钟)
+        self.steady_rate = "1.0"  # 热稳定判据速率上限 (K/h)
+        self.auto_stop = False  # 所有通道稳定后自动停止
+        self.scan_channels_str = ""  # 要扫描的通道，空表示全部已安装通道
+        self.speed_profile = "balanced"  # 扫描速度预设 (见 scan_speed.SPEED_PROFILES)
+        self.autozero = True  # 自动调零 (custom 预设时使用)
+        self.speed_overrides = ""  # 按通道分组的 NPLC/滤波覆盖
+        self.hw_timestamps = False  # 读取仪器时间戳 (每个读数的实际测量时刻)
+
+        main_pane = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
+        main_pane.pack(fill=tk.BOTH, expand=True)
+        left_frame = ttk.Frame(main_pane)
+        main_pane.add(left_frame, weight=2)
+        control_frame = ttk.Frame(left_frame)
+        control_frame.pack(fill=tk.X, pady=5, padx=5)
+
+        self.start_button = ttk.Button(control_frame, text="Start", command=self.start_test)
+        self.start_button.pack(side="left", padx=5)
+        self.stop_button = ttk.Button(control_frame, text="Stop", command=self.stop_test, state="disabled")
+        self.stop_button.pack(side="left", padx=5)
+
+        # 用一个按钮替换多个输入框
+        self.scan_settings_button = ttk.Button(control_frame, text="Scan Settings", command=self.open_scan_settings)
+        self.scan_settings_button.pack(side="left", padx=(10, 0))
+        # 查看已记录的测试时显示，关闭后回到连接界面
+        self.close_run_button = ttk.Button(control_frame, text="Close Run", command=self.controller.close_run)
+
+        # 测试配置 (通道位置/阈值、扫描参数、报告表头) 的保存与加载
+        ttk.Button(control_frame, text="Load Profile", command=self.open_load_profile).pack(side="left", padx=(10, 0))
+        ttk.Button(control_frame, text="Save Profile", command=self.open_save_profile).pack(side="left", padx=(5, 0))
+
+        # 批量导入通道位置/阈值 (剪贴板或 CSV/XLSX 夹具表)
+        ttk.Button(control_frame, text="Paste Channels", command=self.paste_channel_configs).pack(side="left",
+                                                                                                 padx=(10, 0))
+        ttk.Button(control_frame, text="Import Channels...", command=self.import_channel_configs).pack(side="left",
+                                                                                                      padx=(5, 0))
+
+        table_frame = ttk.Frame(left_frame)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        cols = ("Channel", "Location", "Current Temp (°C)", "Max Temp (°C)", "Threshold (°C)", "TC Type", "Stable")
+        self.tree = ttk.Treeview(table_frame, columns=cols, show='headings', height=25)
+        for col in cols: self.tree.heading(col, text=col)
+        self.tree.column("Channel", width=60, anchor='center')
+        self.tree.column("Location", width=150, anchor='w')
+        self.tree.column("Current Temp (°C)", width=120, anchor='center')
+        self.tree.column("Max Temp (°C)", width=120, anchor='center')
+        self.tree.column("Threshold (°C)", width=120, anchor='center')
+        self.tree.column("TC Type", width=90, anchor='center')
+        self.tree.column("Stable", width=90, anchor='center')
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.tag_configure('over_threshold', foreground='white', background='red', font=('Consolas', 10, 'bold'))
+        self.tree.tag_configure('stable', background='#d8f0d8')
+        self.tree.bind("<Double-1>", self.on_double_click)
+        self.tree.bind("<Control-v>", lambda e: self.paste_channel_configs())
+        right_pane = ttk.PanedWindow(main_pane, orient=tk.VERTICAL)
+        main_pane.add(right_pane, weight=3)
+        plot_frame = ttk.LabelFrame(right_pane, text="Graph Panel - Use toolbar to Pan/Zoom")
+        right_pane.add(plot_frame, weight=2)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        self.fig = Figure(figsize=(8, 6), dpi=100)
+        self.ax = self.fig.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
+        self.canvas_widget = self.canvas.get_tk_widget()
+        self.canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, plot_frame)
+        self.toolbar.update()
+        # 缩放驱动的数据加载状态 (见 on_xlim_changed)
+        self._plot_lines = {}
+        self._plot_origin_ts = 0
+        self._plot_home_xlim = (0, 1)
+        self._user_zoomed = False
+        self._zoom_after_id = None
+        ch_select_frame = ttk.Frame(plot_frame)
+        ch_select_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(ch_select_frame, text="Channels:").pack(side=tk.LEFT, padx=5)
+        self.plot_channels_entry = ttk.Entry(ch_select_frame)
+        self.plot_channels_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Label(ch_select_frame, text="e.g. 1-40, !5, Motor*, >limit", foreground="grey").pack(side=tk.LEFT,
+                                                                                               padx=(0, 5))
+        time_frame = ttk.Frame(plot_frame)
+        time_frame.pack(fill=tk.X, pady=(2, 5))
+        ttk.Label(time_frame, text="Time Range (s):").pack(side=tk.LEFT, padx=5)
+        ttk.Label(time_frame, text="Start:").pack(side=tk.LEFT)
+        self.start_time_entry = ttk.Entry(time_frame, width=8)
+        self.start_time_entry.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(time_frame, text="End:").pack(side=tk.LEFT)
+        self.end_time_entry = ttk.Entry(time_frame, width=8)
+        self.end_time_entry.pack(side=tk.LEFT)
+        self.update_plot_button = ttk.Button(time_frame, text="Update Plot", command=self.redraw_historical_plot)
+        self.update_plot_button.pack(side=tk.RIGHT, padx=5)
+        y_frame = ttk.Frame(plot_frame)
+        y_frame.pack(fill=tk.X, pady=(2, 5))
+        ttk.Label(y_frame, text="Y Range (°C):").pack(side=tk.LEFT, padx=5)
+        ttk.Label(y_frame, text="Min:").pack(side=tk.LEFT)
+        self.y_min_entry = ttk.Entry(y_frame, width=8)
+        self.y_min_entry.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Label(y_frame, text="Max:").pack(side=tk.LEFT)
+        self.y_max_entry = ttk.Entry(y_frame, width=8)
+        self.y_max_entry.pack(side=tk.LEFT)
+        report_build_frame = ttk.Frame(right_pane)
+        right_pane.add(report_build_frame, weight=1)
+        report_info_frame = ttk.LabelFrame(report_build_frame, text="Report Notes")
+        report_info_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        report_info_frame.columnconfigure(1, weight=1)
+        ttk.Label(report_info_frame, text="Phenomena&Result:").grid(row=0, column=0, sticky='nw', padx=5, pady=2)
+        self.phenomena_text = scrolledtext.ScrolledText(report_info_frame, height=3)
+        self.phenomena_text.grid(row=0, column=1, sticky='nsew', padx=5, pady=2)
+        ttk.Label(report_info_frame, text="Notes:").grid(row=1, column=0, sticky='nw', padx=5, pady=2)
+        self.notes_text = scrolledtext.ScrolledText(report_info_frame, height=3)
+        self.notes_text.grid(row=1, column=1, sticky='nsew', padx=5, pady=2)
+        report_info_frame.rowconfigure(0, weight=1)
+        report_info_frame.rowconfigure(1, weight=1)
+        export_button_frame = ttk.Frame(report_build_frame)
+        export_button_frame.pack(pady=10)
+        self.create_report_button = ttk.Button(export_button_frame, text="Proceed to Report Settings",
+                                               command=self.proceed_to_report)
+        self.create_report_button.pack(side="left", padx=10)
+
+        # 最近一次的温度，用于阈值修改后重新计算报警高亮
+        self._last_temps = None
+        self._last_max_temps = None
+        self.controller.get_channel_configs().subscribe(self.on_channel_config_changed)
+
+        # 表格和曲线的刷新频率与扫描周期解耦
+        scheduler = self.controller.render_scheduler
+        scheduler.add_target('table', self.render_table, float(self.table_refresh_hz))
+        scheduler.add_target('plot', self.render_plot, float(self.plot_refresh_hz))
+        self.populate_table()
+
+    # 打开弹窗的方法
+    def open_scan_settings(self):
+        dialog = ScanSettingsDialog(self, self.get_scan_settings(), predict=self.controller.predict_scan_time)
+        # dialog.wait_window() 会在弹窗关闭后才继续执行
+        if dialog.result:
+            self.set_scan_settings(dialog.result)
+            print(f"Scan settings updated: Interval={self.scan_interval}s, "
+                  f"Ambient Ch={self.ambient_channel_str}, TC Type={self.thermocouple_type}")
+
+    def get_scan_settings(self):
+        return {'interval': self.scan_interval, 'ambient': self.ambient_channel_str, 'tc_type': self.thermocouple_type,
+                'table_hz': self.table_refresh_hz, 'plot_hz': self.plot_refresh_hz,
+                'steady_window_min': self.steady_window_min, 'steady_rate': self.steady_rate,
+                'auto_stop': self.auto_stop, 'scan_channels': self.scan_channels_str,
+                'speed_profile': self.speed_profile, 'autozero': self.autozero, 'speed_overrides': self.speed_overrides,
+                'hw_timestamps': self.hw_timestamps}
+
+    def set_scan_settings(self, settings):
+        """应用扫描设置 (设置对话框或载入的配置)；刷新率不是正数时抛出 ValueError，不改变任何设置"""
+        try:
+            table_hz = float(settings.get('table_hz', self.table_refresh_hz))
+            plot_hz = float(settings.get('plot_hz', self.plot_refresh_hz))
+        except (TypeError, ValueError):
+            raise ValueError("Refresh rates must be numbers.")
+        if not (table_hz > 0 and plot_hz > 0):
+            raise ValueError(f"Refresh rates must be positive (table {table_hz:g} Hz, plot {plot_hz:g} Hz).")
+        self.scan_interval = settings.get('interval', self.scan_interval)
+        self.ambient_channel_str = settings.get('ambient', self.ambient_channel_str)
+        tc_type_changed = settings.get('tc_type', self.thermocouple_type) != self.thermocouple_type
+        self.thermocouple_type = settings.get('tc_type', self.thermocouple_type)
+        if tc_type_changed: self.refresh_tc_type_column()
+        self.table_refresh_hz = settings.get('table_hz', self.table_refresh_hz)
+        self.plot_refresh_hz = settings.get('plot_hz', self.plot_refresh_hz)
+        self.steady_window_min = settings.get('steady_window_min', self.steady_window_min)
+        self.steady_rate = settings.get('steady_rate', self.steady_rate)
+        self.auto_stop = bool(settings.get('auto_stop', self.auto_stop))
+        self.scan_channels_str = settings.get('scan_channels', self.scan_channels_str)
+        self.speed_profile = settings.get('speed_profile', self.speed_profile)
+        self.autozero = bool(settings.get('autozero', self.autozero))
+        self.speed_overrides = settings.get('speed_overrides', self.speed_overrides)
+        self.hw_timestamps = bool(settings.get('hw_timestamps', self.hw_timestamps))
+        scheduler = self.controller.render_scheduler
+        scheduler.set_rate('table', table_hz)
+        scheduler.set_rate('plot', plot_hz)
+
+    def open_load_profile(self):
+        store = self.controller.profile_store
+        dialog = ProfileDialog(self, 'load', store.list_profiles(), on_delete=store.delete)
+        if dialog.result:
+            try:
+                self.controller.load_profile(dialog.result)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Failed to load profile '{dialog.result}':\n{e}")
+
+    def open_save_profile(self):
+        store = self.controller.profile_store
+        dialog = ProfileDialog(self, 'save', store.list_profiles())
+        if dialog.result:
+            try:
+                self.controller.save_profile(dialog.result)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", f"Failed to save profile '{dialog.result}':\n{e}")
+
+    def paste_channel_configs(self):
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            messagebox.showwarning("Warning", "Clipboard is empty.")
+            return
+        self.apply_channel_rows(channel_config.read_config_text(text), "clipboard")
+
+    def import_channel_configs(self):
+        filepath = filedialog.askopenfilename(
+            title="Import Channel Locations/Thresholds",
+            filetypes=[("Fixture sheets", "*.csv *.xlsx *.xlsm"), ("CSV", "*.csv"), ("Excel", "*.xlsx *.xlsm")])
+        if not filepath: return
+        try:
+            rows = channel_config.read_config_file(filepath)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read {filepath}:\n{e}")
+            return
+        self.apply_channel_rows(rows, os.path.basename(filepath))
+
+    def apply_channel_rows(self, rows, source):
+        """一次校验全部行，再批量写入通道配置 (表格只刷新一次)"""
+        configs = self.controller.get_channel_configs()
+        updates, errors = channel_config.parse_config_rows(rows, len(configs))
+        if errors:
+            shown = "\n".join(errors[:15]) + ("\n..." if len(errors) > 15 else "")
+            if not updates:
+                messagebox.showerror("Import Failed", f"No valid rows in {source}:\n\n{shown}")
+                return
+            if not messagebox.askyesno("Import Warnings",
+                                       f"{len(errors)} row(s) in {source} are invalid:\n\n{shown}\n\n"
+                                       f"Apply the {len(updates)} valid row(s) anyway?"):
+                return
+        if not updates:
+            messagebox.showwarning("Warning", f"No channel data found in {source}.")
+            return
+        self.controller.update_channel_configs(updates)
+        print(f"Imported {len(updates)} channel configs from {source}.")
+
+    def populate_table(self):
+        """按当前通道配置重建表格，温度列置为 N/A"""
+        self.tree.delete(*self.tree.get_children())
+        configs = self.controller.get_channel_configs()
+        self._last_temps = None
+        for i in range(len(configs)):
+            self.tree.insert("", "end", iid=i,
+                             values=(i + 1, configs.locations[i], "N/A", "N/A", configs.threshold_strs[i],
+                                     self.tc_type_str(configs, i), ""))
+
+    def tc_type_str(self, configs, index):
+        """TC Type 列: 单独设置的类型，或标明为默认的扫描设置类型"""
+        return configs.tc_types[index] or f"{self.thermocouple_type} (default)"
+
+    def refresh_tc_type_column(self):
+        configs = self.controller.get_channel_configs()
+        if configs is None: return
+        for i in range(len(configs)):
+            if self.tree.exists(i): self.tree.set(i, "TC Type", self.tc_type_str(configs, i))
+
+    def start_test(self):
+        # 通道配置保存在 controller 中，这里只清空上次的温度显示
+        self.populate_table()
+
+        # 从实例变量读取参数
+        started = self.controller.start_data_acquisition(
+            int(self.scan_interval),
+            self.ambient_channel_str,
+            self.thermocouple_type,
+            steady_window_s=float(self.steady_window_min) * 60,
+            steady_rate=float(self.steady_rate),
+            auto_stop=self.auto_stop,
+            scan_channels=self.scan_channels_str,
+            speed_profile=self.speed_profile,
+            speed_overrides=self.speed_overrides,
+            autozero=self.autozero if self.speed_profile == 'custom' else None,
+            hw_timestamps=self.hw_timestamps
+        )
+        if not started: return
+
+        self.start_button.config(state="disabled")
+        self.stop_button.config(state="normal")
+
+    def on_double_click(self, event):
+        region = self.tree.identify("region", event.x, event.y)
+        if region != "cell": return
+        column_id = self.tree.identify_column(event.x)
+        column_index = int(column_id.replace('#', '')) - 1
+        if column_index not in [1, 4, 5]: return
+        row_id = self.tree.focus()
+        x, y, width, height = self.tree.bbox(row_id, column_id)
+        entry = ttk.Entry(self.tree)
+        entry.place(x=x, y=y, width=width, height=height)
+        current_value = self.tree.item(row_id, "values")[column_index]
+        if column_index == 5:
+            # 编辑的是单独设置的类型，默认类型显示为空
+            current_value = self.controller.get_channel_configs().tc_types[int(row_id)]
+        entry.insert(0, current_value)
+        entry.focus()
+        entry.bind("<FocusOut>", lambda e: entry.destroy())
+        entry.bind("<Return>", lambda e: self.save_edit(entry, row_id, column_index))
+
+    def save_edit(self, entry, row_id, column_index):
+        new_value = entry.get()
+        # 表格行由配置变更通知刷新 (on_channel_config_changed)
+        self.controller.update_channel_config(int(row_id), column_index, new_value)
+        entry.destroy()
+
+    def on_channel_config_changed(self, configs, changed_indices):
+        """通道配置变化后，只刷新受影响行的 Location/Threshold/TC Type 列和报警标记"""
+        over = configs.over_threshold(self._last_temps) if self._last_temps is not None else None
+        for i in changed_indices:
+            if not self.tree.exists(i): continue
+            self.tree.set(i, "Location", configs.locations[i])
+            self.tree.set(i, "Threshold (°C)", configs.threshold_strs[i])
+            self.tree.set(i, "TC Type", self.tc_type_str(configs, i))
+            if over is not None:
+                stable = self.controller.steady_detector.stable[i]
+                self.tree.item(i, tags=('over_threshold',) if over[i] else (('stable',) if stable else ()))
+
+    def stop_test(self):
+        self.controller.stop_data_acquisition()
+        self.start_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+
+    def enter_viewer_mode(self, run_name, final_temps, max_temps):
+        """
+        查看已记录的测试 (只读): 禁用采集相关的按钮，表格显示每通道的最后读数和最高温度，曲线显示整个测试.
+        通道位置/阈值仍可修改，只影响报告的判定。
+        """
+        for button in (self.start_button, self.stop_button, self.scan_settings_button):
+            button.config(state="disabled")
+        self.close_run_button.pack(side="left", padx=(10, 0), after=self.scan_settings_button)
+        if self.controller.thermocouple_type:
+            self.thermocouple_type = self.controller.thermocouple_type
+        self.populate_table()
+        self._last_temps = final_temps
+        self._last_max_temps = max_temps
+        self.controller.render_scheduler.mark_dirty('table')
+        self.start_time_entry.delete(0, tk.END)
+        self.end_time_entry.delete(0, tk.END)
+        self.redraw_historical_plot(title=f"Recorded Run: {run_name}")
+
+    def exit_viewer_mode(self):
+        """关闭已记录的测试: 恢复采集相关的按钮，清空表格和曲线"""
+        self.close_run_button.pack_forget()
+        self.start_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        self.scan_settings_button.config(state="normal")
+        self.populate_table()
+        self._last_max_temps = None
+        self.start_time_entry.delete(0, tk.END)
+        self.end_time_entry.delete(0, tk.END)
+        self.ax.clear()
+        self.ax.grid(True)
+        self.canvas.draw_idle()
+
+    def redraw_historical_plot(self, **kwargs):
+        self.ax.clear()
+        self.ax.grid(True)
+        self.ax.set_title(kwargs.get('title', "Temperature History"))
+        self.ax.set_xlabel("Time (seconds)")
+        self.ax.set_ylabel("Temperature (°C)")
+        channels_to_plot = kwargs.get('channels_to_plot',
+                                      self.controller.parse_channel_selection(self.plot_channels_entry.get()))
+        start_time_str = kwargs.get('start_time', self.start_time_entry.get())
+        end_time_str = kwargs.get('end_time', self.end_time_entry.get())
+        # 报告导出 (指定了 channels_to_plot) 使用原始数据；界面显示按画布像素宽度选择汇总层
+        max_points = None if 'channels_to_plot' in kwargs else max(self.canvas_widget.winfo_width(), 100)
+        # 报告曲线可按设置重采样到等间隔网格
+        sliced_data = self.controller.get_sliced_data(channels_to_plot, start_time_str, end_time_str,
+                                                      max_points=max_points, resample=kwargs.get('resample'))
+        self._plot_lines = {}
+        self._user_zoomed = False
+        if not sliced_data: self.canvas.draw(); return
+        slice_start_ts = sliced_data['actual_start_ts']
+        from matplotlib import colormaps
+        colors = colormaps['tab20'].colors
+        plotted_something = False
+        for col, i in enumerate(sliced_data['channels']):
+            x, temps_y = self._line_xy(sliced_data, col, slice_start_ts)
+            if len(x) == 0: continue
+            line, = self.ax.plot(x, temps_y, label=f"Ch {i + 1}", color=colors[i % len(colors)])
+            self._plot_lines[i] = line
+            plotted_something = True
+        y_min = kwargs.get('y_min', self.y_min_entry.get())
+        y_max = kwargs.get('y_max', self.y_max_entry.get())
+        try:
+            if y_min and y_min.strip() != '': self.ax.set_ylim(bottom=float(y_min))
+            if y_max and y_max.strip() != '': self.ax.set_ylim(top=float(y_max))
+        except ValueError:
+            pass
+        if plotted_something: self.ax.legend(loc='upper left', fontsize='small')
+        # get_xlim 会先完成自动缩放，之后的 xlim 变化都来自工具栏的平移/缩放
+        self._plot_origin_ts = slice_start_ts
+        self._plot_home_xlim = self.ax.get_xlim()
+        self.ax.set_autoscalex_on(False)
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.canvas.draw()
+
+    @staticmethod
+    def _line_xy(sliced_data, col, slice_start_ts):
+        """取出一个通道的绘图数据 (相对时间, 温度)，去掉 NaN"""
+        elapsed_time = sliced_data['timestamps'] - slice_start_ts
+        if sliced_data['level'] is None:
+            temps_y = sliced_data['values'][:, col]
+            # 有仪器时间戳时使用该通道读数自身的测量时刻
+            times = sliced_data.get('times')
+            x = elapsed_time if times is None else times[:, col] - slice_start_ts
+        else:
+            # 汇总/分箱数据: 每个桶画出 min/max 两个点，保留峰值
+            temps_y = np.column_stack((sliced_data['min'][:, col], sliced_data['max'][:, col])).ravel()
+            x = np.repeat(elapsed_time, 2)
+        valid = ~np.isnan(temps_y)
+        return x[valid], temps_y[valid]
+
+    def on_xlim_changed(self, ax):
+        """工具栏平移/缩放时触发；去抖后只重新读取可见时间窗口的数据"""
+        if not self._plot_lines: return
+        x0, x1 = ax.get_xlim()
+        home_x0, home_x1 = self._plot_home_xlim
+        self._user_zoomed = x0 > home_x0 or x1 < home_x1
+        if self._zoom_after_id is not None:
+            self.after_cancel(self._zoom_after_id)
+        self._zoom_after_id = self.after(self.ZOOM_DEBOUNCE_MS, self.reload_visible_window)
+
+    def reload_visible_window(self):
+        """按当前可见范围和画布像素宽度重新查询数据，只替换曲线数据，不改变坐标范围"""
+        self._zoom_after_id = None
+        if not self._plot_lines: return
+        x0, x1 = self.ax.get_xlim()
+        origin = self._plot_origin_ts
+        max_points = max(self.canvas_widget.winfo_width(), 100)
+        channels = list(self._plot_lines)
+        window = self.controller.get_window_data(channels, origin + x0, origin + x1, max_points=max_points)
+        for col, ch in enumerate(window['channels']):
+            x, temps_y = self._line_xy(window, col, origin)
+            self._plot_lines[ch].set_data(x, temps_y)
+        self.canvas.draw_idle()
+
+    def update_ui(self, temps, max_temps):
+        """新数据到达：只记录最新值并标记待刷新，实际刷新由 render_scheduler 按设定频率合并执行"""
+        if temps is None: return
+        self._last_temps = temps
+        self._last_max_temps = max_temps
+        self.controller.render_scheduler.mark_dirty('table', 'plot')
+
+    def render_table(self):
+        temps, max_temps = self._last_temps, self._last_max_temps
+        if temps is None: return
+        channel_configs = self.controller.get_channel_configs()
+        detector = self.controller.steady_detector
+        # 阈值向量已预先解析，报警判定一次完成
+        over = channel_configs.over_threshold(temps)
+        for i in np.flatnonzero(~np.isnan(temps)):
+            max_temp_val = max_temps[i]
+            max_temp_str = f"{max_temp_val:.2f}" if not np.isinf(max_temp_val) else "N/A"
+            # 稳定列: 已稳定显示 Yes，窗口未覆盖前留空，否则显示当前变化速率
+            if detector.stable[i]:
+                stable_str = "Yes"
+            elif detector.covered and not np.isnan(detector.slopes[i]):
+                stable_str = f"{detector.slopes[i]:+.1f} K/h"
+            else:
+                stable_str = ""
+            tag = 'over_threshold' if over[i] else ('stable' if detector.stable[i] else '')
+            self.tree.item(i, values=(
+                i + 1, channel_configs.locations[i], f"{temps[i]:.2f}", max_temp_str,
+                channel_configs.threshold_strs[i], self.tc_type_str(channel_configs, i), stable_str), tags=(tag,))
+
+    def render_plot(self):
+        if self._user_zoomed:
+            # 用户正在查看放大的窗口，只刷新该窗口的数据，不重置缩放
+            self.reload_visible_window()
+            return
+        self.redraw_historical_plot(title="Live Temperature View", start_time="", end_time="",
+                                    y_min=self.y_min_entry.get(), y_max=self.y_max_entry.get())
+
+    def proceed_to_report(self):
+        notes = {'phenomena': self.phenomena_text.get("1.0", tk.END).strip(),
+                 'notes': self.notes_text.get("1.0", tk.END).strip()}
+        channels_str = self.plot_channels_entry.get()
+        time_range = {'start': self.start_time_entry.get(), 'end': self.end_time_entry.get()}
+        self.controller.prepare_for_report(notes, channels_str, time_range)
         self.controller.show_frame("SettingsFrame")
\ No newline at end of file
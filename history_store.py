@@ -0,0 +1,649 @@
+# history_store.py
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import segment_codec
+
+# 汇总层级的时间桶宽度 (秒): 10 s, 1 min, 10 min, 1 h
+ROLLUP_BUCKETS = (10, 60, 600, 3600)
+# 等间隔重采样方式: 线性插值 / 桶内平均 / 桶内最大值
+RESAMPLE_METHODS = ('linear', 'mean', 'max')
+# 重采样网格的最大点数 (Excel 工作表的行数上限) 和最大单元格数 (网格点数 x 通道数，结果约 128 MB)，
+# 间隔过小时在分配网格之前拒绝
+MAX_RESAMPLE_POINTS = 1_048_576
+MAX_RESAMPLE_CELLS = 16_000_000
+# 线性插值按通道分块，每块展开的网格不超过该元素数 (约 16 MB)
+INTERP_CHUNK_CELLS = 2_000_000
+# 分层存储: 内存窗口之外的行至少累积这么多行才写一个磁盘段；细于该桶宽的汇总层只保留内存窗口
+SPILL_MIN_ROWS = 2048
+TRIM_LEVELS_BELOW_S = 600
+# 查询时原始数据 (行数 x 通道数) 超过该值且有覆盖的汇总层时，改用汇总层 (约 32 MB)
+MAX_RAW_CELLS = 4_000_000
+# 压缩段解码后缓存的段数 (连续的查询通常落在相邻的几个段上)
+SEGMENT_CACHE = 4
+# 每次测试的磁盘段目录 (spill_dir 下的 run_*) 中记录所属进程号的文件，用于清理程序异常退出后遗留的目录
+SPILL_PREFIX = "run_"
+SPILL_OWNER_FILE = "owner.pid"
+
+
+class _GrowableRows:
+    """按行追加的二维数组，容量不足时倍增"""
+    __slots__ = ('data', 'size')
+
+    def __init__(self, n_cols, capacity, fill, dtype=float):
+        self.data = np.full((capacity, n_cols), fill, dtype=dtype)
+        self.size = 0
+
+    def reserve(self, n_rows):
+        capacity = self.data.shape[0]
+        if self.size + n_rows <= capacity:
+            return
+        new_capacity = max(capacity * 2, self.size + n_rows)
+        grown = np.empty((new_capacity, self.data.shape[1]), dtype=self.data.dtype)
+        grown[:self.size] = self.data[:self.size]
+        self.data = grown
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class RollupLevel:
+    """
+    一个时间分辨率的增量汇总: 每个桶保存每通道的 min/max/sum/count.
+    桶以测试开始时间为原点对齐，新数据只会更新最后一个桶或追加新桶。
+    """
+    __slots__ = ('bucket_s', 'origin', 'n_channels', '_bucket_ids', '_min', '_max', '_sum', '_count', '_n',
+                 'trimmed_before')
+
+    def __init__(self, bucket_s, n_channels, origin=0.0, capacity=256):
+        self.bucket_s = float(bucket_s)
+        self.origin = origin
+        self.n_channels = n_channels
+        self._bucket_ids = np.empty(capacity, dtype=np.int64)
+        self._min = np.empty((capacity, n_channels))
+        self._max = np.empty((capacity, n_channels))
+        self._sum = np.empty((capacity, n_channels))
+        self._count = np.empty((capacity, n_channels), dtype=np.int32)
+        self._n = 0
+        self.trimmed_before = -np.inf  # 早于该时刻的桶已丢弃 (见 trim_before)
+
+    def __len__(self):
+        return self._n
+
+    def _grow(self, n_new):
+        capacity = len(self._bucket_ids)
+        if self._n + n_new <= capacity:
+            return
+        new_capacity = max(capacity * 2, self._n + n_new)
+        for name in ('_bucket_ids', '_min', '_max', '_sum', '_count'):
+            old = getattr(self, name)
+            grown = np.empty((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._n] = old[:self._n]
+            setattr(self, name, grown)
+
+    def _new_bucket(self, bucket_id):
+        self._grow(1)
+        i = self._n
+        self._bucket_ids[i] = bucket_id
+        self._min[i] = np.inf
+        self._max[i] = -np.inf
+        self._sum[i] = 0.0
+        self._count[i] = 0
+        self._n += 1
+
+    def add(self, ts, temps):
+        """追加一次扫描 (长度为 n_channels 的数组, NaN 表示无数据)"""
+        bucket_id = int((ts - self.origin) // self.bucket_s)
+        if self._n == 0 or self._bucket_ids[self._n - 1] != bucket_id:
+            self._new_bucket(bucket_id)
+        i = self._n - 1
+        valid = ~np.isnan(temps)
+        np.fmin(self._min[i], temps, out=self._min[i])
+        np.fmax(self._max[i], temps, out=self._max[i])
+        self._sum[i] += np.where(valid, temps, 0.0)
+        self._count[i] += valid
+
+    def add_block(self, timestamps, values):
+        """批量追加 (时间戳升序)，用于加载历史数据时避免逐行更新"""
+        if len(timestamps) == 0:
+            return
+        bucket_ids = ((np.asarray(timestamps) - self.origin) // self.bucket_s).astype(np.int64)
+        # 与最后一个已有桶相同的部分逐行合并
+        if self._n and bucket_ids[0] == self._bucket_ids[self._n - 1]:
+            n_same = int(np.searchsorted(bucket_ids, bucket_ids[0], side='right'))
+            for ts, row in zip(timestamps[:n_same], values[:n_same]):
+                self.add(ts, row)
+            timestamps, values, bucket_ids = timestamps[n_same:], values[n_same:], bucket_ids[n_same:]
+            if len(bucket_ids) == 0:
+                return
+        starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+        valid = ~np.isnan(values)
+        n_new = len(starts)
+        self._grow(n_new)
+        sl = slice(self._n, self._n + n_new)
+        self._bucket_ids[sl] = bucket_ids[starts]
+        self._min[sl] = np.fmin.reduceat(np.where(valid, values, np.inf), starts, axis=0)
+        self._max[sl] = np.fmax.reduceat(np.where(valid, values, -np.inf), starts, axis=0)
+        self._sum[sl] = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        self._count[sl] = np.add.reduceat(valid.astype(np.int32), starts, axis=0)
+        self._n += n_new
+
+    def trim_before(self, ts):
+        """丢弃在 ts 之前结束的桶 (分层存储时细汇总层只保留内存窗口)"""
+        n_drop = int(np.searchsorted(self._bucket_ids[:self._n], (ts - self.origin) // self.bucket_s, side='left'))
+        if n_drop == 0:
+            return
+        n_keep = self._n - n_drop
+        for name in ('_bucket_ids', '_min', '_max', '_sum', '_count'):
+            data = getattr(self, name)
+            data[:n_keep] = data[n_drop:self._n]
+        self._n = n_keep
+        self.trimmed_before = max(self.trimmed_before, ts)
+
+    def covers(self, ts):
+        """从 ts 开始的汇总数据是否完整 (没有被 trim_before 丢弃)"""
+        if self.trimmed_before == -np.inf:
+            return True
+        return (ts - self.origin) // self.bucket_s >= (self.trimmed_before - self.origin) // self.bucket_s
+
+    def bucket_range(self, t0, t1):
+        """返回与 [t0, t1] 相交的桶的行范围 [i0, i1)"""
+        ids = self._bucket_ids[:self._n]
+        i0 = int(np.searchsorted(ids, (t0 - self.origin) // self.bucket_s, side='left'))
+        i1 = int(np.searchsorted(ids, (t1 - self.origin) // self.bucket_s, side='right'))
+        return i0, i1
+
+    def window(self, channels, t0, t1):
+        """
+        取 [t0, t1] 内的汇总数据.
+        :return: (桶中心时间戳, min, max, mean)，后三者形状为 (桶数, len(channels))，无数据处为 NaN
+        """
+        i0, i1 = self.bucket_range(t0, t1)
+        count = self._count[i0:i1][:, channels]
+        empty = count == 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._sum[i0:i1][:, channels] / count
+        mins = np.where(empty, np.nan, self._min[i0:i1][:, channels])
+        maxs = np.where(empty, np.nan, self._max[i0:i1][:, channels])
+        mean[empty] = np.nan
+        centers = self.origin + (self._bucket_ids[i0:i1] + 0.5) * self.bucket_s
+        return centers, mins, maxs, mean
+
+
+class _Segment:
+    """
+    溢出到磁盘的一段历史 (全局行范围 [row0, row1)).
+    未压缩的段为 .npy 文件，values/offsets 为内存映射；压缩段 (segment_codec) 的 values 为 None，读取时整段解码。
+    """
+    __slots__ = ('row0', 'row1', 'values', 'offsets', 'path')
+
+    def __init__(self, row0, row1, values=None, offsets=None, path=None):
+        self.row0 = row0
+        self.row1 = row1
+        self.values = values
+        self.offsets = offsets
+        self.path = path
+
+
+class HistoryStore:
+    """
+    列式温度历史: 每次扫描一行 (时间戳 + n_channels 个温度, NaN 表示该通道无数据).
+    追加数据时同步维护多级汇总 (ROLLUP_BUCKETS)，缩小显示全程曲线时直接读取汇总层。
+    使用仪器时间戳时另存每个读数相对行时间戳的测量时间偏移 (float32)，第一次给出偏移时才分配；
+    原始数据查询据此返回各通道自身的时间轴，汇总层的桶宽远大于扫描时长，仍按行时间戳分桶。
+
+    分层存储 (设置 spill_dir 和 ram_window_s 时): 内存中只保留最近 ram_window_s 秒的温度行，
+    更早的行按段写入 spill_dir 下的 .npy 文件并以内存映射读取，查询接口不变，分辨率不丢失。
+    时间戳 (每行 8 字节) 始终全部留在内存中用于按时间定位；细于 TRIM_LEVELS_BELOW_S 的汇总层
+    同样只保留内存窗口内的桶，更早的时间段由粗汇总层或磁盘上的原始数据提供。
+    compress_segments 为 True 时磁盘段使用 segment_codec 的压缩格式 (温度量化为 0.01 °C)，
+    读取时整段解码并缓存最近 SEGMENT_CACHE 个段。
+    """
+
+    def __init__(self, n_channels=160, capacity=1024, rollup_buckets=ROLLUP_BUCKETS, spill_dir=None,
+                 ram_window_s=None, compress_segments=False):
+        self.n_channels = n_channels
+        self.rollup_buckets = tuple(rollup_buckets)
+        self._capacity = capacity
+        self.spill_dir = spill_dir
+        self.ram_window_s = ram_window_s
+        self.compress_segments = compress_segments
+        self._segments = []
+        self._decoded = {}  # 段起始行 -> 解码后的 (values, offsets)
+        self._spill_path = None
+        self.clear()
+
+    def configure_spill(self, spill_dir, ram_window_s):
+        """设置分层存储 (下一次 clear 后的数据生效)；spill_dir 为 None 时全部数据留在内存中"""
+        self.spill_dir = spill_dir
+        self.ram_window_s = ram_window_s
+
+    def clear(self, origin=None):
+        self._remove_segments()
+        self._ts = np.empty(self._capacity)
+        self._rows = _GrowableRows(self.n_channels, self._capacity, np.nan)
+        self._offsets = None
+        self._has_offsets = False
+        self._spilled = 0  # 已写入磁盘段的行数 (内存中的第 0 行对应全局第 _spilled 行)
+        self.sample_counts = np.zeros(self.n_channels, dtype=np.int64)
+        self.origin = origin
+        self.rollups = []
+
+    def close(self):
+        """删除本次测试的磁盘段 (程序退出时调用)"""
+        self._remove_segments()
+
+    def _remove_segments(self):
+        # 先释放内存映射，Windows 上被映射的文件无法删除
+        for segment in self._segments:
+            segment.values = segment.offsets = None
+        self._segments = []
+        self._decoded = {}
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+    def _ensure_rollups(self, first_ts):
+        if self.origin is None:
+            self.origin = first_ts
+        if not self.rollups:
+            self.rollups = [RollupLevel(b, self.n_channels, self.origin) for b in self.rollup_buckets]
+
+    def __len__(self):
+        return self._spilled + self._rows.size
+
+    @property
+    def timestamps(self):
+        return self._ts[:len(self)]
+
+    @property
+    def values(self):
+        """全部温度行；有磁盘段时会把整个历史读入内存，长时间测试请用 read_values 按范围和通道读取"""
+        return self.read_values()
+
+    @property
+    def offsets(self):
+        """每个读数相对行时间戳的测量时间偏移 (秒)，没有记录仪器时间戳时为 None"""
+        return self._read('offsets', 0, len(self)) if self._has_offsets else None
+
+    @property
+    def spilled_rows(self):
+        return self._spilled
+
+    def read_values(self, i0=0, i1=None, channels=None):
+        """读取行范围 [i0, i1) 的温度 (channels 为 None 时读取全部通道)，跨越磁盘段和内存"""
+        return self._read('values', i0, len(self) if i1 is None else i1, channels)
+
+    def read_offsets(self, i0=0, i1=None, channels=None):
+        """读取行范围 [i0, i1) 的时间偏移，没有记录仪器时间戳时为 None"""
+        if not self._has_offsets:
+            return None
+        return self._read('offsets', i0, len(self) if i1 is None else i1, channels)
+
+    def _read(self, field, i0, i1, channels=None):
+        i0, i1 = max(i0, 0), min(i1, len(self))
+        cols = slice(None) if channels is None else channels
+        parts = []
+        for segment in self._segments:
+            if segment.row1 <= i0 or segment.row0 >= i1:
+                continue
+            a, b = max(i0, segment.row0) - segment.row0, min(i1, segment.row1) - segment.row0
+            source = self._segment_arrays(segment)[0 if field == 'values' else 1]
+            parts.append(source[a:b][:, cols] if source is not None else
+                         np.zeros((b - a, self.n_channels), dtype=np.float32)[:, cols])
+        r0 = max(i0, self._spilled)
+        if r0 < i1:
+            a, b = r0 - self._spilled, i1 - self._spilled
+            source = self._rows if field == 'values' else self._offsets
+            parts.append(source.data[a:b][:, cols] if source is not None else
+                         np.zeros((b - a, self.n_channels), dtype=np.float32)[:, cols])
+        if not parts:
+            n_cols = self.n_channels if channels is None else len(channels)
+            return np.empty((0, n_cols), dtype=float if field == 'values' else np.float32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _segment_arrays(self, segment):
+        """段的 (values, offsets)：未压缩段直接返回内存映射，压缩段解码后缓存"""
+        if segment.path is None:
+            return segment.values, segment.offsets
+        arrays = self._decoded.get(segment.row0)
+        if arrays is None:
+            _, values, offsets = segment_codec.read_segment(segment.path)
+            if len(self._decoded) >= SEGMENT_CACHE:
+                del self._decoded[next(iter(self._decoded))]
+            arrays = self._decoded[segment.row0] = (values, offsets)
+        return arrays
+
+    def channel_times(self, channels, i0=0, i1=None):
+        """
+        行范围 [i0, i1) 内各通道读数的测量时刻，形状 (行数, len(channels))；没有时间偏移时为 None.
+        偏移未知 (NaN) 的读数按行时间戳计。
+        """
+        if not self._has_offsets:
+            return None
+        i1 = len(self) if i1 is None else i1
+        offsets = self._read('offsets', i0, i1, channels)
+        return self.timestamps[i0:i1, None] + np.nan_to_num(offsets)
+
+    def has_data(self, channel):
+        return self.sample_counts[channel] > 0
+
+    def channels_with_data(self):
+        return np.flatnonzero(self.sample_counts > 0)
+
+    def _reserve(self, n_rows):
+        self._rows.reserve(n_rows)
+        if self._offsets is not None:
+            self._offsets.reserve(n_rows)
+        total = len(self) + n_rows
+        if len(self._ts) < total:
+            grown = np.empty(max(len(self._ts) * 2, total))
+            grown[:len(self)] = self._ts[:len(self)]
+            self._ts = grown
+
+    def _store_offsets(self, sl, offsets):
+        """写入时间偏移 (sl 为内存行的范围)；第一次给出偏移时分配存储，之前的行偏移为 0"""
+        if offsets is None and self._offsets is None:
+            return
+        if self._offsets is None:
+            self._offsets = _GrowableRows(self.n_channels, self._rows.data.shape[0], 0.0, dtype=np.float32)
+            self._offsets.size = sl.start
+            self._has_offsets = True
+        self._offsets.data[sl] = 0.0 if offsets is None else offsets
+        self._offsets.size = sl.stop
+
+    def append(self, ts, temps, offsets=None):
+        """追加一次扫描 (offsets: 各通道读数相对 ts 的测量时间偏移，可选)"""
+        self.extend(np.array([ts], dtype=float), np.asarray(temps, dtype=float)[np.newaxis, :],
+                    None if offsets is None else np.asarray(offsets)[np.newaxis, :])
+
+    def extend(self, timestamps, values, offsets=None):
+        """批量追加多次扫描 (timestamps 升序, values 和可选的 offsets 形状为 (n, n_channels))"""
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if len(timestamps) == 0:
+            return
+        self._ensure_rollups(timestamps[0])
+        n = len(timestamps)
+        self._reserve(n)
+        self._ts[len(self):len(self) + n] = timestamps
+        sl = slice(self._rows.size, self._rows.size + n)
+        self._rows.data[sl] = values
+        self._store_offsets(sl, offsets)
+        self._rows.size += n
+        self.sample_counts += (~np.isnan(values)).sum(axis=0)
+        for level in self.rollups:
+            if n == 1:
+                level.add(timestamps[0], values[0])
+            else:
+                level.add_block(timestamps, values)
+        self._maybe_spill()
+
+    def _maybe_spill(self):
+        """内存窗口之外的行累积到 SPILL_MIN_ROWS 行后写成一个磁盘段"""
+        if self.spill_dir is None or self.ram_window_s is None:
+            return
+        cutoff = self._ts[len(self) - 1] - self.ram_window_s
+        n_old = int(np.searchsorted(self._ts[self._spilled:len(self)], cutoff, side='left'))
+        if n_old < SPILL_MIN_ROWS:
+            return
+        try:
+            self._spill(n_old)
+        except OSError as e:
+            # 磁盘写入失败时数据继续留在内存中，不影响采集
+            print(f"历史数据写入磁盘失败，继续保存在内存中: {e}")
+            return
+        for level in self.rollups:
+            if level.bucket_s < TRIM_LEVELS_BELOW_S:
+                level.trim_before(cutoff)
+
+    def _spill(self, n):
+        if self._spill_path is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._spill_path = tempfile.mkdtemp(prefix=SPILL_PREFIX, dir=self.spill_dir)
+            with open(os.path.join(self._spill_path, SPILL_OWNER_FILE), "w") as f:
+                f.write(str(os.getpid()))
+        base = os.path.join(self._spill_path, f"segment_{len(self._segments):05d}")
+        offsets = self._offsets.data[:n] if self._offsets is not None else None
+        if self.compress_segments:
+            path = base + segment_codec.SEGMENT_EXT
+            segment_codec.write_segment(path, self._ts[self._spilled:self._spilled + n], self._rows.data[:n], offsets)
+            segment = _Segment(self._spilled, self._spilled + n, path=path)
+        else:
+            np.save(base + "_values.npy", self._rows.data[:n])
+            values = np.load(base + "_values.npy", mmap_mode='r')
+            if offsets is not None:
+                np.save(base + "_offsets.npy", offsets)
+                offsets = np.load(base + "_offsets.npy", mmap_mode='r')
+            segment = _Segment(self._spilled, self._spilled + n, values, offsets)
+        self._segments.append(segment)
+        # 内存中剩余的行移到开头
+        rest = self._rows.size - n
+        self._rows.data[:rest] = self._rows.data[n:self._rows.size]
+        self._rows.size = rest
+        if self._offsets is not None:
+            self._offsets.data[:rest] = self._offsets.data[n:self._offsets.size]
+            self._offsets.size = rest
+        self._spilled += n
+
+    def nearest_index(self, ts):
+        """与目标时间戳最接近的行号"""
+        timestamps = self.timestamps
+        i = int(np.searchsorted(timestamps, ts))
+        if i <= 0:
+            return 0
+        if i >= len(timestamps):
+            return len(timestamps) - 1
+        return i if timestamps[i] - ts < ts - timestamps[i - 1] else i - 1
+
+    def index_range(self, t0, t1):
+        """[t0, t1] 内原始数据的行范围 [i0, i1)"""
+        timestamps = self.timestamps
+        return int(np.searchsorted(timestamps, t0, side='left')), int(np.searchsorted(timestamps, t1, side='right'))
+
+    def choose_level(self, t0, t1, max_points, n_channels=1):
+        """
+        为可见范围和像素宽度选择最粗的汇总层.
+        桶数不少于 max_points 才算满足分辨率；原始点数已足够少时返回 None (使用原始数据)。
+        只考虑覆盖 t0 的汇总层 (细汇总层在分层存储时只保留内存窗口)；没有满足分辨率的层
+        且原始数据过多 (行数 x 通道数 > MAX_RAW_CELLS) 时，使用覆盖 t0 的最细汇总层，避免从磁盘读入大量原始数据。
+        """
+        if not max_points or not self.rollups:
+            return None
+        i0, i1 = self.index_range(t0, t1)
+        n_raw = i1 - i0
+        if n_raw <= 2 * max_points:
+            return None
+        covering = [level for level in self.rollups if level.covers(t0)]
+        for level in reversed(covering):
+            n_buckets = (t1 - t0) / level.bucket_s
+            if n_buckets >= max_points and n_buckets < n_raw:
+                return level
+        if covering and n_raw * n_channels > MAX_RAW_CELLS:
+            return covering[0]
+        return None
+
+    def query(self, channels, t0, t1, max_points=None):
+        """
+        读取 [t0, t1] 内指定通道的数据.
+        :param max_points: 目标像素宽度；给出时自动选择合适的汇总层，或对原始数据按像素分箱
+        :return: dict(timestamps, values, min, max, level, times)，level 为 None 时为原始数据，否则为桶宽度 (秒)；
+                 times 为原始数据各通道的测量时刻 (见 channel_times)，汇总数据或没有时间偏移时为 None
+        """
+        level = self.choose_level(t0, t1, max_points, len(channels))
+        if level is not None:
+            centers, mins, maxs, mean = level.window(channels, t0, t1)
+            return {'timestamps': centers, 'values': mean, 'min': mins, 'max': maxs, 'level': level.bucket_s,
+                    'times': None}
+        i0, i1 = self.index_range(t0, t1)
+        timestamps = self.timestamps[i0:i1]
+        values = self.read_values(i0, i1, channels)
+        if max_points and len(timestamps) > 2 * max_points:
+            return decimate_minmax(timestamps, values, max_points)
+        return {'timestamps': timestamps, 'values': values, 'min': values, 'max': values, 'level': None,
+                'times': self.channel_times(channels, i0, i1)}
+
+    def resample(self, channels, t0, t1, step_s, method='linear'):
+        """
+        把 [t0, t1] 内指定通道的数据重采样到以 t0 为起点、间隔 step_s 的等间隔时间网格.
+        linear: 在网格点上线性插值 (有仪器时间戳时按各通道自身的测量时刻插值)，通道首末读数之外为 NaN；
+        mean / max: 网格点 t 的值为桶 [t, t + step_s) 内读数的平均值 / 最大值，空桶为 NaN。
+        :return: 与 query 的原始数据格式相同的 dict (level 为 None，min/max 与 values 相同)
+        """
+        if method not in RESAMPLE_METHODS:
+            raise ValueError(f"未知的重采样方式: {method}")
+        if not step_s > 0:
+            raise ValueError(f"重采样间隔必须为正数: {step_s}")
+        n_points = int(max(t1 - t0, 0) // step_s) + 1
+        if n_points > MAX_RESAMPLE_POINTS or n_points * len(channels) > MAX_RESAMPLE_CELLS:
+            raise ValueError(f"重采样网格 {n_points} 点 x {len(channels)} 通道超过上限 "
+                             f"({MAX_RESAMPLE_POINTS} 点, {MAX_RESAMPLE_CELLS} 个单元格)")
+        grid = t0 + np.arange(n_points) * step_s
+        if method == 'linear':
+            # 两端各多取一行，网格边缘的点也能插值
+            i0, i1 = self.index_range(t0, t1)
+            i0, i1 = max(i0 - 1, 0), min(i1 + 1, len(self))
+            times = self.channel_times(channels, i0, i1)
+            if times is None:
+                times = self.timestamps[i0:i1]
+            values = interpolate_grid(grid, times, self.read_values(i0, i1, channels))
+        else:
+            i0, i1 = self.index_range(t0, grid[-1] + step_s)
+            values = aggregate_grid(grid, step_s, self.timestamps[i0:i1], self.read_values(i0, i1, channels), method)
+        return {'timestamps': grid, 'values': values, 'min': values, 'max': values, 'level': None, 'times': None}
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION；进程不存在时 OpenProcess 失败
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_stale_spill_dirs(spill_dir):
+    """
+    删除程序崩溃或被强制结束后遗留的磁盘段目录 (正常结束时由 HistoryStore.close 删除).
+    只删除所属进程已不存在 (或没有进程号记录) 的 run_* 目录，同时运行的其他实例的目录保留。
+    :return: 删除的目录数
+    """
+    if not spill_dir or not os.path.isdir(spill_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(spill_dir):
+        path = os.path.join(spill_dir, name)
+        if not name.startswith(SPILL_PREFIX) or not os.path.isdir(path):
+            continue
+        try:
+            with open(os.path.join(path, SPILL_OWNER_FILE)) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            pid = None
+        if pid is not None and _process_alive(pid):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += not os.path.exists(path)
+    return removed
+
+
+def interpolate_grid(grid, times, values):
+    """
+    所有通道一次 np.interp 完成的线性插值.
+    各通道的有效读数按通道号平移到互不重叠的时间段后首尾相接，网格点同样平移，
+    这样一次调用即可处理每个通道各自的 NaN 和各自的时间轴；网格 x 通道数超过 INTERP_CHUNK_CELLS 时按通道分块。
+    :param grid: 网格时间戳 (升序)
+    :param times: 读数时间，长度 n (所有通道相同) 或形状 (n, 通道数) (各通道自身的测量时刻)
+    :param values: (n, 通道数)，NaN 表示无数据
+    :return: (len(grid), 通道数)，通道首末有效读数之外为 NaN
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_cols = values.shape
+    result = np.full((len(grid), n_cols), np.nan)
+    if n_rows == 0 or n_cols == 0 or len(grid) == 0:
+        return result
+    chunk = max(1, INTERP_CHUNK_CELLS // len(grid))
+    if n_cols > chunk:
+        times = np.asarray(times, dtype=float)
+        for c0 in range(0, n_cols, chunk):
+            cols = slice(c0, c0 + chunk)
+            result[:, cols] = interpolate_grid(grid, times[:, cols] if times.ndim == 2 else times, values[:, cols])
+        return result
+    origin = grid[0]
+    x = np.broadcast_to(np.asarray(times, dtype=float).reshape(n_rows, -1) - origin, values.shape)
+    g = np.asarray(grid, dtype=float) - origin
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return result
+    # 相邻通道的时间段至少相隔一个完整跨度，插值不会跨通道
+    span = max(np.nanmax(np.where(valid, x, np.nan)), g[-1]) - min(np.nanmin(np.where(valid, x, np.nan)), g[0]) + 1.0
+    shift = np.arange(n_cols) * 2 * span
+    valid_t = valid.T
+    xs = (x.T + shift[:, None])[valid_t]
+    ys = values.T[valid_t]
+    gs = (g[None, :] + shift[:, None]).ravel()
+    result = np.interp(gs, xs, ys).reshape(n_cols, -1).T
+    first = np.where(valid, x, np.inf).min(axis=0)
+    last = np.where(valid, x, -np.inf).max(axis=0)
+    result[(g[:, None] < first) | (g[:, None] > last)] = np.nan
+    return result
+
+
+def aggregate_grid(grid, step_s, timestamps, values, method='mean'):
+    """
+    按网格桶 [t, t + step_s) 聚合读数 (mean / max)，空桶为 NaN.
+    timestamps 升序，桶号同样升序，用 reduceat 一次完成所有通道。
+    """
+    values = np.asarray(values, dtype=float)
+    result = np.full((len(grid), values.shape[1]), np.nan)
+    bucket_ids = ((np.asarray(timestamps, dtype=float) - grid[0]) // step_s).astype(np.int64)
+    keep = (bucket_ids >= 0) & (bucket_ids < len(grid))
+    bucket_ids, values = bucket_ids[keep], values[keep]
+    if len(bucket_ids) == 0:
+        return result
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    valid = ~np.isnan(values)
+    if method == 'max':
+        aggregated = np.fmax.reduceat(values, starts, axis=0)
+    else:
+        counts = np.add.reduceat(valid, starts, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            aggregated = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0) / counts
+    result[bucket_ids[starts]] = aggregated
+    return result
+
+
+def decimate_minmax(timestamps, values, n_bins):
+    """
+    原始数据按像素宽度分箱，保留每箱的 min/max/mean (与汇总层的返回格式一致).
+    用于放大后可见窗口内原始点数仍远多于像素数的情况。
+    """
+    t0, t1 = timestamps[0], timestamps[-1]
+    width = (t1 - t0) / n_bins if t1 > t0 else 1.0
+    bin_ids = np.minimum(((timestamps - t0) // width).astype(np.int64), n_bins - 1)
+    starts = np.flatnonzero(np.r_[True, bin_ids[1:] != bin_ids[:-1]])
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    empty = counts == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0) / counts
+    mins = np.fmin.reduceat(values, starts, axis=0)
+    maxs = np.fmax.reduceat(values, starts, axis=0)
+    mean[empty] = np.nan
+    centers = t0 + (bin_ids[starts] + 0.5) * width
+    return {'timestamps': centers, 'values': mean, 'min': mins, 'max': maxs, 'level': width, 'times': None}
@@ -0,0 +1,83 @@
+# lazy_imports.py
+
+import importlib
+import sys
+import threading
+import time
+
+# 模块名 -> (导入耗时秒数, 导入所在线程名)
+IMPORT_TIMES = {}
+
+# 连接界面显示后在后台预加载的模块 (按首次使用的先后排序)
+WARM_UP_MODULES = (
+    'numpy',
+    'pyvisa',
+    'instrument_controller',
+    'channel_config',
+    'history_store',
+    'steady_state',
+    'report_stats',
+    'run_catalog',
+    'acquisition_worker',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_tkagg',
+    'openpyxl',
+    'reportlab.platypus',
+    'report_generator',
+)
+
+
+def timed_import(name):
+    """导入模块并记录耗时 (已导入的模块直接返回)"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, (time.perf_counter() - start, threading.current_thread().name))
+    return module
+
+
+class LazyModule:
+    """模块代理：第一次访问属性时才真正导入，用于把重量级依赖推迟到首次使用"""
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = timed_import(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}' ({'loaded' if self._module else 'not loaded'})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def start_warm_up(modules=WARM_UP_MODULES, on_done=None):
+    """后台线程预加载模块，失败的模块留到首次使用时再报错"""
+    def run():
+        for name in modules:
+            try:
+                timed_import(name)
+            except Exception as e:
+                print(f"预加载模块 {name} 失败: {e}")
+        if on_done:
+            on_done()
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_report():
+    """按耗时排序的导入统计 (耗时包含其依赖模块)"""
+    lines = [f"  {name:<36} {seconds * 1000:8.1f} ms  [{thread}]"
+             for name, (seconds, thread) in sorted(IMPORT_TIMES.items(), key=lambda kv: -kv[1][0])]
+    return "\n".join(lines)
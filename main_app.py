@@ -1,473 +1,1070 @@
-# main_app.py
-
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
-import threading
-import time
-import queue
-import numpy as np
-from datetime import datetime
-from collections import deque
-from gui_frames import ConnectionFrame, SettingsFrame, RunningFrame
-#from instrument_controller import FakeKeithley2701 as InstrumentController
-from instrument_controller import KeithleyController as InstrumentController
-from report_generator import generate_pdf_report
-import os
-import re
-import openpyxl
-
-
-# parse_channel_selection
-def parse_channel_selection(text):
-    channels = set()
-    if not text: return []
-    tokens = re.split(r',\s*(?![^()]*\))', text.strip())
-    range_pattern = re.compile(r'\(\s*(\d+)\s*,\s*(\d+)\s*\)')
-    for token in tokens:
-        token = token.strip()
-        if not token: continue
-        match = range_pattern.fullmatch(token)
-        if match:
-            start, end = int(match.group(1)), int(match.group(2))
-            if start > end: start, end = end, start
-            for i in range(start, end + 1): channels.add(i)
-            continue
-        if token.isdigit():
-            channels.add(int(token))
-        else:
-            print(f"警告: 无法解析的通道输入 '{token}'")
-    return sorted([ch - 1 for ch in channels])
-
-
-class ThermoApp(tk.Tk):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.title("TemPyScan(Test Version)")
-        self.instrument = None
-        self.settings = {}
-        self.data_queue = queue.Queue()
-        self.data_thread = None
-        self.stop_thread = threading.Event()
-        self.is_running = False
-        self.channel_offset = 0
-        self.max_temps = np.full(160, -np.inf)
-        self.history = {i: deque() for i in range(160)}
-        self.start_time = None
-        self.stop_time = None
-        self.start_timestamp = 0
-        self.channel_configs = [{'location': '', 'threshold': ''} for i in range(160)]
-        self.report_notes = {}
-        self.report_channels_str = ""
-        self.report_time_range = {}
-        self.init = False
-        self.ambient_channel = None
-        self.ambient_start_temp = "N/A"
-        self.ambient_end_temp = "N/A"
-        container = ttk.Frame(self)
-        container.pack(side="top", fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
-        self.frames = {}
-        for F in (ConnectionFrame, SettingsFrame, RunningFrame):
-            page_name = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-        self.show_frame("ConnectionFrame")
-        self.after(100, self.process_queue)
-
-    # --- connect_instrument ---
-    def connect_instrument(self, conn_type, address, device_type):
-        """
-        连接到指定的仪器.
-        :param conn_type: 'TCPIP' 或 'GPIB'
-        :param address: IP 地址或 GPIB 地址
-        :param device_type: "1-80" 或 "81-160"
-        """
-        self.channel_offset = 0 if device_type == "1-80" else 80
-        # 实例化通用的控制器
-        self.instrument = InstrumentController(conn_type=conn_type, address=address)
-        return self.instrument.connect()
-
-    def parse_channel_selection(self, text):
-        return parse_channel_selection(text)
-
-    def generate_final_report(self):
-        running_frame = self.frames['RunningFrame']
-        channels_for_report = self.parse_channel_selection(self.report_channels_str)
-        if not channels_for_report: messagebox.showwarning("Warning", "No channels specified for the report."); return
-        sliced_data = self.get_sliced_data(channels_for_report, self.report_time_range.get('start'),
-                                           self.report_time_range.get('end'))
-        if not sliced_data or not sliced_data['history']: messagebox.showwarning("Warning",
-                                                                                 "No data found for the selected channels and time range."); return
-        filepath_pdf = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Documents", "*.pdf")],
-                                                    title="Save Report As")
-        if not filepath_pdf: return
-        filepath_excel = os.path.splitext(filepath_pdf)[0] + '.xlsx'
-        temp_image_files = []
-        plot_data_for_report = []
-        try:
-            # 实现动态分组逻辑
-            group_size_str = self.settings.get('Channels per Graph', '')
-
-            # 如果输入为空，则将所有通道画在一张图里
-            if group_size_str == '':
-                # 设置一个比最大通道数还大的数，确保所有通道都在一个组里
-                group_size = 161
-            else:
-                try:
-                    group_size = int(group_size_str)
-                    if group_size <= 0:
-                        group_size = 161  # 如果输入无效（如0或负数），也视为画一张图
-                except ValueError:
-                    messagebox.showwarning("Warning",
-                                           "Invalid 'Channels per Graph' value. Plotting all channels in one graph.")
-                    group_size = 161
-
-            valid_channels_for_report = sorted(sliced_data['history'].keys())
-            # 使用新的 group_size
-            for i in range(0, len(valid_channels_for_report), group_size):
-                channel_group = valid_channels_for_report[i: i + group_size]
-
-                # 动态生成标题
-                if len(channel_group) == 1:
-                    group_title = f"Channel: {channel_group[0] + 1}"
-                else:
-                    group_title = f"Channels: {channel_group[0] + 1} to {channel_group[-1] + 1}"
-
-                running_frame.redraw_historical_plot(
-                    channels_to_plot=channel_group,
-                    title=group_title,
-                    start_time=self.report_time_range.get('start'),
-                    end_time=self.report_time_range.get('end'),
-                    y_min=running_frame.y_min_entry.get(),
-                    y_max=running_frame.y_max_entry.get()
-                )
-                group_path = f"temp_report_group_{i}.png"
-                self.frames['RunningFrame'].fig.savefig(group_path, dpi=300)
-                temp_image_files.append(group_path)
-                plot_data_for_report.append({'title': group_title, 'path': group_path})
-
-            report_data = self.settings.copy()
-            report_data['Phenomena And Result'] = self.report_notes.get('phenomena', '')
-            report_data['Notes'] = self.report_notes.get('notes', '')
-            report_data['Start time'] = time.asctime(
-                time.localtime(self.start_timestamp + float(self.report_time_range.get('start'))))
-            report_data['Stop time'] = time.asctime(
-                time.localtime((self.start_timestamp + float(self.report_time_range.get('end')))))
-            if self.ambient_channel is not None:
-                report_data['Ambient Channel'] = str(self.ambient_channel + 1)
-            else:
-                report_data['Ambient Channel'] = "N/A"
-            report_data['Ambient Temp Start'] = self.ambient_start_temp
-            report_data['Ambient Temp Stop'] = self.ambient_end_temp
-            table_data = []
-            sliced_max_temps = sliced_data['max_temps']
-            for i, ch_index in enumerate(valid_channels_for_report):
-                config = self.channel_configs[ch_index]
-                max_temp = sliced_max_temps[ch_index]
-                threshold_str = config['threshold'].strip()
-                if threshold_str == '':
-                    status = "N/A"
-                else:
-                    try:
-                        threshold_val = float(threshold_str)
-                        status = "F" if max_temp > threshold_val else "P"
-                    except ValueError:
-                        status = "N/A"
-                table_data.append(
-                    [str(i + 1), config['location'], str(ch_index + 1),
-                     f"{max_temp:.2f}", config['threshold'], status])
-            report_data['test_data'] = table_data
-            success_pdf = generate_pdf_report(filepath_pdf, report_data, plot_data_for_report)
-            success_excel = False
-            try:
-                headers, data_rows = self.get_formatted_excel_data(channels_for_report,
-                                                                   self.report_time_range.get('start'),
-                                                                   self.report_time_range.get('end'))
-                if headers and data_rows:
-                    wb = openpyxl.Workbook()
-                    ws = wb.active
-                    ws.title = "Temperature Data"
-                    ws.append(headers)
-                    for row_data in data_rows: ws.append(row_data)
-                    wb.save(filepath_excel)
-                    success_excel = True
-            except Exception as e:
-                print(f"Failed to save Excel data: {e}")
-            if success_pdf and success_excel:
-                messagebox.showinfo("Success", f"Report and data saved to:\n{filepath_pdf}\n{filepath_excel}")
-            elif success_pdf:
-                messagebox.showwarning("Partly success", f"Report saved, data saving error.\nPDF: {filepath_pdf}")
-            else:
-                messagebox.showerror("Failed", "An error occurred.")
-        finally:
-            for img_path in temp_image_files:
-                if os.path.exists(img_path): os.remove(img_path)
-            running_frame.redraw_historical_plot()
-
-    def show_frame(self, page_name):
-        self.frames[page_name].tkraise()
-
-    def update_channel_config(self, channel_index, field_index, value):
-        key_map = {1: 'location', 4: 'threshold'}
-        key = key_map.get(field_index)
-        if key and 0 <= channel_index < len(self.channel_configs): self.channel_configs[channel_index][key] = value
-
-    def disconnect_instrument(self):
-        if self.instrument: self.instrument.close(); self.instrument = None
-
-    def get_device_id(self):
-        if self.instrument and self.instrument.connected: return self.instrument.query("*IDN?")
-        return "N/A"
-
-    def start_data_acquisition(self, interval, ambient_channel_str, thermocouple_type):
-        self.is_running = True
-        self.stop_thread.clear()
-        self.max_temps.fill(-np.inf)
-
-        for i in range(160):
-            self.history[i].clear()
-
-        self.start_time = datetime.now()
-        self.start_timestamp = time.time()
-        self.stop_time = None
-
-        try:
-            self.ambient_channel = int(ambient_channel_str) - 1
-        except (ValueError, TypeError):
-            self.ambient_channel = None
-
-        self.ambient_start_temp = "N/A"
-        self.ambient_end_temp = "N/A"
-
-        # 将用户输入的“目标周期M”直接传递给采集循环
-        self.data_thread = threading.Thread(
-            target=self._data_acquisition_loop,
-            args=(interval,),  # interval 就是 M
-            daemon=True
-        )
-        self.data_thread.start()
-
-        self.instrument.init_temperature_scan(thermocouple_type=thermocouple_type)
-
-        time.sleep(0.1)
-        self.init = True
-
-    def stop_data_acquisition(self):
-        self.is_running = False
-        self.stop_thread.set()
-        self.stop_time = datetime.now()
-        self.stop_timestamp = time.time()
-        self.init = False
-
-        # 测试停止后，检查数据量并提供降采样选项
-        # 寻找一个有数据的通道来判断数据点数量
-        first_active_channel = next((ch for ch, data in self.history.items() if data), None)
-        if first_active_channel is not None:
-            num_points = len(self.history[first_active_channel])
-            # 当数据点过多时（例如超过5000个），提示用户
-            if num_points > 5000:
-                user_choice = messagebox.askyesno(
-                    "High Data Volume",
-                    f"The test recorded {num_points} data points, which may slow down plotting and reporting.\n\n"
-                    "Do you want to downsample the data (keep every 2nd point) to improve performance?",
-                    detail="This will not affect the Max Temp values."
-                )
-                if user_choice:
-                    print("Performing downsampling...")
-                    for i in range(160):
-                        if self.history[i]:
-                            original_deque = self.history[i]
-                            # 每两个点保留一个
-                            self.history[i] = deque(list(original_deque)[::2])
-                    print("Downsampling complete.")
-
-    def _data_acquisition_loop(self, desired_period_M):
-        """
-        实现自适应间隔定时的数据采集循环。
-        :param desired_period_M: 用户期望的总周期 (秒)
-        """
-        while not self.stop_thread.is_set():
-            if self.instrument and self.instrument.connected and self.init == True:
-                try:
-                    # 1. 记录循环开始的精确时间点
-                    loop_start_time = time.time()
-
-                    # 2. 执行数据读取 (耗时为 N)
-                    raw_data = self.instrument.get_data('READ?')
-
-                    # 3. 记录数据读取完成的时间点
-                    read_time = time.time()
-
-                    if raw_data:
-                        temps_80ch = np.array([t if t is not None else np.nan for t in raw_data])
-                        if self.instrument.opt == "@101:140,201:240":
-                            temps_160ch = np.full(160, np.nan)
-                            temps_160ch[self.channel_offset: self.channel_offset + 80] = temps_80ch
-                            self.data_queue.put((read_time, temps_160ch))
-                        elif self.instrument.opt == "@101:140":
-                            temps_160ch = np.full(160, np.nan)
-                            temps_160ch[self.channel_offset: self.channel_offset + 40] = temps_80ch
-                            self.data_queue.put((read_time, temps_160ch))
-                        elif self.instrument.opt == "@201:240":
-                            temps_160ch = np.full(160, np.nan)
-                            temps_160ch[self.channel_offset + 40: self.channel_offset + 80] = temps_80ch
-                            self.data_queue.put((read_time, temps_160ch))
-
-                    # 计算并执行动态等待
-                    # 4. 计算本次扫描实际耗时 N
-                    scan_duration_N = time.time() - loop_start_time
-
-                    # 5. 计算需要等待的时间 T = M - N
-                    delay_T = desired_period_M - scan_duration_N
-
-                    # 6. 处理 N > M 的情况
-                    if delay_T < 0:
-                        print(f"警告：扫描耗时({scan_duration_N:.2f}s)已超过目标周期({desired_period_M}s)。")
-                        delay_T = 0.2  # 设置为0.2秒
-
-                    # 7. 执行等待
-                    time.sleep(delay_T)
-
-                except Exception as e:
-                    print(f"数据读取错误: {e}")
-                    time.sleep(desired_period_M)  # 发生错误时，按原周期等待
-
-    def process_queue(self):
-        try:
-            if not self.data_queue.empty():
-                read_time, temps = self.data_queue.get_nowait()
-                valid_temps_mask = ~np.isnan(temps)
-                self.max_temps[valid_temps_mask] = np.maximum(self.max_temps[valid_temps_mask],
-                                                              temps[valid_temps_mask])
-                for i in range(160):
-                    # 将环境温度的记录逻辑，移动到有效数据的判断之内
-                    if not np.isnan(temps[i]):
-                        self.history[i].append((read_time, temps[i]))
-
-                        # 只有当 temps[i] 是一个有效数字时，才执行这里的逻辑
-                        if self.ambient_channel is not None and i == self.ambient_channel:
-                            # 如果是环境通道且是第一个有效数据点，记录开始温度
-                            if self.ambient_start_temp == "N/A":
-                                self.ambient_start_temp = f"{temps[i]:.2f}"
-                            # 总是更新结束温度为最后一个有效值
-                            self.ambient_end_temp = f"{temps[i]:.2f}"
-
-                running_frame = self.frames["RunningFrame"]
-                if self.is_running:
-                    running_frame.update_ui(temps, self.max_temps)
-        finally:
-            self.after(200, self.process_queue)
-
-    def on_closing(self):
-        self.stop_thread.set()
-        if self.instrument: self.instrument.close()
-        self.destroy()
-
-    def get_channel_configs(self):
-        return self.channel_configs
-
-    def get_history(self):
-        return self.history
-
-    def get_start_timestamp(self):
-        return self.start_timestamp
-
-    def prepare_for_report(self, notes, channels_str, time_range):
-        self.report_notes = notes
-        self.report_channels_str = channels_str
-        self.report_time_range = time_range
-        """
-        ambient_channel_str = self.settings.get('Ambient Channel', '').strip()
-        if ambient_channel_str:
-            try:
-                # 输入的是通道号（1-160），转换为索引（0-159）
-                self.ambient_channel = int(ambient_channel_str) - 1
-            except ValueError:
-                self.ambient_channel = None
-        else:
-            self.ambient_channel = None
-        """
-
-    def find_closest_timestamp_index(self, timestamps, target_ts):
-        return np.argmin(np.abs(np.array(timestamps) - target_ts))
-
-    def get_sliced_data(self, channels_to_slice, start_str, end_str):
-        if self.start_timestamp == 0: return None
-        history = self.get_history()
-
-        # 寻找一个在所选通道中且有数据的通道，以确定完整时间轴
-        first_channel_with_data = next((ch for ch in channels_to_slice if ch in history and history[ch]), None)
-
-        # 如果所有选中的通道都没有数据，则直接返回None
-        if first_channel_with_data is None:
-            # 进一步检查：也许是所有通道都没有数据
-            any_data_exists = any(data for data in history.values())
-            if not any_data_exists:
-                print("No data recorded at all.")
-                return None
-            # 如果有数据但不在选中通道里，仍然需要一个时间轴来处理空时间范围的情况
-            # 随便找一个有数据的通道
-            fallback_channel = next(ch for ch, data in history.items() if data)
-            full_timestamps = [ts for ts, temp in history[fallback_channel]]
-        else:
-            full_timestamps = [ts for ts, temp in history[first_channel_with_data]]
-
-        # 如果即使回退也找不到任何时间戳（例如测试刚开始就停止）
-        if not full_timestamps:
-            return None
-
-        try:
-            # 如果输入框为空，则使用完整范围
-            start_offset = float(start_str) if start_str and start_str.strip() else 0
-            end_offset = float(end_str) if end_str and end_str.strip() else (full_timestamps[-1] - self.start_timestamp)
-        except ValueError:
-            messagebox.showerror("Error", "Invalid time range. Please enter numbers only.")
-            return None
-
-        target_start_ts = self.start_timestamp + start_offset
-        target_end_ts = self.start_timestamp + end_offset
-
-        start_idx = self.find_closest_timestamp_index(full_timestamps, target_start_ts)
-        end_idx = self.find_closest_timestamp_index(full_timestamps, target_end_ts)
-
-        if start_idx > end_idx: start_idx, end_idx = end_idx, start_idx
-
-        actual_slice_start_ts = full_timestamps[start_idx]
-        sliced_history = {}
-        sliced_max_temps = np.full(160, -np.inf)
-
-        for ch in channels_to_slice:
-            if ch in history and history[ch]:
-                # 对该通道的完整历史进行切片
-                sliced_history[ch] = list(history[ch])[start_idx: end_idx + 1]
-                if sliced_history[ch]:
-                    temps_in_slice = [temp for ts, temp in sliced_history[ch]]
-                    sliced_max_temps[ch] = max(temps_in_slice)
-
-        return {'history': sliced_history, 'max_temps': sliced_max_temps, 'actual_start_ts': actual_slice_start_ts}
-
-    def get_formatted_excel_data(self, channels_to_export, start_str, end_str):
-        sliced_data = self.get_sliced_data(channels_to_export, start_str, end_str)
-        if not sliced_data or not sliced_data['history']: return None, None
-        valid_channels = sorted(sliced_data['history'].keys())
-        headers = ["Date", "Time (s)"] + [f"Channel {i + 1}" for i in valid_channels]
-        first_valid_channel_history = sliced_data['history'][valid_channels[0]]
-        slice_start_ts = sliced_data['actual_start_ts']
-        data_map = {
-            ts: [datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'), f"{ts - slice_start_ts:.2f}"] + [None] * len(
-                valid_channels) for ts, temp in first_valid_channel_history}
-        for i, ch_index in enumerate(valid_channels):
-            col_index = i + 2
-            for timestamp, temperature in sliced_data['history'][ch_index]:
-                if timestamp in data_map: data_map[timestamp][col_index] = f"{temperature:.4f}"
-        sorted_timestamps = sorted(data_map.keys())
-        data_rows = [data_map[ts] for ts in sorted_timestamps]
-        return headers, data_rows
-
-
-if __name__ == "__main__":
-    app = ThermoApp()
-    app.protocol("WM_DELETE_WINDOW", app.on_closing)
+# main_app.py
+
+import time
+
+_STARTUP_T0 = time.perf_counter()
+
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import threading
+import multiprocessing
+import queue
+from datetime import datetime
+# 连接界面出现之前只加载 tkinter 和轻量模块；numpy/matplotlib/reportlab/openpyxl/pyvisa
+# 在首次使用时加载，或由连接界面显示后的后台预加载线程提前导入 (见 lazy_imports.WARM_UP_MODULES)
+from lazy_imports import lazy_module, start_warm_up, import_report
+from gui_frames import ConnectionFrame, SettingsFrame, RunningFrame
+from profile_store import ProfileStore
+from report_templates import ReportTemplateStore
+from render_scheduler import RenderScheduler
+import os
+
+np = lazy_module('numpy')
+report_stats = lazy_module('report_stats')
+scan_speed = lazy_module('scan_speed')
+
+APP_TITLE = "TemPyScan(Test Version)"
+# 设置为文件路径时，程序显示出第一个界面后把启动耗时写入该文件并退出
+STARTUP_PROBE_ENV = "TEMPYSCAN_STARTUP_PROBE"
+# 历史数据在内存中保留的时长 (小时)，更早的数据写入磁盘段 (见 HistoryStore 分层存储)
+HISTORY_RAM_WINDOW_H = 6
+# 打开已记录的测试时每次写入历史的行数，较早的数据可以随写入逐步溢出到磁盘
+OPEN_RUN_CHUNK_ROWS = 65536
+
+
+def parse_channel_number(text, n_channels=160):
+    """通道号 (1 起始) 转换为 0 起始的索引；为空、不是整数或超出 1..n_channels 时返回 None"""
+    try:
+        channel = int(str(text).strip()) - 1
+    except (ValueError, TypeError):
+        return None
+    return channel if 0 <= channel < n_channels else None
+
+
+class ThermoApp(tk.Tk):
+    QUEUE_POLL_MS = 100  # 数据队列轮询周期；界面实际刷新频率由 render_scheduler 控制
+    # 'process': 独立采集进程 + 共享内存 (采样定时不受界面负载影响)；'thread': 界面进程内的采集线程
+    ACQUISITION_MODE = 'process'
+    # 等待采集进程退出的时长 (秒): 停止测试时等待正在进行的 READ? 完成 (仪器超时为 20 秒)；关闭窗口时不必等满
+    ACQ_STOP_JOIN_S = 30
+    ACQ_CLOSE_JOIN_S = 3
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.title(APP_TITLE)
+        self.instrument = None
+        self.settings = {}
+        self.data_queue = queue.Queue()
+        self.data_thread = None
+        self.stop_thread = threading.Event()
+        self.is_running = False
+        self.channel_offset = 0
+        self.conn_type = None
+        self.conn_address = None
+        self.instrument_idn = ''
+        self.acq_process = None
+        self.acq_stop_event = None
+        self.acq_status_queue = None
+        self.scan_buffer = None
+        self._scan_seq = 0
+        # numpy 相关的数据结构在第一次进入测试/报告界面时创建 (_ensure_data_model)
+        self.max_temps = None
+        self.history = None
+        self.steady_detector = None
+        self.channel_selector = None
+        self.auto_stop_when_stable = False
+        self._auto_stop_pending = False
+        self.start_time = None
+        self.stop_time = None
+        self.start_timestamp = 0
+        self.channel_configs = None
+        self.profile_store = ProfileStore()
+        self.report_templates = ReportTemplateStore()
+        self._report_cache = None  # prepare_report_content 的结果，表头变化时复用
+        self.run_catalog = None
+        self.current_run_id = None
+        self.scan_interval = None
+        self.thermocouple_type = None
+        self.report_notes = {}
+        self.report_channels_str = ""
+        self.report_time_range = {}
+        self.init = False
+        self.ambient_channel = None
+        self.viewer_run_path = None  # 查看已记录的测试时为打开的文件 (见 open_run)
+        self.ambient_start_temp = "N/A"
+        self.ambient_end_temp = "N/A"
+        self.current_frame = None
+        self.render_scheduler = RenderScheduler(is_visible=self.is_running_frame_visible)
+        self.container = ttk.Frame(self)
+        self.container.pack(side="top", fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+        # 只创建连接界面，测试/报告界面在第一次使用时创建 (get_frame)
+        self.frame_classes = {F.__name__: F for F in (ConnectionFrame, SettingsFrame, RunningFrame)}
+        self.frames = {}
+        self.show_frame("ConnectionFrame")
+        self.after(100, self.process_queue)
+        self.after_idle(self._on_first_frame)
+
+    def _on_first_frame(self):
+        """连接界面显示后报告启动耗时，并在后台预加载重量级模块"""
+        self.update_idletasks()
+        elapsed_ms = (time.perf_counter() - _STARTUP_T0) * 1000
+        print(f"Startup: first frame ready after {elapsed_ms:.0f} ms (since main_app import)")
+        probe_path = os.environ.get(STARTUP_PROBE_ENV)
+        if probe_path:
+            # 启动耗时检查 (tools/startup_check.py): 写入耗时后立即退出
+            with open(probe_path, "w") as f:
+                f.write(f"{elapsed_ms:.1f}\n")
+            self.after(0, self.destroy)
+            return
+        start_warm_up(on_done=lambda: print("Module warm-up finished:\n" + import_report()))
+
+    def _ensure_data_model(self):
+        if self.history is not None: return
+        from channel_config import ChannelConfigModel
+        from history_store import HistoryStore, remove_stale_spill_dirs
+        from run_catalog import RunCatalog
+        from steady_state import SteadyStateDetector
+        from channel_selection import ChannelSelector
+        self.max_temps = np.full(160, -np.inf)
+        spill_dir = os.path.join(os.path.expanduser("~"), ".tempyscan", "history_spill")
+        # 上次异常退出 (崩溃、断电) 时遗留的磁盘段不会再被读取，启动时清理
+        removed = remove_stale_spill_dirs(spill_dir)
+        if removed:
+            print(f"Removed {removed} stale history spill folder(s) from {spill_dir}")
+        self.history = HistoryStore(160, spill_dir=spill_dir, ram_window_s=HISTORY_RAM_WINDOW_H * 3600,
+                                    compress_segments=True)
+        self.steady_detector = SteadyStateDetector(160)
+        self.channel_selector = ChannelSelector(160)
+        self.update_available_channels()
+        self.channel_configs = ChannelConfigModel(160)
+        try:
+            self.run_catalog = RunCatalog()
+        except Exception as e:
+            print(f"无法打开测试记录库: {e}")
+            self.run_catalog = None
+
+    def get_frame(self, page_name):
+        """返回界面实例，第一次访问时才创建"""
+        frame = self.frames.get(page_name)
+        if frame is None:
+            if page_name != "ConnectionFrame":
+                self._ensure_data_model()
+            frame = self.frame_classes[page_name](parent=self.container, controller=self)
+            self.frames[page_name] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
+            # 新创建的界面位于最上层，恢复当前显示的界面
+            if self.current_frame in self.frames and self.current_frame != page_name:
+                self.frames[self.current_frame].tkraise()
+        return frame
+
+    # --- connect_instrument ---
+    def connect_instrument(self, conn_type, address, device_type):
+        """
+        连接到指定的仪器.
+        :param conn_type: 'TCPIP' 或 'GPIB'
+        :param address: IP 地址或 GPIB 地址
+        :param device_type: "1-80" 或 "81-160"
+        """
+        self.channel_offset = 0 if device_type == "1-80" else 80
+        self.conn_type = conn_type
+        self.conn_address = address
+        #from instrument_controller import FakeKeithley2701 as InstrumentController
+        from instrument_controller import KeithleyController as InstrumentController
+        # 实例化通用的控制器
+        self.instrument = InstrumentController(conn_type=conn_type, address=address)
+        connected = self.instrument.connect()
+        self.instrument_idn = self.instrument.idn if connected else ''
+        self.update_available_channels()
+        return connected
+
+    def scanned_channel_mask(self):
+        """已连接仪器实际扫描的通道 (长度 160 的布尔向量)，未连接时返回 None"""
+        if not (self.instrument and self.instrument.connected): return None
+        return self.instrument.channel_map.installed_mask(self.channel_offset)
+
+    def update_available_channels(self):
+        """通道选择按仪器的实际通道表校验"""
+        if self.channel_selector is not None:
+            self.channel_selector.set_available(self.scanned_channel_mask())
+
+    def build_scan_mask(self, scan_channels, ambient_channel):
+        """
+        要扫描的全局通道 (环境通道总是参与扫描)；为空时返回 None，即扫描全部已安装通道.
+        :param ambient_channel: 0 起始的环境通道，None 表示没有环境通道
+        """
+        if not (scan_channels or "").strip():
+            return None
+        scan_mask = self.select_channels(scan_channels).mask.copy()
+        if ambient_channel is not None and 0 <= ambient_channel < len(scan_mask):
+            scan_mask[ambient_channel] = True
+        return scan_mask
+
+    def build_scan_speed(self, profile, overrides_text="", autozero=None):
+        """
+        速度预设加上自定义分组 ("1-5: nplc=0.1; Motor*: nplc=5 filter=10") 组成 ScanSpeed.
+        分组中的通道选择按通道选择语法展开为全局通道，后面的分组覆盖前面的分组。
+        :return: (ScanSpeed, 错误信息列表)
+        """
+        groups, errors = scan_speed.parse_overrides(overrides_text)
+        overrides = {}
+        for selection, params in groups:
+            channels = self.select_channels(selection).channels
+            if not channels:
+                errors.append(f"'{selection}' 没有选中任何通道")
+            for ch in channels:
+                overrides.setdefault(ch, {}).update(params)
+        return scan_speed.ScanSpeed(profile, overrides, autozero), errors
+
+    def predict_scan_time(self, scan_channels, profile, overrides_text="", autozero=None, ambient_channel_str=""):
+        """
+        按扫描通道和速度设置估算一次扫描的耗时 (秒)，用于开始测试前在设置对话框中显示.
+        未连接仪器时按默认模块配置 (两块 7708) 估算。
+        :param ambient_channel_str: 对话框中的环境通道 (1 起始)，与开始测试时一样计入扫描通道
+        :return: (预计耗时, 扫描通道数)
+        """
+        from channel_map import ChannelMap
+        modules = self.instrument.channel_map.modules if self.instrument else ['7708', '7708']
+        line_frequency = self.instrument.line_frequency if self.instrument else 50.0
+        channel_map = ChannelMap(modules)
+        ambient_channel = parse_channel_number(ambient_channel_str)
+        channel_map.select(self.build_scan_mask(scan_channels, ambient_channel), self.channel_offset)
+        speed, _ = self.build_scan_speed(profile, overrides_text, autozero)
+        return speed.predict_scan_time(channel_map, self.channel_offset, line_frequency), channel_map.sample_count
+
+    def parse_channel_selection(self, text):
+        """编译通道选择字符串 (结果按输入缓存)，返回升序的 0 起始通道号列表"""
+        return self.select_channels(text).channels
+
+    def select_channels(self, text):
+        """
+        编译通道选择字符串，返回 ChannelSelection (indices/mask 可直接用于历史矩阵索引).
+        语法见 channel_selection.parse_selection: 1-40, (1,40), !5, 位置名称, >80, >limit
+        """
+        self._ensure_data_model()
+        return self.channel_selector.select(text, self.channel_configs, self.max_temps)
+
+    def generate_final_report(self):
+        channels_for_report = self.parse_channel_selection(self.report_channels_str)
+        if not channels_for_report: messagebox.showwarning("Warning", "No channels specified for the report."); return
+        content = self.prepare_report_content(channels_for_report)
+        if content is None: messagebox.showwarning("Warning",
+                                                   "No data found for the selected channels and time range."); return
+        filepath_pdf = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Documents", "*.pdf")],
+                                                    title="Save Report As")
+        if not filepath_pdf: return
+        filepath_excel = os.path.splitext(filepath_pdf)[0] + '.xlsx'
+        success_pdf = content['run_report'].build(filepath_pdf, self.build_report_header(self.settings, content))
+        if self.run_catalog is not None and self.current_run_id is not None:
+            try:
+                self.run_catalog.update_header(self.current_run_id, self.settings)
+            except Exception as e:
+                print(f"更新测试记录库失败: {e}")
+        success_excel = self.export_report_excel(filepath_excel, channels_for_report, content)
+        if success_pdf and success_excel:
+            messagebox.showinfo("Success", f"Report and data saved to:\n{filepath_pdf}\n{filepath_excel}")
+        elif success_pdf:
+            messagebox.showwarning("Partly success", f"Report saved, data saving error.\nPDF: {filepath_pdf}")
+        else:
+            messagebox.showerror("Failed", "An error occurred.")
+
+    def export_report_excel(self, filepath_excel, channels_for_report, content):
+        """导出所选时间段的温度数据和 Summary 统计表，返回是否成功"""
+        try:
+            headers, data_rows = self.get_formatted_excel_data(channels_for_report,
+                                                               self.report_time_range.get('start'),
+                                                               self.report_time_range.get('end'),
+                                                               resample=content.get('resample'))
+            if not (headers and data_rows): return False
+            import openpyxl
+            wb = openpyxl.Workbook()
+            ws = wb.active
+            ws.title = "Temperature Data"
+            ws.append(headers)
+            for row_data in data_rows: ws.append(row_data)
+            summary = wb.create_sheet("Summary")
+            summary.append(report_stats.SUMMARY_HEADERS)
+            for row_data in self.summary_rows(content['stats'], content['channels'], content['status_codes']):
+                summary.append(row_data)
+            wb.save(filepath_excel)
+            return True
+        except Exception as e:
+            print(f"Failed to save Excel data: {e}")
+            return False
+
+    def export_data_csv(self):
+        """所选通道和时间段的温度数据导出为 CSV (与 Excel 的 Temperature Data 工作表相同，按设置重采样)"""
+        channels = self.parse_channel_selection(self.report_channels_str)
+        if not channels: messagebox.showwarning("Warning", "No channels specified for the export."); return
+        resample = self.report_resample()
+        if resample is False: return
+        headers, data_rows = self.get_formatted_excel_data(channels, self.report_time_range.get('start'),
+                                                           self.report_time_range.get('end'), resample=resample)
+        if not (headers and data_rows):
+            messagebox.showwarning("Warning", "No data found for the selected channels and time range.")
+            return
+        filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")],
+                                                title="Export Data As")
+        if not filepath: return
+        import csv
+        try:
+            with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                writer.writerows(data_rows)
+        except OSError as e:
+            messagebox.showerror("Failed", f"Could not write {filepath}:\n{e}")
+            return
+        messagebox.showinfo("Success", f"Data saved to:\n{filepath}")
+
+    def report_resample(self):
+        """
+        报告曲线和数据导出的重采样设置 (SettingsFrame 的 Resample Step/Method).
+        所选时间段和通道的网格不能超过 MAX_RESAMPLE_POINTS 点和 MAX_RESAMPLE_CELLS 个单元格，
+        避免过小的间隔在长时间测试上分配巨大的网格。
+        :return: (间隔秒数, 方式)；未设置时为 None，设置无效时提示并返回 False
+        """
+        step_str = self.settings.get('Resample Step', '').strip()
+        if not step_str: return None
+        method = self.settings.get('Resample Method') or 'linear'
+        try:
+            step = float(step_str)
+            if step <= 0: raise ValueError
+        except ValueError:
+            messagebox.showwarning("Warning", "Resample step must be a positive number of seconds.")
+            return False
+        history = self.get_history()
+        if history is not None and len(history):
+            from history_store import MAX_RESAMPLE_POINTS, MAX_RESAMPLE_CELLS
+            run_span = history.timestamps[-1] - self.start_timestamp
+            try:
+                start = float((self.report_time_range.get('start') or '').strip() or 0)
+                end = min(float((self.report_time_range.get('end') or '').strip() or run_span), run_span)
+            except ValueError:
+                start, end = 0, run_span
+            n_channels = max(len(self.parse_channel_selection(self.report_channels_str)), 1)
+            max_points = min(MAX_RESAMPLE_POINTS, MAX_RESAMPLE_CELLS // n_channels)
+            min_step = (end - start) / max(max_points - 1, 1)
+            if step < min_step:
+                messagebox.showwarning("Warning", f"Resample step {step:g} s is too small for the selected time "
+                                                  f"range. Use at least {min_step:.3g} s.")
+                return False
+        return step, method
+
+    def generate_batch_reports(self, variants, file_names, output_dir):
+        """
+        同一份数据按多组表头批量生成报告.
+        曲线图、统计和 Excel 数据只生成一次: Excel 所有报告共用一份，在并行写 PDF 之前由界面进程写出，
+        输出目录中已有同名数据表时加序号，不覆盖之前批次的数据。PDF 由多个进程并行写出。
+        :param variants: 每份报告要覆盖的表头字段 dict (其余字段沿用当前 SettingsFrame 的值)
+        :param file_names: 每份报告的文件名 (不含扩展名)，None 时按样品号/型号生成
+        """
+        from report_generator import build_reports_parallel
+        from report_templates import safe_filename
+        channels_for_report = self.parse_channel_selection(self.report_channels_str)
+        if not channels_for_report: messagebox.showwarning("Warning", "No channels specified for the report."); return
+        content = self.prepare_report_content(channels_for_report)
+        if content is None: messagebox.showwarning("Warning",
+                                                   "No data found for the selected channels and time range."); return
+        jobs, used = [], set()
+        for i, (variant, file_name) in enumerate(zip(variants, file_names)):
+            settings = dict(self.settings, **variant)
+            if not file_name:
+                parts = [settings.get('Sample number', ''), settings.get('Model number', '')]
+                file_name = "Report_" + "_".join(p for p in parts if p) if any(parts) else f"Report_{i + 1}"
+            base = safe_filename(file_name)
+            # 文件名重复时加序号，避免相互覆盖
+            name, n = base, 2
+            while name.lower() in used:
+                name, n = f"{base}_{n}", n + 1
+            used.add(name.lower())
+            jobs.append((os.path.join(output_dir, name + ".pdf"), self.build_report_header(settings, content)))
+        excel_path, n = os.path.join(output_dir, "Report_Data.xlsx"), 2
+        while os.path.exists(excel_path):
+            excel_path, n = os.path.join(output_dir, f"Report_Data_{n}.xlsx"), n + 1
+
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            start = time.perf_counter()
+            success_excel = self.export_report_excel(excel_path, channels_for_report, content)
+            results = build_reports_parallel(content['run_report'], jobs)
+            print(f"批量生成 {len(jobs)} 份报告耗时 {time.perf_counter() - start:.1f} s")
+        except Exception as e:
+            messagebox.showerror("Failed", f"Batch report generation failed:\n{e}")
+            return
+        finally:
+            self.config(cursor="")
+        failed = [os.path.basename(path) for (path, _), ok in zip(jobs, results) if not ok]
+        summary = f"{len(jobs) - len(failed)} of {len(jobs)} reports saved to:\n{output_dir}"
+        summary += f"\n\nData table: {os.path.basename(excel_path)}" if success_excel else \
+            "\n\nData table could not be saved."
+        if failed:
+            messagebox.showwarning("Partly success", summary + "\n\nFailed:\n" + "\n".join(failed[:15]))
+        else:
+            messagebox.showinfo("Success", summary)
+
+    def _report_group_size(self):
+        """每张图的通道数 (SettingsFrame 的 Channels per Graph)，为空或无效时所有通道画在一张图里"""
+        group_size_str = self.settings.get('Channels per Graph', '')
+        # 如果输入为空，则将所有通道画在一张图里
+        if group_size_str == '':
+            # 设置一个比最大通道数还大的数，确保所有通道都在一个组里
+            return 161
+        try:
+            group_size = int(group_size_str)
+            # 如果输入无效（如0或负数），也视为画一张图
+            return group_size if group_size > 0 else 161
+        except ValueError:
+            messagebox.showwarning("Warning",
+                                   "Invalid 'Channels per Graph' value. Plotting all channels in one graph.")
+            return 161
+
+    def prepare_report_content(self, channels_for_report):
+        """
+        准备报告中与表头无关的内容 (统计、数据表、300 dpi 曲线图).
+        数据、通道、时间段、分组、Y 轴范围和模板都未变化时直接复用上次的结果，
+        因此同一次测试修改表头后再次生成报告不需要重新绘图。
+        统计和 P/F 判定总是基于原始数据，重采样 (report_resample) 只用于曲线图和数据导出。
+        :return: dict(run_report, stats, channels, status_codes, sliced_data, resample)；没有数据时返回 None
+        """
+        running_frame = self.get_frame('RunningFrame')
+        group_size = self._report_group_size()
+        template = self.report_templates.get(self.settings.get('Report Template'))
+        y_min, y_max = running_frame.y_min_entry.get(), running_frame.y_max_entry.get()
+        resample = self.report_resample()
+        if resample is False: return None
+        key = (self.start_timestamp, len(self.history), tuple(channels_for_report),
+               self.report_time_range.get('start'), self.report_time_range.get('end'), group_size, y_min, y_max,
+               id(template), self.channel_configs.version, resample)
+        if self._report_cache is not None and self._report_cache['key'] == key:
+            return self._report_cache
+
+        sliced_data = self.get_sliced_data(channels_for_report, self.report_time_range.get('start'),
+                                           self.report_time_range.get('end'))
+        if not sliced_data or not sliced_data['channels']: return None
+        from report_generator import RunReport
+        from io import BytesIO
+        plot_data_for_report = []
+        try:
+            valid_channels_for_report = sorted(sliced_data['channels'])
+            for i in range(0, len(valid_channels_for_report), group_size):
+                channel_group = valid_channels_for_report[i: i + group_size]
+
+                # 动态生成标题
+                if len(channel_group) == 1:
+                    group_title = f"Channel: {channel_group[0] + 1}"
+                else:
+                    group_title = f"Channels: {channel_group[0] + 1} to {channel_group[-1] + 1}"
+
+                running_frame.redraw_historical_plot(
+                    channels_to_plot=channel_group,
+                    title=group_title,
+                    start_time=self.report_time_range.get('start'),
+                    end_time=self.report_time_range.get('end'),
+                    y_min=y_min,
+                    y_max=y_max,
+                    resample=resample
+                )
+                # 直接渲染到内存，不再写临时文件
+                buf = BytesIO()
+                running_frame.fig.savefig(buf, format='png', dpi=300)
+                plot_data_for_report.append({'title': group_title, 'image': buf.getvalue()})
+        finally:
+            running_frame.redraw_historical_plot()
+
+        stats = self.compute_report_stats(sliced_data)
+        # 阈值已在编辑时解析完毕，这里直接按向量判定 P/F
+        status_codes = self.channel_configs.status_codes(sliced_data['max_temps'])
+        test_data = self.format_stats_rows(stats, sliced_data['channels'], status_codes)
+        self._report_cache = {'key': key, 'run_report': RunReport(test_data, plot_data_for_report, template),
+                              'stats': stats, 'channels': sliced_data['channels'], 'status_codes': status_codes,
+                              'sliced_data': sliced_data, 'resample': resample}
+        return self._report_cache
+
+    def build_report_header(self, settings, content):
+        """一份报告的表头字段: SettingsFrame 字段 + 测试时间 + 环境通道/温度 + 现象与备注"""
+        stats = content['stats']
+        report_data = settings.copy()
+        report_data['Phenomena And Result'] = self.report_notes.get('phenomena', '')
+        report_data['Notes'] = self.report_notes.get('notes', '')
+        report_data['Start time'] = time.asctime(
+            time.localtime(self.start_timestamp + float(self.report_time_range.get('start') or 0)))
+        end_str = self.report_time_range.get('end')
+        end_ts = (self.start_timestamp + float(end_str)) if end_str else content['sliced_data']['timestamps'][-1]
+        report_data['Stop time'] = time.asctime(time.localtime(end_ts))
+        if self.ambient_channel is not None:
+            report_data['Ambient Channel'] = str(self.ambient_channel + 1)
+        else:
+            report_data['Ambient Channel'] = "N/A"
+        # 环境温度 T1/T2 取所选时间段内环境通道的首末有效值，没有时沿用采集时记录的值
+        report_data['Ambient Temp Start'] = (f"{stats.ambient_start:.2f}" if not np.isnan(stats.ambient_start)
+                                             else self.ambient_start_temp)
+        report_data['Ambient Temp Stop'] = (f"{stats.ambient_end:.2f}" if not np.isnan(stats.ambient_end)
+                                            else self.ambient_end_temp)
+        return report_data
+
+    def show_frame(self, page_name):
+        frame = self.get_frame(page_name)
+        self.current_frame = page_name
+        frame.tkraise()
+
+    def is_running_frame_visible(self):
+        """窗口最小化或当前不在运行界面时，不需要刷新表格和曲线"""
+        return self.current_frame == "RunningFrame" and self.state() not in ('iconic', 'withdrawn')
+
+    def update_channel_config(self, channel_index, field_index, value):
+        key = self.channel_configs.FIELD_BY_COLUMN.get(field_index)
+        if key == 'tc_type' and not self.channel_configs.parse_tc_type(value)[1]:
+            messagebox.showerror("Invalid Input", f"Unknown thermocouple type '{value}'.\n"
+                                                  "Use J, K, T, E, R, S, B or N (empty = scan setting).")
+            return
+        if key: self.channel_configs.set_field(channel_index, key, value)
+
+    def update_channel_configs(self, updates):
+        """批量更新通道配置 {通道索引: {'location': ..., 'threshold': ..., 'tc_type': ...}}"""
+        return self.channel_configs.bulk_update(updates)
+
+    def save_profile(self, name):
+        """将通道配置、扫描参数和报告表头保存为命名配置"""
+        path = self.profile_store.save(
+            name, self.channel_configs.snapshot(),
+            scan_settings=self.get_frame('RunningFrame').get_scan_settings(),
+            report_header=self.get_frame('SettingsFrame').get_header_fields())
+        print(f"Profile '{name}' saved to {path}")
+
+    def load_profile(self, name):
+        """
+        加载命名配置：通道配置一次性批量替换，表格只刷新一次.
+        扫描设置最先应用 (无效时抛出 ValueError 且不改变任何设置)，配置无效时不会只加载一半。
+        """
+        data = self.profile_store.load(name)
+        if data['scan_settings']:
+            self.get_frame('RunningFrame').set_scan_settings(data['scan_settings'])
+        self.channel_configs.replace_all(data['channels'])
+        if data['report_header']:
+            self.get_frame('SettingsFrame').set_header_fields(data['report_header'])
+        print(f"Profile '{name}' loaded.")
+
+    def disconnect_instrument(self):
+        if self.instrument: self.instrument.close(); self.instrument = None
+        self.update_available_channels()
+
+    def get_device_id(self):
+        if self.instrument and self.instrument.connected: return self.instrument.query("*IDN?")
+        return "N/A"
+
+    def start_data_acquisition(self, interval, ambient_channel_str, thermocouple_type, steady_window_s=None,
+                               steady_rate=None, auto_stop=False, scan_channels="", speed_profile=None,
+                               speed_overrides="", autozero=None, hw_timestamps=False):
+        """
+        :param steady_window_s: 热稳定判据窗口 (秒)，None 表示沿用上次设置
+        :param steady_rate: 热稳定判据速率上限 (K/h)
+        :param auto_stop: 所有在测通道 (环境通道除外) 均稳定后自动停止测试
+        :param scan_channels: 要扫描的通道 (通道选择语法)，为空时扫描全部已安装通道
+        :param speed_profile: 扫描速度预设 (fast / balanced / precise)，None 时使用仪器默认的 NPLC 1
+        :param speed_overrides: 按通道分组的自定义 NPLC/滤波，见 build_scan_speed
+        :param autozero: 自动调零 (custom 预设时使用)，None 表示使用预设值
+        :param hw_timestamps: 读取仪器时间戳，历史中记录每个读数的实际测量时刻
+        :return: 是否已开始采集 (所选通道均未安装时为 False)
+        """
+        self.is_running = True
+        self.stop_thread.clear()
+        self.max_temps.fill(-np.inf)
+
+        self.start_time = datetime.now()
+        self.start_timestamp = time.time()
+        # 汇总层的时间桶以测试开始时间为原点
+        self.history.clear(origin=self.start_timestamp)
+        self.steady_detector.reset(self.start_timestamp, steady_window_s, steady_rate)
+        self.auto_stop_when_stable = auto_stop
+        self.stop_time = None
+
+        self.ambient_channel = parse_channel_number(ambient_channel_str, self.history.n_channels)
+
+        self.ambient_start_temp = "N/A"
+        self.ambient_end_temp = "N/A"
+        self.scan_interval = interval
+        self.thermocouple_type = thermocouple_type
+        self.current_run_id = None
+
+        # 只扫描所选通道，未接线的通道不占用扫描时间
+        scan_mask = self.build_scan_mask(scan_channels, self.ambient_channel)
+        speed = None
+        if speed_profile:
+            speed, errors = self.build_scan_speed(speed_profile, speed_overrides, autozero)
+            for error in errors:
+                print(f"警告: 扫描速度设置 {error}")
+        # 每通道的热电偶类型 (未设置的通道使用 thermocouple_type)
+        tc_types = list(self.channel_configs.tc_types)
+        if self.ACQUISITION_MODE == 'process':
+            self._start_acquisition_process(interval, thermocouple_type, scan_mask, speed, tc_types, hw_timestamps)
+            return True
+        if self.instrument and self.instrument.set_scan_channels(scan_mask, self.channel_offset) == 0:
+            self.is_running = False
+            messagebox.showerror("Error", "None of the selected scan channels is installed on this instrument.")
+            return False
+
+        # 将用户输入的“目标周期M”直接传递给采集循环
+        self.data_thread = threading.Thread(
+            target=self._data_acquisition_loop,
+            args=(interval,),  # interval 就是 M
+            daemon=True
+        )
+        self.data_thread.start()
+
+        self.instrument.init_temperature_scan(thermocouple_type=thermocouple_type, speed=speed,
+                                              channel_offset=self.channel_offset, tc_types=tc_types,
+                                              timestamps=hw_timestamps)
+
+        time.sleep(0.1)
+        self.init = True
+        return True
+
+    def _start_acquisition_process(self, interval, thermocouple_type, scan_mask=None, speed=None, tc_types=None,
+                                   timestamps=False):
+        from acquisition_worker import SharedScanBuffer, acquisition_process_main
+        # 仪器连接交给采集进程独占，界面进程先断开
+        if self.instrument: self.instrument.close()
+        self.scan_buffer = SharedScanBuffer(n_channels=160, with_offsets=timestamps)
+        self._scan_seq = 0
+        self.acq_stop_event = multiprocessing.Event()
+        self.acq_status_queue = multiprocessing.Queue()
+        self.acq_process = multiprocessing.Process(
+            target=acquisition_process_main,
+            args=(self.scan_buffer.name, self.conn_type, self.conn_address, self.channel_offset, interval,
+                  thermocouple_type, self.acq_stop_event, self.acq_status_queue, scan_mask, speed, tc_types,
+                  timestamps),
+            daemon=True)
+        self.acq_process.start()
+
+    def _stop_acquisition_process(self, reconnect=True, timeout=None):
+        """
+        停止采集进程并读入共享内存中剩余的扫描.
+        :param reconnect: 之后恢复界面进程的仪器连接 (关闭窗口时为 False)
+        :param timeout: 等待进程退出的秒数，超时后强制结束；None 时为 ACQ_STOP_JOIN_S
+        """
+        if self.acq_process is None: return
+        self.acq_stop_event.set()
+        self.acq_process.join(timeout=self.ACQ_STOP_JOIN_S if timeout is None else timeout)
+        if self.acq_process.is_alive():
+            print("采集进程未能正常退出，强制结束。")
+            self.acq_process.terminate()
+            self.acq_process.join()
+        self.acq_process = None
+        self.ingest_shared_buffer()
+        self.poll_acquisition_status()
+        self.scan_buffer.close()
+        self.scan_buffer = None
+        # 恢复界面进程的仪器连接
+        if reconnect and self.instrument and not self.instrument.connected:
+            self.instrument.connect()
+
+    def stop_data_acquisition(self, reconnect=True, timeout=None):
+        """停止测试并写入记录库和运行日志；reconnect/timeout 见 _stop_acquisition_process"""
+        self.is_running = False
+        self.stop_thread.set()
+        self._stop_acquisition_process(reconnect, timeout)
+        self.stop_time = datetime.now()
+        self.stop_timestamp = time.time()
+        self.init = False
+        self.record_run_in_catalog()
+        self.save_run_log()
+
+    def record_run_in_catalog(self):
+        """测试结束时将运行信息和每通道汇总统计写入 SQLite 记录库"""
+        if self.run_catalog is None or len(self.history) == 0: return
+        from run_catalog import summarize_history
+        try:
+            # 按行块累加，磁盘段只解码一次，不必把整个历史一次读入内存
+            summary = summarize_history(self.history, self.start_timestamp, self.channel_configs.thresholds)
+            self.current_run_id = self.run_catalog.record_run(
+                started_at=self.start_timestamp, stopped_at=self.stop_timestamp,
+                header=self.get_frame('SettingsFrame').get_header_fields(),
+                instrument_idn=self.instrument_idn,
+                tc_type=self.thermocouple_type, interval_s=self.scan_interval,
+                ambient_channel=self.ambient_channel, channel_configs=self.channel_configs,
+                channel_summary=summary)
+        except Exception as e:
+            print(f"写入测试记录库失败: {e}")
+
+    def save_run_log(self):
+        """测试结束时把完整历史写入运行日志 (~/.tempyscan/runs)，之后可用 Open Run 在没有仪器的电脑上查看"""
+        if len(self.history) == 0: return
+        import run_log
+        meta = {'n_channels': self.history.n_channels, 'start_timestamp': self.start_timestamp,
+                'stop_timestamp': self.stop_timestamp, 'tc_type': self.thermocouple_type,
+                'interval_s': self.scan_interval, 'ambient_channel': self.ambient_channel,
+                'instrument_idn': self.instrument_idn,
+                'channels': {str(i): f for i, f in self.channel_configs.snapshot().items()},
+                'header': self.get_frame('SettingsFrame').get_header_fields()}
+        directory = run_log.default_run_dir()
+        path = os.path.join(directory, self.start_time.strftime('run_%Y%m%d_%H%M%S') + run_log.RUN_EXT)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            size = run_log.write_run_log(path, self.history, meta)
+            print(f"Run log saved to {path} ({size / 1e6:.1f} MB)")
+        except Exception as e:
+            print(f"写入运行日志失败: {e}")
+
+    def open_run(self, path):
+        """
+        打开已记录的测试 (运行日志或导出的 .xlsx/.csv) 用于查看和生成报告，不需要连接仪器.
+        数据逐块解码并写入历史 (较早的行随写入溢出到磁盘)；运行界面进入只读模式 (不能开始采集)。
+        :return: 是否成功
+        """
+        if self.is_running:
+            messagebox.showwarning("Warning", "Stop the running test before opening a recorded run.")
+            return False
+        self._ensure_data_model()
+        import run_log
+        try:
+            meta, blocks = run_log.load_run(path, self.history.n_channels)
+            self.history.clear(origin=meta['start_timestamp'])
+            self.max_temps.fill(-np.inf)
+            # 每通道最后一个有效读数 (表格的 Current Temp 列)
+            final_temps = np.full(self.history.n_channels, np.nan)
+            ambient_channel = meta.get('ambient_channel')
+            if not (isinstance(ambient_channel, int) and 0 <= ambient_channel < self.history.n_channels):
+                ambient_channel = None
+            ambient_start = ambient_end = "N/A"
+            for timestamps, values, offsets in blocks:
+                if len(timestamps) == 0: continue
+                for i0 in range(0, len(timestamps), OPEN_RUN_CHUNK_ROWS):
+                    i1 = i0 + OPEN_RUN_CHUNK_ROWS
+                    self.history.extend(timestamps[i0:i1], values[i0:i1],
+                                        None if offsets is None else offsets[i0:i1])
+                np.fmax(self.max_temps, np.fmax.reduce(values, axis=0, initial=-np.inf), out=self.max_temps)
+                valid = ~np.isnan(values)
+                has_data = np.flatnonzero(valid.any(axis=0))
+                last_row = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+                final_temps[has_data] = values[last_row[has_data], has_data]
+                if ambient_channel is not None:
+                    ambient = values[:, ambient_channel]
+                    ambient = ambient[~np.isnan(ambient)]
+                    if len(ambient):
+                        if ambient_start == "N/A": ambient_start = f"{ambient[0]:.2f}"
+                        ambient_end = f"{ambient[-1]:.2f}"
+        except Exception as e:
+            self.history.clear()
+            messagebox.showerror("Error", f"Failed to open {path}:\n{e}")
+            return False
+        if len(self.history) == 0:
+            messagebox.showwarning("Warning", f"No data found in {os.path.basename(path)}.")
+            return False
+        timestamps = self.history.timestamps
+        self.viewer_run_path = path
+        self.start_timestamp = meta['start_timestamp']
+        self.stop_timestamp = meta.get('stop_timestamp') or float(timestamps[-1])
+        self.start_time = datetime.fromtimestamp(self.start_timestamp)
+        self.stop_time = datetime.fromtimestamp(self.stop_timestamp)
+        self.thermocouple_type = meta.get('tc_type')
+        self.scan_interval = meta.get('interval_s')
+        self.ambient_channel = ambient_channel
+        self.ambient_start_temp, self.ambient_end_temp = ambient_start, ambient_end
+        self.current_run_id = None
+        if meta.get('channels'):
+            self.channel_configs.replace_all(meta['channels'])
+
+        # 稳定判据只取决于最后一个窗口，只把末尾一个窗口的数据 (多取一行使窗口被覆盖) 逐行送入检测器
+        self.steady_detector.reset(self.start_timestamp)
+        tail = max(int(np.searchsorted(timestamps, timestamps[-1] - self.steady_detector.window_s)) - 1, 0)
+        self.steady_detector.add_block(timestamps[tail:], self.history.read_values(tail))
+
+        if meta.get('header'):
+            self.get_frame('SettingsFrame').set_header_fields(meta['header'])
+        self.get_frame('RunningFrame').enter_viewer_mode(os.path.basename(path), final_temps, self.max_temps)
+        self.show_frame('RunningFrame')
+        self.title(f"{APP_TITLE} - {os.path.basename(path)}")
+        print(f"Opened {path}: {len(timestamps)} scans, {int(np.count_nonzero(self.history.sample_counts))} channels")
+        return True
+
+    def close_run(self):
+        """关闭 open_run 打开的测试: 清空历史和查看状态，恢复运行界面的采集按钮并回到连接界面"""
+        if self.viewer_run_path is None: return
+        print(f"Closed {self.viewer_run_path}")
+        self.viewer_run_path = None
+        self.history.clear()
+        self.steady_detector.reset()
+        self.max_temps.fill(-np.inf)
+        self.start_timestamp = 0
+        self.start_time = self.stop_time = None
+        self.ambient_start_temp = self.ambient_end_temp = "N/A"
+        self._report_cache = None
+        self.title(APP_TITLE)
+        self.get_frame('RunningFrame').exit_viewer_mode()
+        self.show_frame('ConnectionFrame')
+
+    def _data_acquisition_loop(self, desired_period_M):
+        """
+        线程模式的采集循环 (与采集进程共用 run_acquisition_loop).
+        :param desired_period_M: 用户期望的总周期 (秒)
+        """
+        from acquisition_worker import run_acquisition_loop
+        run_acquisition_loop(self.instrument, desired_period_M, self.stop_thread,
+                             lambda read_time, temps, offsets: self.data_queue.put((read_time, temps, offsets)),
+                             self.channel_offset, is_ready=lambda: self.init)
+
+    def process_queue(self):
+        try:
+            latest_temps = None
+            # 一次取完队列中积压的所有扫描，界面只按最新一次刷新
+            while True:
+                try:
+                    read_time, temps, offsets = self.data_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.ingest_block(np.array([read_time]), temps[np.newaxis, :],
+                                  None if offsets is None else offsets[np.newaxis, :])
+                latest_temps = temps
+            if self.scan_buffer is not None:
+                shared_latest = self.ingest_shared_buffer()
+                if shared_latest is not None: latest_temps = shared_latest
+                self.poll_acquisition_status()
+
+            if latest_temps is not None and self.is_running:
+                self.get_frame("RunningFrame").update_ui(latest_temps, self.max_temps)
+            self.render_scheduler.tick()
+        finally:
+            self.after(self.QUEUE_POLL_MS, self.process_queue)
+
+    def ingest_shared_buffer(self):
+        """从采集进程的共享内存读取新扫描 (零拷贝视图) 并批量写入历史，返回最新一次扫描"""
+        if self.scan_buffer is None: return None
+        first_seq, end_seq, blocks = self.scan_buffer.read_since(self._scan_seq)
+        latest_temps = None
+        for block in blocks:
+            timestamps, values, offsets = self.scan_buffer.split(block)
+            self.ingest_block(timestamps, values, offsets)
+            latest_temps = values[-1].copy()
+        if self.scan_buffer.overwritten_since(first_seq):
+            print("警告: 读取共享缓冲区期间数据被覆盖，部分扫描可能不完整。")
+        self._scan_seq = end_seq
+        return latest_temps
+
+    def poll_acquisition_status(self):
+        while self.acq_status_queue is not None:
+            try:
+                status, info = self.acq_status_queue.get_nowait()
+            except queue.Empty:
+                break
+            if status == 'ready':
+                print(f"采集进程已就绪: {info}")
+            elif status == 'error':
+                print(info)
+                if self.is_running:
+                    # 采集进程出错后会自行退出，按停止测试处理 (恢复开始按钮，已采集的数据照常记录)
+                    self.after(0, self.stop_after_acquisition_error)
+                messagebox.showerror("Acquisition Error", info)
+
+    def stop_after_acquisition_error(self):
+        if not self.is_running: return
+        self.get_frame('RunningFrame').stop_test()
+
+    def ingest_block(self, timestamps, values, offsets=None):
+        """写入一批扫描 (timestamps 长度 n, values 和可选的仪器时间偏移 offsets 形状 (n, 160))"""
+        self.history.extend(timestamps, values, offsets)
+        # fmax 忽略 NaN，未出现有效数据的通道保持 -inf
+        np.fmax(self.max_temps, np.fmax.reduce(values, axis=0), out=self.max_temps)
+
+        # 只有当环境通道的温度是一个有效数字时，才更新环境温度
+        if self.ambient_channel is not None and 0 <= self.ambient_channel < values.shape[1]:
+            ambient = values[:, self.ambient_channel]
+            ambient = ambient[~np.isnan(ambient)]
+            if len(ambient):
+                # 如果是环境通道且是第一个有效数据点，记录开始温度
+                if self.ambient_start_temp == "N/A":
+                    self.ambient_start_temp = f"{ambient[0]:.2f}"
+                # 总是更新结束温度为最后一个有效值
+                self.ambient_end_temp = f"{ambient[-1]:.2f}"
+
+        self.steady_detector.add_block(timestamps, values)
+        if self.is_running and self.auto_stop_when_stable and not self._auto_stop_pending:
+            watched = [ch for ch in self.history.channels_with_data() if ch != self.ambient_channel]
+            if self.steady_detector.all_stable(watched):
+                self._auto_stop_pending = True
+                # 不在数据处理过程中直接停止，交给事件循环执行
+                self.after(0, self.auto_stop_test)
+
+    def auto_stop_test(self):
+        """所有通道达到稳定判据后自动停止测试"""
+        self._auto_stop_pending = False
+        if not self.is_running: return
+        window_min = self.steady_detector.window_s / 60
+        print(f"所有通道已稳定 (最近 {window_min:.0f} 分钟温度变化速率 < {self.steady_detector.rate} K/h)，自动停止测试。")
+        self.get_frame('RunningFrame').stop_test()
+        messagebox.showinfo("Test Stabilised",
+                            f"All channels changed less than {self.steady_detector.rate} K/h over the last "
+                            f"{window_min:.0f} min.\nThe test was stopped automatically.")
+
+    def on_closing(self):
+        if self.is_running:
+            # 测试进行中关闭窗口: 先按停止测试处理，运行日志在删除磁盘段之前写入
+            self.stop_data_acquisition(reconnect=False, timeout=self.ACQ_CLOSE_JOIN_S)
+        self.stop_thread.set()
+        # 随后就断开仪器，不再恢复界面进程的连接
+        self._stop_acquisition_process(reconnect=False, timeout=self.ACQ_CLOSE_JOIN_S)
+        if self.instrument: self.instrument.close()
+        if self.run_catalog: self.run_catalog.close()
+        if self.history is not None: self.history.close()
+        self.destroy()
+
+    def get_channel_configs(self):
+        return self.channel_configs
+
+    def get_history(self):
+        return self.history
+
+    def get_start_timestamp(self):
+        return self.start_timestamp
+
+    def prepare_for_report(self, notes, channels_str, time_range):
+        self.report_notes = notes
+        self.report_channels_str = channels_str
+        self.report_time_range = time_range
+        """
+        ambient_channel_str = self.settings.get('Ambient Channel', '').strip()
+        if ambient_channel_str:
+            try:
+                # 输入的是通道号（1-160），转换为索引（0-159）
+                self.ambient_channel = int(ambient_channel_str) - 1
+            except ValueError:
+                self.ambient_channel = None
+        else:
+            self.ambient_channel = None
+        """
+
+    def get_sliced_data(self, channels_to_slice, start_str, end_str, max_points=None, resample=None):
+        """
+        按相对测试开始的秒数截取数据.
+        :param max_points: 目标像素宽度；给出时可能返回汇总层数据 (level 非 None)，用于绘图
+        :param resample: (间隔秒数, 方式)，给出时返回从所选起点开始的等间隔网格数据 (见 HistoryStore.resample)
+        """
+        if self.start_timestamp == 0: return None
+        history = self.get_history()
+        if len(history) == 0:
+            print("No data recorded at all.")
+            return None
+        full_timestamps = history.timestamps
+
+        try:
+            # 如果输入框为空，则使用完整范围
+            start_offset = float(start_str) if start_str and start_str.strip() else 0
+            end_offset = float(end_str) if end_str and end_str.strip() else (full_timestamps[-1] - self.start_timestamp)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid time range. Please enter numbers only.")
+            return None
+
+        if resample:
+            # 网格以输入的起点为原点，导出的 Time (s) 为整齐的间隔倍数
+            end_ts = min(self.start_timestamp + end_offset, full_timestamps[-1])
+            return self.get_window_data(channels_to_slice, self.start_timestamp + start_offset, end_ts,
+                                        resample=resample)
+
+        start_idx = history.nearest_index(self.start_timestamp + start_offset)
+        end_idx = history.nearest_index(self.start_timestamp + end_offset)
+        if start_idx > end_idx: start_idx, end_idx = end_idx, start_idx
+
+        return self.get_window_data(channels_to_slice, full_timestamps[start_idx], full_timestamps[end_idx],
+                                    max_points)
+
+    def get_window_data(self, channels, start_ts, end_ts, max_points=None, resample=None):
+        """按绝对时间戳 [start_ts, end_ts] 读取数据，只包含有记录的通道；resample 见 get_sliced_data"""
+        history = self.get_history()
+        channels = np.asarray(channels, dtype=int)
+        channels = channels[(channels >= 0) & (channels < history.n_channels)]
+        valid_channels = channels[history.sample_counts[channels] > 0].tolist()
+        if resample:
+            window = history.resample(valid_channels, start_ts, end_ts, *resample)
+        else:
+            window = history.query(valid_channels, start_ts, end_ts, max_points)
+        sliced_max_temps = np.full(160, -np.inf)
+        if valid_channels and len(window['timestamps']):
+            sliced_max_temps[valid_channels] = np.fmax.reduce(window['max'], axis=0, initial=-np.inf)
+        window.update({'channels': valid_channels, 'max_temps': sliced_max_temps, 'actual_start_ts': start_ts})
+        return window
+
+    def compute_report_stats(self, sliced_data):
+        """对 get_sliced_data 的原始数据切片计算报告统计 (列顺序与 sliced_data['channels'] 一致)"""
+        timestamps = sliced_data['timestamps']
+        ambient = None
+        history = self.get_history()
+        if self.ambient_channel is not None and 0 <= self.ambient_channel < history.n_channels and \
+                len(timestamps) and history.has_data(self.ambient_channel):
+            ambient = history.query([self.ambient_channel], timestamps[0], timestamps[-1])['values'][:, 0]
+        thresholds = self.channel_configs.thresholds[sliced_data['channels']]
+        return report_stats.compute_channel_stats(timestamps, sliced_data['values'],
+                                                  start_timestamp=self.start_timestamp, thresholds=thresholds,
+                                                  ambient=ambient, times=sliced_data.get('times'),
+                                                  # 与在线检测和自动停止使用同一判据
+                                                  steady_window_s=self.steady_detector.window_s,
+                                                  steady_rate=self.steady_detector.rate)
+
+    def format_stats_rows(self, stats, channels, status_codes):
+        """PDF 数据表的行 (列与 report_generator.DATA_TABLE_HEADERS 对应)"""
+        def fmt(value, scale=1.0):
+            return "-" if np.isnan(value) else f"{value / scale:.2f}"
+
+        configs = self.channel_configs
+        rows = []
+        for col in np.argsort(channels, kind='stable'):
+            ch_index = channels[col]
+            rows.append([str(len(rows) + 1), configs.locations[ch_index], str(ch_index + 1),
+                         fmt(stats.max_temp[col]), fmt(stats.time_of_max[col], 60.0), fmt(stats.mean_temp[col]),
+                         fmt(stats.final_temp[col]), fmt(stats.rise_over_ambient[col]),
+                         fmt(stats.steady_since[col], 60.0), configs.threshold_strs[ch_index],
+                         status_codes[ch_index]])
+        return rows
+
+    def summary_rows(self, stats, channels, status_codes):
+        """Excel Summary 工作表的行 (数值不做格式化，无数据的单元格留空)"""
+        def num(value):
+            return None if np.isnan(value) else round(float(value), 4)
+
+        configs = self.channel_configs
+        rows = []
+        for col in np.argsort(channels, kind='stable'):
+            ch_index = channels[col]
+            rows.append([ch_index + 1, configs.locations[ch_index], num(stats.max_temp[col]),
+                         num(stats.time_of_max[col]), num(stats.mean_temp[col]), num(stats.final_temp[col]),
+                         num(stats.rise_over_ambient[col]), num(stats.steady_since[col]),
+                         "Yes" if stats.stable_at_end[col] else "No", num(stats.exceed_s[col]),
+                         num(configs.thresholds[ch_index]), status_codes[ch_index]])
+        return rows
+
+    def get_formatted_excel_data(self, channels_to_export, start_str, end_str, resample=None):
+        sliced_data = self.get_sliced_data(channels_to_export, start_str, end_str, resample=resample)
+        if not sliced_data or not sliced_data['channels']: return None, None
+        valid_channels = sliced_data['channels']
+        slice_start_ts = sliced_data['actual_start_ts']
+        values = sliced_data['values']
+        times = sliced_data.get('times')
+        # 只导出所选通道中至少有一个有效值的扫描
+        has_data = ~np.isnan(values).all(axis=1)
+        data_rows = []
+        if times is None:
+            headers = ["Date", "Time (s)"] + [f"Channel {i + 1}" for i in valid_channels]
+            for ts, row in zip(sliced_data['timestamps'][has_data], values[has_data]):
+                data_rows.append([datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'),
+                                  f"{ts - slice_start_ts:.2f}"] +
+                                 [None if np.isnan(temp) else f"{temp:.4f}" for temp in row])
+            return headers, data_rows
+        # 有仪器时间戳时，每个通道的温度后面跟该读数自身的测量时刻 (相对切片起点)
+        headers = ["Date", "Time (s)"]
+        for i in valid_channels:
+            headers += [f"Channel {i + 1}", f"Channel {i + 1} Time (s)"]
+        for ts, row, row_times in zip(sliced_data['timestamps'][has_data], values[has_data], times[has_data]):
+            cells = [datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'), f"{ts - slice_start_ts:.2f}"]
+            for temp, t in zip(row, row_times):
+                cells += [None, None] if np.isnan(temp) else [f"{temp:.4f}", f"{t - slice_start_ts:.3f}"]
+            data_rows.append(cells)
+        return headers, data_rows
+
+
+if __name__ == "__main__":
+    # PyInstaller 打包后启动采集进程需要
+    multiprocessing.freeze_support()
+    app = ThermoApp()
+    app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
\ No newline at end of file
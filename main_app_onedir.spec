@@ -0,0 +1,114 @@
+# -*- mode: python ; coding: utf-8 -*-
+# 启动速度优先的 onedir 打包配置:
+#   pyinstaller main_app_onedir.spec
+# 与 main_app.spec (单文件) 的区别:
+#   - onedir: 启动时不需要把整个程序解压到临时目录
+#   - noarchive: 模块以预编译的 .pyc 文件形式存放，导入时无需从 PYZ 归档中解压
+#   - 排除未使用的 matplotlib 后端 (只用 TkAgg 和保存 PNG 的 Agg) 和 pyvisa-py 的 USB/串口后端
+#   - 不使用 UPX (UPX 压缩的 DLL 每次启动都要解压)
+# 启动耗时回归检查: python tools/startup_check.py dist/TemPyScan/TemPyScan
+
+
+# 懒加载 (lazy_imports.lazy_module / 函数内 import) 的模块，确保被打包
+hidden_imports = [
+    'numpy',
+    'channel_config',
+    'history_store',
+    'run_catalog',
+    'acquisition_worker',
+    'report_generator',
+    'instrument_controller',
+    'matplotlib.backends.backend_tkagg',
+    'matplotlib.backends.backend_agg',
+    'pyvisa_py.tcpip',
+    'pyvisa_py.gpib',
+]
+
+excluded_modules = [
+    # 未使用的 matplotlib 后端及其 GUI 工具包
+    'matplotlib.backends.backend_qt',
+    'matplotlib.backends.backend_qtagg',
+    'matplotlib.backends.backend_qtcairo',
+    'matplotlib.backends.backend_qt5',
+    'matplotlib.backends.backend_qt5agg',
+    'matplotlib.backends.backend_qt5cairo',
+    'matplotlib.backends.backend_gtk3',
+    'matplotlib.backends.backend_gtk3agg',
+    'matplotlib.backends.backend_gtk3cairo',
+    'matplotlib.backends.backend_gtk4',
+    'matplotlib.backends.backend_gtk4agg',
+    'matplotlib.backends.backend_gtk4cairo',
+    'matplotlib.backends.backend_wx',
+    'matplotlib.backends.backend_wxagg',
+    'matplotlib.backends.backend_wxcairo',
+    'matplotlib.backends.backend_macosx',
+    'matplotlib.backends.backend_webagg',
+    'matplotlib.backends.backend_webagg_core',
+    'matplotlib.backends.backend_nbagg',
+    'matplotlib.backends.backend_pgf',
+    'matplotlib.backends.backend_cairo',
+    'matplotlib.backends.backend_tkcairo',
+    'PyQt5', 'PyQt6', 'PySide2', 'PySide6', 'wx', 'gi', 'cairo',
+    'IPython', 'ipykernel', 'jupyter_client', 'tornado', 'notebook',
+    # pyvisa-py 中只用到 TCPIP 和 GPIB
+    'pyvisa_py.usb',
+    'pyvisa_py.serial',
+    'pyvisa_py.protocols.usbtmc',
+    'pyvisa_py.protocols.usbutil',
+    'pyvisa_py.protocols.usbraw',
+    'pyvisa_sim',
+    'usb',
+    'serial',
+    # 其它不需要的大型依赖
+    'tkinter.test',
+    'pytest',
+    'scipy',
+    'pandas',
+]
+
+a = Analysis(
+    ['main_app.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=hidden_imports,
+    hookspath=[],
+    hooksconfig={
+        # matplotlib 钩子只收集 TkAgg 后端
+        'matplotlib': {'backends': ['TkAgg']},
+    },
+    runtime_hooks=[],
+    excludes=excluded_modules,
+    noarchive=True,
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='TemPyScan',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['TemPyScan.ico'],
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='TemPyScan',
+)
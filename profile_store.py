@@ -0,0 +1,86 @@
+# profile_store.py
+
+import json
+import os
+import re
+
+PROFILE_VERSION = 1
+PROFILE_EXT = ".json"
+
+
+def default_profile_dir():
+    """配置文件目录，默认位于用户目录下的 .tempyscan/profiles"""
+    return os.path.join(os.path.expanduser("~"), ".tempyscan", "profiles")
+
+
+class ProfileStore:
+    """
+    命名的测试配置（通道位置/阈值、扫描参数、报告表头）以 JSON 文件形式保存.
+    每个配置一个文件，文件名即配置名称。
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_profile_dir()
+
+    @staticmethod
+    def _safe_name(name):
+        name = (name or "").strip()
+        if not name:
+            raise ValueError("Profile name cannot be empty.")
+        # 文件名中不允许的字符替换为下划线
+        return re.sub(r'[\\/:*?"<>|]', "_", name)
+
+    def _path(self, name):
+        return os.path.join(self.directory, self._safe_name(name) + PROFILE_EXT)
+
+    def list_profiles(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(f)[0] for f in os.listdir(self.directory) if f.endswith(PROFILE_EXT))
+
+    def save(self, name, channel_configs, scan_settings=None, report_header=None):
+        """
+        保存配置.
+        :param channel_configs: ChannelConfigModel.snapshot() 的结果 {通道索引: {'location', 'threshold', 'tc_type'}}
+        :param scan_settings: ScanSettingsDialog 的参数 dict
+        :param report_header: SettingsFrame 的表头字段 dict
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            'version': PROFILE_VERSION,
+            'name': name,
+            # JSON 的键只能是字符串，存储为 1 起始的通道号，便于手工编辑
+            'channels': {str(index + 1): fields for index, fields in sorted(channel_configs.items())},
+            'scan_settings': scan_settings or {},
+            'report_header': report_header or {},
+        }
+        path = self._path(name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)  # 原子替换，避免写入中断损坏旧配置
+        return path
+
+    def load(self, name):
+        """
+        读取配置.
+        :return: dict, 其中 'channels' 已转换为 {通道索引(0 起始): fields}
+        """
+        with open(self._path(name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        channels = {}
+        for key, fields in data.get('channels', {}).items():
+            try:
+                channels[int(key) - 1] = {k: str(v) for k, v in fields.items()
+                                          if k in ('location', 'threshold', 'tc_type')}
+            except (ValueError, AttributeError):
+                print(f"警告: 配置 '{name}' 中的通道项 '{key}' 无法解析，已跳过")
+        data['channels'] = channels
+        data.setdefault('scan_settings', {})
+        data.setdefault('report_header', {})
+        return data
+
+    def delete(self, name):
+        path = self._path(name)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,73 @@
+# render_scheduler.py
+
+import time
+
+
+class RenderTarget:
+    __slots__ = ('name', 'callback', 'base_interval', 'interval', 'dirty', 'last_render', 'last_duration')
+
+    def __init__(self, name, callback, rate_hz):
+        self.name = name
+        self.callback = callback
+        self.base_interval = 1.0 / rate_hz
+        self.interval = self.base_interval
+        self.dirty = False
+        self.last_render = 0.0
+        self.last_duration = 0.0
+
+
+class RenderScheduler:
+    """
+    界面刷新节流器：数据到达时只标记目标为"待刷新"，由 tick() 按各目标的最大刷新率合并执行.
+    - 窗口最小化或目标页面未显示时跳过刷新 (保留待刷新标记，恢复显示后立即补画)
+    - 某次刷新耗时超过预算 (刷新间隔的 budget_fraction) 时自动拉长刷新间隔，
+      耗时回落后再逐步恢复到设定值，保证采集/数据处理始终有足够的时间片
+    """
+
+    def __init__(self, is_visible=None, budget_fraction=0.25, max_interval=30.0):
+        self.is_visible = is_visible or (lambda: True)
+        self.budget_fraction = budget_fraction
+        self.max_interval = max_interval
+        self.targets = {}
+
+    def add_target(self, name, callback, rate_hz):
+        self.targets[name] = RenderTarget(name, callback, rate_hz)
+
+    def set_rate(self, name, rate_hz):
+        if not rate_hz > 0:
+            raise ValueError(f"刷新率必须为正数: {rate_hz}")
+        target = self.targets[name]
+        target.base_interval = 1.0 / rate_hz
+        target.interval = target.base_interval
+
+    def mark_dirty(self, *names):
+        for name in names or self.targets:
+            self.targets[name].dirty = True
+
+    def _render(self, target, now):
+        target.dirty = False
+        target.last_render = now
+        start = time.perf_counter()
+        try:
+            target.callback()
+        finally:
+            target.last_duration = time.perf_counter() - start
+            self._adapt(target)
+
+    def _adapt(self, target):
+        budget = target.interval * self.budget_fraction
+        if target.last_duration > budget:
+            target.interval = min(self.max_interval, target.last_duration / self.budget_fraction)
+            print(f"刷新 '{target.name}' 耗时 {target.last_duration * 1000:.0f} ms，"
+                  f"刷新间隔调整为 {target.interval:.2f} s")
+        elif target.interval > target.base_interval:
+            target.interval = max(target.base_interval, target.interval * 0.8)
+
+    def tick(self):
+        """周期调用：执行到期且待刷新的目标"""
+        if not self.is_visible():
+            return
+        now = time.perf_counter()
+        for target in self.targets.values():
+            if target.dirty and now - target.last_render >= target.interval:
+                self._render(target, now)
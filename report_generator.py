@@ -1,110 +1,191 @@
-# report_generator.py
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.lib.pagesizes import A4
-
-# 接收一个 plot_data_list
-def generate_pdf_report(path, report_data, plot_data_list):
-    doc = SimpleDocTemplate(path, pagesize=A4,
-                            rightMargin=inch / 2, leftMargin=inch / 2,
-                            topMargin=inch / 2, bottomMargin=inch / 2)
-
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
-    styles.add(ParagraphStyle(name='Left', alignment=TA_LEFT))
-
-    story = []
-
-    # (1. 标题, 2. 基础信息, 3. 现象/结果/备注, 4. 测试数据表格 )
-    story.append(Paragraph("Heating Test Report", styles['Title']))
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph("Heating Test Info:", styles['h2']))
-    info_data = [
-        [Paragraph('Test Name:', styles['Normal']), Paragraph(report_data.get('Test name', ''), styles['Normal'])],
-        [Paragraph('Test Type:', styles['Normal']), Paragraph(report_data.get('Test type', ''), styles['Normal'])],
-        [Paragraph('Sample No.:', styles['Normal']), Paragraph(report_data.get('Sample number', ''), styles['Normal'])],
-        [Paragraph('Model No.:', styles['Normal']), Paragraph(report_data.get('Model number', ''), styles['Normal'])],
-        [Paragraph('Rating voltage/freq.:', styles['Normal']),
-         Paragraph(f"{report_data.get('Rating Voltage', '')} / {report_data.get('Rating Frequency', '')}",
-                   styles['Normal'])],
-        [Paragraph('Lab request no.:', styles['Normal']),
-         Paragraph(report_data.get('Lab request', ''), styles['Normal'])],
-        [Paragraph('Tester:', styles['Normal']), Paragraph(report_data.get('Tester', ''), styles['Normal'])],
-        [Paragraph('Equipment:', styles['Normal']), Paragraph(report_data.get('Equipment', ''), styles['Normal'])],
-        # 从settings中获取
-        [Paragraph('Operating Voltage:', styles['Normal']),
-         Paragraph(report_data.get('Operating Voltage', ''), styles['Normal'])],
-        [Paragraph('Operating Frequency:', styles['Normal']),
-         Paragraph(report_data.get('Operating Frequency', ''), styles['Normal'])],
-        [Paragraph('Operating Duration:', styles['Normal']),
-         Paragraph(report_data.get('Operating Duration', ''), styles['Normal'])],
-        [Paragraph('Start time:', styles['Normal']), Paragraph(report_data.get('Start time', ''), styles['Normal'])],
-        [Paragraph('Stop time:', styles['Normal']), Paragraph(report_data.get('Stop time', ''), styles['Normal'])],
-        [Paragraph('Ambient Channel:', styles['Normal']),
-         Paragraph(report_data.get('Ambient Channel', ''), styles['Normal'])],
-        [Paragraph('Ambient Temperature:', styles['Normal']), Paragraph(
-            f"Start(T1):{report_data.get('Ambient Temp Start', 'N/A')}  Stop(T2):{report_data.get('Ambient Temp Stop', 'N/A')}",
-            styles['Normal'])],
-    ]
-    info_table = Table(info_data, colWidths=[1.8 * inch, 5.5 * inch])
-    info_table.setStyle(TableStyle([('ALIGN', (0, 0), (-1, -1), 'LEFT'), ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                                    ('BOTTOMPADDING', (0, 0), (-1, -1), 2), ('TOPPADDING', (0, 0), (-1, -1), 2), ]))
-    story.append(info_table)
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph("Phenomena And Result:", styles['h2']))
-    story.append(Paragraph(report_data.get('Phenomena And Result', '').replace('\n', '<br/>'), styles['BodyText']))
-    story.append(Spacer(1, 0.2 * inch))
-    #story.append(Paragraph("Check result:", styles['h2']));
-    #story.append(Paragraph(report_data.get('Check result', '').replace('\n', '<br/>'), styles['BodyText']));
-    #story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph("Notes:", styles['h2']))
-    story.append(Paragraph(report_data.get('Notes', '').replace('\n', '<br/>'), styles['BodyText']))
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(PageBreak())
-
-    story.append(Paragraph("Test Data", styles['h2']))
-    story.append(Spacer(1, 0.1 * inch))
-    data_table_content = [["Item", "Test Location", "Channel No.", "Max Temp.(°C)", "Limit(°C)", "P/F"]]
-    test_data = report_data.get('test_data', [])
-    for row in test_data: data_table_content.append(row)
-    data_table = Table(data_table_content,
-                       colWidths=[0.5 * inch, 1.5 * inch, 1 * inch, 1.2 * inch, 1 * inch, 0.8 * inch])
-    data_table.setStyle(TableStyle(
-        [('BACKGROUND', (0, 0), (-1, 0), colors.grey), ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-         ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'), ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-         ('BACKGROUND', (0, 1), (-1, -1), colors.beige), ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-    story.append(data_table)
-    story.append(PageBreak())
-
-    # 循环添加多个图像
-    #story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph("Test Graph", styles['h2']))
-
-    if plot_data_list:
-        for plot_info in plot_data_list:
-            #plot_title = plot_info.get('title', 'Test Graph')
-            plot_path = plot_info.get('path')
-
-            # 添加每个图的标题 (已废弃）
-            #story.append(Spacer(1, 0.2 * inch))
-            #story.append(Paragraph(plot_title, styles['h3']))
-            #story.append(Spacer(1, 0.1 * inch))
-
-            if plot_path:
-                try:
-                    img = Image(plot_path, width=7 * inch, height=5.25 * inch, kind='proportional')
-                    story.append(img)
-                except Exception as e:
-                    story.append(Paragraph(f"Error loading image: {e}", styles['BodyText']))
-
-    try:
-        doc.build(story)
-        return True
-    except Exception as e:
-        print(f"Error building PDF: {e}")
-        return False
\ No newline at end of file
+# report_generator.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, LongTable, TableStyle, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import A4, letter
+
+from report_templates import DEFAULT_TEMPLATE, format_field
+
+PAGE_SIZES = {"A4": A4, "LETTER": letter}
+
+# 测试数据表的列 (时间列单位为分钟，相对测试开始)
+DATA_TABLE_HEADERS = ["Item", "Test Location", "Ch.", "Max\n(°C)", "Time of\nMax (min)", "Mean\n(°C)",
+                      "Final\n(°C)", "ΔT amb.\n(K)", "Steady\nsince (min)", "Limit\n(°C)", "P/F"]
+DATA_TABLE_COL_WIDTHS = [0.4 * inch, 1.45 * inch, 0.4 * inch, 0.6 * inch, 0.7 * inch, 0.6 * inch, 0.6 * inch,
+                         0.65 * inch, 0.75 * inch, 0.55 * inch, 0.4 * inch]
+
+# P/F 判定对应的整行底色 (其余行为米色)
+STATUS_ROW_COLORS = {"F": colors.Color(1, 0.78, 0.78)}
+
+# 表格样式与模板无关，模块加载时创建一次
+INFO_TABLE_STYLE = TableStyle([('ALIGN', (0, 0), (-1, -1), 'LEFT'), ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                               ('BOTTOMPADDING', (0, 0), (-1, -1), 2), ('TOPPADDING', (0, 0), (-1, -1), 2), ])
+DATA_TABLE_STYLE = TableStyle(
+    [('BACKGROUND', (0, 0), (-1, 0), colors.grey), ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+     ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+     ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'), ('FONTSIZE', (0, 0), (-1, -1), 8),
+     ('LEADING', (0, 0), (-1, -1), 9), ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+     ('BACKGROUND', (0, 1), (-1, -1), colors.beige), ('GRID', (0, 0), (-1, -1), 0.5, colors.black)])
+
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """段落样式表 (所有报告共用)"""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
+    styles.add(ParagraphStyle(name='Left', alignment=TA_LEFT))
+    return styles
+
+
+class RunReport:
+    """
+    同一次测试 (相同的数据、通道和时间段) 的报告内容.
+    数据表和曲线图 (PNG) 在创建时准备一次并缓存，之后每份报告只重新生成表头部分 (标题/基础信息/现象/备注)，
+    用于同一份数据按不同表头出多份报告。
+    """
+
+    def __init__(self, test_data, plot_data_list, template=None, row_status=None):
+        """
+        :param test_data: 数据表的行 (列与 DATA_TABLE_HEADERS 对应)
+        :param plot_data_list: [{'title', 'path' 或 'image' (PNG 字节)}]
+        :param template: report_templates 中的模板 dict，默认为内置模板
+        :param row_status: 每行的判定结果 ("P"/"F"/"N/A")，默认取每行最后一列 (P/F 列)
+        """
+        self.template = template or DEFAULT_TEMPLATE
+        self.test_data = test_data
+        self.row_status = row_status if row_status is not None else [row[-1] for row in test_data]
+        self._data_section = self._build_data_section(test_data, self.row_status)
+        self.graph_images = self._load_graph_images(plot_data_list)
+
+    @staticmethod
+    def _build_data_section(test_data, row_status):
+        """
+        整个数据表为一个 LongTable: 按页面剩余高度测量和拆分，表头 (repeatRows) 只在每页顶部重复.
+        判定着色按整行一条样式命令 (只为需要着色的行生成)，不逐单元格设置。
+        表格对象可以在多次 doc.build 之间复用 (分页时拆分出的是新对象)。
+        """
+        table = LongTable([DATA_TABLE_HEADERS] + list(test_data), colWidths=DATA_TABLE_COL_WIDTHS, repeatRows=1)
+        row_styles = [('BACKGROUND', (0, r), (-1, r), STATUS_ROW_COLORS[status])
+                      for r, status in enumerate(row_status, start=1) if status in STATUS_ROW_COLORS]
+        table.setStyle(DATA_TABLE_STYLE)
+        if row_styles:
+            table.setStyle(TableStyle(row_styles))
+        return [table]
+
+    @staticmethod
+    def _load_graph_images(plot_data_list):
+        """图片读入内存 (PNG 字节)，临时文件可在报告生成后立即删除；读取失败时保存错误信息"""
+        images = []
+        for plot_info in plot_data_list or []:
+            image = plot_info.get('image')
+            if image is None and plot_info.get('path'):
+                try:
+                    with open(plot_info['path'], 'rb') as f:
+                        image = f.read()
+                except OSError as e:
+                    image = e
+            if image is not None:
+                images.append(image)
+        return images
+
+    def _graph_section(self):
+        # Image 对象绘制后不能用于下一份文档，每次由缓存的 PNG 字节重新创建 (不需要重新渲染曲线图)
+        styles = get_styles()
+        width, height = self.template['graph_size_inch']
+        section = [Paragraph(self.template['graph_title'], styles['h2'])]
+        for image in self.graph_images:
+            try:
+                if isinstance(image, Exception): raise image
+                section.append(Image(BytesIO(image), width=width * inch, height=height * inch, kind='proportional'))
+            except Exception as e:
+                section.append(Paragraph(f"Error loading image: {e}", styles['BodyText']))
+        return section
+
+    def _header_section(self, name, report_data):
+        """随表头变化、每份报告都要重新生成的章节"""
+        styles = get_styles()
+        template = self.template
+        if name == 'title':
+            return [Paragraph(template['title'], styles['Title']), Spacer(1, 0.2 * inch)]
+        if name == 'info':
+            info_data = [[Paragraph(label, styles['Normal']),
+                          Paragraph(format_field(fmt, report_data), styles['Normal'])]
+                         for label, fmt in template['info_fields']]
+            info_table = Table(info_data, colWidths=[w * inch for w in template['info_col_widths_inch']])
+            info_table.setStyle(INFO_TABLE_STYLE)
+            return [Paragraph(template['info_title'], styles['h2']), info_table, Spacer(1, 0.2 * inch)]
+        if name in ('phenomena', 'notes'):
+            key = 'Phenomena And Result' if name == 'phenomena' else 'Notes'
+            return [Paragraph(template[name + '_title'], styles['h2']),
+                    Paragraph(report_data.get(key, '').replace('\n', '<br/>'), styles['BodyText']),
+                    Spacer(1, 0.2 * inch)]
+        if name == 'page_break':
+            return [PageBreak()]
+        print(f"报告模板中的未知章节: {name}")
+        return []
+
+    def build(self, path, report_data):
+        """按模板章节顺序生成一份 PDF，返回是否成功"""
+        margin = self.template['margin_inch'] * inch
+        doc = SimpleDocTemplate(path, pagesize=PAGE_SIZES.get(self.template['page_size'].upper(), A4),
+                                rightMargin=margin, leftMargin=margin, topMargin=margin, bottomMargin=margin)
+        story = []
+        for name in self.template['sections']:
+            if name == 'data_table':
+                story.append(Paragraph(self.template['data_title'], get_styles()['h2']))
+                story.append(Spacer(1, 0.1 * inch))
+                story.extend(self._data_section)
+            elif name == 'graphs':
+                story.extend(self._graph_section())
+            else:
+                story.extend(self._header_section(name, report_data))
+        try:
+            doc.build(story)
+            return True
+        except Exception as e:
+            print(f"Error building PDF: {e}")
+            return False
+
+
+# 批量生成时每个工作进程持有一份 RunReport (由 _init_batch_worker 创建)
+_batch_report = None
+
+
+def _init_batch_worker(test_data, graph_images, template, row_status):
+    global _batch_report
+    _batch_report = RunReport(test_data, [{'image': image} for image in graph_images], template, row_status)
+
+
+def _build_batch_report(path, report_data):
+    return _batch_report.build(path, report_data)
+
+
+def build_reports_parallel(run_report, jobs, max_workers=None):
+    """
+    用同一份报告内容按不同表头生成多份 PDF，多个进程并行.
+    数据表的行和曲线图 PNG 只在每个工作进程初始化时传递一次。
+    :param jobs: [(pdf 路径, 表头 report_data)]
+    :return: 每份报告是否成功 (与 jobs 顺序一致)
+    """
+    if not jobs:
+        return []
+    max_workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if max_workers == 1:
+        return [run_report.build(path, report_data) for path, report_data in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker,
+                             initargs=(run_report.test_data, run_report.graph_images, run_report.template,
+                                       run_report.row_status)) as pool:
+        return list(pool.map(_build_batch_report, *zip(*jobs)))
+
+
+# 接收一个 plot_data_list
+def generate_pdf_report(path, report_data, plot_data_list, template=None):
+    return RunReport(report_data.get('test_data', []), plot_data_list, template).build(path, report_data)
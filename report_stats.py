@@ -0,0 +1,147 @@
+# report_stats.py
+
+import numpy as np
+
+# 稳定判据的默认值: 1 小时窗口内温升速率小于 1 K/h
+STEADY_WINDOW_S = 3600.0
+STEADY_RATE_K_PER_H = 1.0
+_STEADY_CHUNK_ELEMENTS = 1 << 20
+
+# Excel 报告 Summary 工作表的表头
+SUMMARY_HEADERS = ["Channel", "Location", "Max Temp (°C)", "Time of Max (s)", "Mean Temp (°C)", "Final Temp (°C)",
+                   "Rise over Ambient (K)", "Steady Since (s)", "Stable at End", "Time over Limit (s)", "Limit (°C)",
+                   "P/F"]
+
+
+class ChannelStats:
+    """
+    一次向量化计算得到的通道统计，每个字段都是长度为通道数的数组 (与输入矩阵的列一一对应).
+    没有有效数据的通道，其统计值为 NaN。
+    """
+    __slots__ = ('count', 'max_temp', 'time_of_max', 'mean_temp', 'final_temp', 'rise_over_ambient',
+                 'exceed_s', 'steady_since', 'stable_at_end', 'ambient_start', 'ambient_end')
+
+    def row(self, col):
+        """取出一个通道的统计 (dict)，用于写入记录库等逐通道场景"""
+        return {name: getattr(self, name)[col] for name in
+                ('max_temp', 'time_of_max', 'mean_temp', 'final_temp', 'rise_over_ambient', 'exceed_s',
+                 'steady_since', 'stable_at_end')}
+
+
+def _window_slopes(t_h, values, valid, window_h):
+    """
+    每一行以其为终点、长度为 window_h 的窗口内的最小二乘斜率 (K/h).
+    用前缀和一次算出所有窗口，时间以小时为单位并相对起点，避免大数相减的精度损失。
+    :return: (slopes, covered) covered 表示窗口已被数据完整覆盖
+    """
+    w = valid.astype(float)
+    y = np.where(valid, values, 0.0)
+    t = t_h[:, None]
+
+    def prefix(a):
+        out = np.zeros((a.shape[0] + 1,) + a.shape[1:])
+        np.cumsum(a, axis=0, out=out[1:])
+        return out
+
+    s_n, s_t, s_y = prefix(w), prefix(w * t), prefix(y)
+    s_tt, s_ty = prefix(w * t * t), prefix(y * t)
+    end = np.arange(1, len(t_h) + 1)
+    start = np.searchsorted(t_h, t_h - window_h, side='left')
+    n = s_n[end] - s_n[start]
+    st = s_t[end] - s_t[start]
+    sy = s_y[end] - s_y[start]
+    stt = s_tt[end] - s_tt[start]
+    sty = s_ty[end] - s_ty[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slopes = (n * sty - st * sy) / (n * stt - st * st)
+    covered = (t_h - t_h[0]) >= window_h
+    return slopes, covered[:, None] & (n >= 3)
+
+
+def compute_channel_stats(timestamps, values, start_timestamp=None, thresholds=None, ambient=None,
+                          steady_window_s=STEADY_WINDOW_S, steady_rate=STEADY_RATE_K_PER_H, times=None):
+    """
+    在所选时间段上一次性计算所有通道的统计.
+    :param timestamps: 扫描时间戳 (长度 n, 升序)
+    :param values: 温度矩阵 (n, 通道数)，NaN 表示无数据
+    :param start_timestamp: time_of_max/steady_since 的时间原点，默认取 timestamps[0]
+    :param thresholds: 每列的阈值 (NaN 表示无阈值)，给出时计算超限时长 (无阈值的列为 NaN，与从未超限的 0 区分)
+    :param ambient: 环境通道温度序列 (长度 n)，给出时计算相对环境的最大温升
+    :param steady_window_s: 稳定判据的窗口长度 (秒)，为 None 时跳过稳定判定
+    :param steady_rate: 稳定判据的温度变化速率上限 (K/h)
+    :param times: 各读数的实际测量时刻 (n, 通道数)，来自仪器时间戳；给出时 time_of_max 按各通道自身的时刻计算
+    :return: ChannelStats
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_rows, n_cols = values.shape
+    if start_timestamp is None:
+        start_timestamp = timestamps[0] if n_rows else 0.0
+    stats = ChannelStats()
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    has_data = count > 0
+    stats.count = count
+    nan_cols = np.full(n_cols, np.nan)
+    if n_rows == 0:
+        for name in ('max_temp', 'time_of_max', 'mean_temp', 'final_temp', 'rise_over_ambient', 'exceed_s',
+                     'steady_since'):
+            setattr(stats, name, nan_cols.copy())
+        stats.stable_at_end = np.zeros(n_cols, dtype=bool)
+        stats.ambient_start = stats.ambient_end = np.nan
+        return stats
+
+    cols = np.arange(n_cols)
+    max_idx = np.where(valid, values, -np.inf).argmax(axis=0)
+    stats.max_temp = np.where(has_data, values[max_idx, cols], np.nan)
+    max_times = timestamps[max_idx] if times is None else np.asarray(times, dtype=float)[max_idx, cols]
+    stats.time_of_max = np.where(has_data, max_times - start_timestamp, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats.mean_temp = np.where(valid, values, 0.0).sum(axis=0) / count
+    # 最后一个有效值: 反向查找第一个有效行
+    last_idx = n_rows - 1 - valid[::-1].argmax(axis=0)
+    stats.final_temp = np.where(has_data, values[last_idx, cols], np.nan)
+
+    if thresholds is not None:
+        thresholds = np.asarray(thresholds, dtype=float)
+        with np.errstate(invalid='ignore'):
+            # 超限时长：某个采样点超限，则认为到下一个采样点之间都处于超限状态
+            over = values[:-1] > thresholds
+        stats.exceed_s = np.where(np.isnan(thresholds), np.nan, (over * np.diff(timestamps)[:, None]).sum(axis=0))
+    else:
+        stats.exceed_s = nan_cols.copy()
+
+    stats.ambient_start = stats.ambient_end = np.nan
+    stats.rise_over_ambient = nan_cols.copy()
+    if ambient is not None:
+        ambient = np.asarray(ambient, dtype=float)
+        ambient_valid = np.flatnonzero(~np.isnan(ambient))
+        if len(ambient_valid):
+            stats.ambient_start = ambient[ambient_valid[0]]
+            stats.ambient_end = ambient[ambient_valid[-1]]
+            # 同一时刻相对环境温度的最大温升
+            rise = values - ambient[:, None]
+            rise_valid = ~np.isnan(rise)
+            rise_max = np.where(rise_valid, rise, -np.inf).max(axis=0)
+            stats.rise_over_ambient = np.where(rise_valid.any(axis=0), rise_max, np.nan)
+
+    stats.steady_since = nan_cols.copy()
+    stats.stable_at_end = np.zeros(n_cols, dtype=bool)
+    if steady_window_s is None:
+        return stats
+    t_h = (timestamps - timestamps[0]) / 3600.0
+    # 按列分块计算，限制前缀和数组的内存占用
+    chunk = max(1, _STEADY_CHUNK_ELEMENTS // n_rows)
+    for c0 in range(0, n_cols, chunk):
+        sl = slice(c0, c0 + chunk)
+        slopes, covered = _window_slopes(t_h, values[:, sl], valid[:, sl], steady_window_s / 3600.0)
+        with np.errstate(invalid='ignore'):
+            steady = covered & (np.abs(slopes) < steady_rate)
+        # 稳定窗口的起点 (首次达到判据的时刻减去窗口长度)
+        stats.steady_since[sl] = np.where(steady.any(axis=0),
+                                          timestamps[steady.argmax(axis=0)] - steady_window_s - start_timestamp,
+                                          np.nan)
+        stats.stable_at_end[sl] = steady[-1]
+    return stats
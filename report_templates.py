@@ -0,0 +1,135 @@
+# report_templates.py
+
+import copy
+import json
+import os
+import re
+
+TEMPLATE_EXT = ".json"
+
+# 内置报告模板 (声明式)：
+# - info_fields: 基础信息表的 [标签, 取值格式]，{字段} 取自报告表头 (SettingsFrame 字段及测试时间/环境温度)
+# - sections: 章节顺序，可选 title / info / phenomena / notes / data_table / graphs / page_break
+# 客户模板放在 ~/.tempyscan/report_templates/<名称>.json，只需写出与内置模板不同的键
+DEFAULT_TEMPLATE = {
+    'title': "Heating Test Report",
+    'page_size': "A4",
+    'margin_inch': 0.5,
+    'info_title': "Heating Test Info:",
+    'info_fields': [
+        ["Test Name:", "{Test name}"],
+        ["Test Type:", "{Test type}"],
+        ["Sample No.:", "{Sample number}"],
+        ["Model No.:", "{Model number}"],
+        ["Rating voltage/freq.:", "{Rating Voltage} / {Rating Frequency}"],
+        ["Lab request no.:", "{Lab request}"],
+        ["Tester:", "{Tester}"],
+        ["Equipment:", "{Equipment}"],
+        ["Operating Voltage:", "{Operating Voltage}"],
+        ["Operating Frequency:", "{Operating Frequency}"],
+        ["Operating Duration:", "{Operating Duration}"],
+        ["Start time:", "{Start time}"],
+        ["Stop time:", "{Stop time}"],
+        ["Ambient Channel:", "{Ambient Channel}"],
+        ["Ambient Temperature:", "Start(T1):{Ambient Temp Start}  Stop(T2):{Ambient Temp Stop}"],
+    ],
+    'info_col_widths_inch': [1.8, 5.5],
+    'phenomena_title': "Phenomena And Result:",
+    'notes_title': "Notes:",
+    'data_title': "Test Data",
+    'graph_title': "Test Graph",
+    'graph_size_inch': [7, 5.25],
+    'sections': ["title", "info", "phenomena", "notes", "page_break", "data_table", "page_break", "graphs"],
+}
+
+
+def default_template_dir():
+    """客户模板目录，默认位于用户目录下的 .tempyscan/report_templates"""
+    return os.path.join(os.path.expanduser("~"), ".tempyscan", "report_templates")
+
+
+class ReportTemplateStore:
+    """
+    报告模板: 内置的 default 模板加上模板目录中的 JSON 文件.
+    模板在第一次使用时读取并缓存，文件修改时间变化后重新读取。
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_template_dir()
+        self._cache = {}  # 名称 -> (文件修改时间, 模板)
+
+    def list_templates(self):
+        names = ["default"]
+        if os.path.isdir(self.directory):
+            names += sorted(os.path.splitext(f)[0] for f in os.listdir(self.directory)
+                            if f.endswith(TEMPLATE_EXT) and os.path.splitext(f)[0] != "default")
+        return names
+
+    def get(self, name=None):
+        """读取模板 (与内置模板合并)；模板不存在或无法解析时返回内置模板"""
+        name = name or "default"
+        path = os.path.join(self.directory, name + TEMPLATE_EXT)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return DEFAULT_TEMPLATE
+        cached = self._cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        template = copy.deepcopy(DEFAULT_TEMPLATE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                template.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"读取报告模板 {path} 失败: {e}")
+            return DEFAULT_TEMPLATE
+        template['name'] = name
+        self._cache[name] = (mtime, template)
+        return template
+
+
+class _HeaderValues(dict):
+    """format_map 用: 表头中没有的字段显示为空"""
+
+    def __missing__(self, key):
+        return ""
+
+
+def format_field(fmt, header):
+    """按模板格式填充表头字段，格式本身有误时原样输出"""
+    try:
+        return fmt.format_map(_HeaderValues(header))
+    except (ValueError, IndexError, AttributeError):
+        return fmt
+
+
+def safe_filename(name):
+    """文件名中不允许的字符替换为下划线"""
+    return re.sub(r'[\\/:*?"<>|]', "_", str(name).strip())
+
+
+def parse_header_variants(rows, known_fields=()):
+    """
+    解析批量报告的表头变体表: 第一行为字段名 (与 SettingsFrame 字段同名，不区分大小写)，之后每行一份报告.
+    空单元格表示沿用当前表头；"File name" 列 (可选) 指定输出文件名。
+    :return: (variants, file_names)，variants 为每份报告要覆盖的字段 dict
+    """
+    rows = [row for row in rows if row and any(c not in (None, "") for c in row)]
+    if not rows:
+        return [], []
+    by_lower = {field.lower(): field for field in known_fields}
+    columns = [by_lower.get(str(c or "").strip().lower(), str(c or "").strip()) for c in rows[0]]
+    variants, file_names = [], []
+    for row in rows[1:]:
+        variant, file_name = {}, None
+        for column, cell in zip(columns, row):
+            if not column or cell is None or str(cell).strip() == "":
+                continue
+            value = str(cell).strip()
+            if column.lower() in ("file name", "filename"):
+                file_name = value
+            else:
+                variant[column] = value
+        variants.append(variant)
+        file_names.append(file_name)
+    return variants, file_names
@@ -0,0 +1,250 @@
+# run_catalog.py
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+from report_stats import compute_channel_stats
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    stopped_at REAL,
+    started_date TEXT NOT NULL,
+    model_number TEXT,
+    sample_number TEXT,
+    test_name TEXT,
+    test_type TEXT,
+    tester TEXT,
+    lab_request TEXT,
+    instrument_idn TEXT,
+    tc_type TEXT,
+    interval_s REAL,
+    ambient_channel INTEGER,
+    header_json TEXT,
+    channel_configs_json TEXT
+);
+CREATE TABLE IF NOT EXISTS channel_stats (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    channel INTEGER NOT NULL,
+    location TEXT,
+    threshold REAL,
+    max_temp REAL,
+    time_of_max REAL,
+    mean_temp REAL,
+    exceed_s REAL,
+    PRIMARY KEY (run_id, channel)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs(model_number);
+CREATE INDEX IF NOT EXISTS idx_runs_sample ON runs(sample_number);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_stats_channel_max ON channel_stats(channel, max_temp);
+"""
+
+# SettingsFrame 字段 -> runs 表的列
+HEADER_COLUMNS = {
+    'Model number': 'model_number',
+    'Sample number': 'sample_number',
+    'Test name': 'test_name',
+    'Test type': 'test_type',
+    'Tester': 'tester',
+    'Lab request': 'lab_request',
+}
+# 按行块汇总长时间测试的历史时每块的行数 (160 通道约 10 MB)
+SUMMARY_BLOCK_ROWS = 8192
+
+
+def default_catalog_path():
+    return os.path.join(os.path.expanduser("~"), ".tempyscan", "runs.sqlite")
+
+
+def compute_channel_summary(timestamps, values, start_timestamp, thresholds):
+    """
+    一次向量化计算所有通道的汇总统计 (基于 report_stats.compute_channel_stats).
+    :param timestamps: 每次扫描的时间戳 (长度 n)
+    :param values: 温度矩阵 (n, 通道数)，NaN 表示无数据
+    :param start_timestamp: 测试开始时间戳, time_of_max 相对于它计算
+    :param thresholds: 每通道阈值数组 (无效阈值为 NaN)
+    :return: {通道索引: {'max_temp', 'time_of_max', 'mean_temp', 'exceed_s'}}，只包含有数据的通道；
+             没有阈值的通道 exceed_s 为 NaN (写入记录库为 NULL)
+    """
+    if len(timestamps) == 0:
+        return {}
+    stats = compute_channel_stats(timestamps, values, start_timestamp, thresholds, steady_window_s=None)
+    return {int(ch): {'max_temp': float(stats.max_temp[ch]),
+                      'time_of_max': float(stats.time_of_max[ch]),
+                      'mean_temp': float(stats.mean_temp[ch]),
+                      'exceed_s': float(stats.exceed_s[ch])}
+            for ch in np.flatnonzero(stats.count)}
+
+
+def summarize_history(history, start_timestamp, thresholds, block_rows=SUMMARY_BLOCK_ROWS):
+    """
+    按行块读取 HistoryStore 累加汇总统计，结果与 compute_channel_summary 相同.
+    每个磁盘段只解码一次，也不会把整个历史一次读入内存。
+    """
+    n_rows, n_channels = len(history), history.n_channels
+    if n_rows == 0:
+        return {}
+    timestamps = history.timestamps
+    thresholds = np.asarray(thresholds, dtype=float)
+    cols = np.arange(n_channels)
+    max_temp = np.full(n_channels, -np.inf)
+    max_ts = np.full(n_channels, np.nan)
+    total = np.zeros(n_channels)
+    count = np.zeros(n_channels, dtype=np.int64)
+    exceed_s = np.zeros(n_channels)
+    for i0 in range(0, n_rows, block_rows):
+        i1 = min(i0 + block_rows, n_rows)
+        values = history.read_values(i0, i1)
+        valid = ~np.isnan(values)
+        masked = np.where(valid, values, -np.inf)
+        max_idx = masked.argmax(axis=0)
+        block_max = masked[max_idx, cols]
+        # 严格大于: 与一次计算相同，取最早出现的最高温
+        higher = block_max > max_temp
+        max_temp[higher] = block_max[higher]
+        max_ts[higher] = timestamps[i0 + max_idx[higher]]
+        total += np.where(valid, values, 0.0).sum(axis=0)
+        count += valid.sum(axis=0)
+        # 超限的采样点计到下一个采样点，块的最后一行用下一块第一行的时间
+        dt = np.diff(timestamps[i0:min(i1 + 1, n_rows)])
+        with np.errstate(invalid='ignore'):
+            over = values[:len(dt)] > thresholds
+        exceed_s += (over * dt[:, None]).sum(axis=0)
+    exceed_s[np.isnan(thresholds)] = np.nan
+    return {int(ch): {'max_temp': float(max_temp[ch]),
+                      'time_of_max': float(max_ts[ch] - start_timestamp),
+                      'mean_temp': float(total[ch] / count[ch]),
+                      'exceed_s': float(exceed_s[ch])}
+            for ch in np.flatnonzero(count)}
+
+
+class RunCatalog:
+    """
+    本地 SQLite 测试记录库 (WAL 模式).
+    每次测试一行 runs 记录，外加每个通道一行 channel_stats 汇总。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_catalog_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_run(self, started_at, stopped_at, header, instrument_idn, tc_type, interval_s, ambient_channel,
+                   channel_configs, channel_summary):
+        """
+        写入一次测试.
+        :param header: SettingsFrame 的字段 dict
+        :param channel_configs: ChannelConfigModel
+        :param channel_summary: compute_channel_summary 的结果
+        :return: run_id
+        """
+        row = {column: header.get(field, '') for field, column in HEADER_COLUMNS.items()}
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (started_at, stopped_at, started_date, model_number, sample_number, test_name, "
+                "test_type, tester, lab_request, instrument_idn, tc_type, interval_s, ambient_channel, header_json, "
+                "channel_configs_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (started_at, stopped_at, datetime.fromtimestamp(started_at).strftime('%Y-%m-%d'),
+                 row['model_number'], row['sample_number'], row['test_name'], row['test_type'], row['tester'],
+                 row['lab_request'], instrument_idn, tc_type, interval_s,
+                 ambient_channel + 1 if ambient_channel is not None else None,
+                 json.dumps(header, ensure_ascii=False),
+                 json.dumps({str(i + 1): f for i, f in channel_configs.snapshot().items()}, ensure_ascii=False)))
+            run_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO channel_stats (run_id, channel, location, threshold, max_temp, time_of_max, mean_temp, "
+                "exceed_s) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, ch + 1, channel_configs.locations[ch],
+                  float(channel_configs.thresholds[ch]) if channel_configs.threshold_valid[ch] else None,
+                  s['max_temp'], s['time_of_max'], s['mean_temp'], s['exceed_s'])
+                 for ch, s in sorted(channel_summary.items())])
+        return run_id
+
+    def update_header(self, run_id, header):
+        """生成报告时表头字段可能已修改，同步到记录库"""
+        assignments = ", ".join(f"{column} = ?" for column in HEADER_COLUMNS.values())
+        values = [header.get(field, '') for field in HEADER_COLUMNS]
+        with self.conn:
+            self.conn.execute(f"UPDATE runs SET {assignments}, header_json = ? WHERE id = ?",
+                              values + [json.dumps(header, ensure_ascii=False), run_id])
+
+    def find_runs(self, model_number=None, sample_number=None, since=None, until=None, limit=100):
+        """按型号/样品号/时间范围查询测试记录, since/until 为时间戳"""
+        clauses, params = [], []
+        if model_number:
+            clauses.append("model_number = ?"); params.append(model_number)
+        if sample_number:
+            clauses.append("sample_number = ?"); params.append(sample_number)
+        if since is not None:
+            clauses.append("started_at >= ?"); params.append(since)
+        if until is not None:
+            clauses.append("started_at < ?"); params.append(until)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return [dict(r) for r in self.conn.execute(
+            f"SELECT * FROM runs {where} ORDER BY started_at DESC LIMIT ?", params + [limit])]
+
+    def hottest(self, channel, since=None, until=None, model_number=None, limit=20):
+        """
+        查询某个通道 (1 起始) 最高温度排名, 例如上个季度 12 通道温度最高的样品.
+        """
+        clauses, params = ["s.channel = ?"], [channel]
+        if since is not None:
+            clauses.append("r.started_at >= ?"); params.append(since)
+        if until is not None:
+            clauses.append("r.started_at < ?"); params.append(until)
+        if model_number:
+            clauses.append("r.model_number = ?"); params.append(model_number)
+        return [dict(r) for r in self.conn.execute(
+            "SELECT r.id AS run_id, r.started_date, r.model_number, r.sample_number, r.test_name, s.location, "
+            "s.max_temp, s.time_of_max, s.mean_temp, s.exceed_s, s.threshold "
+            "FROM channel_stats s JOIN runs r ON r.id = s.run_id "
+            f"WHERE {' AND '.join(clauses)} ORDER BY s.max_temp DESC LIMIT ?", params + [limit])]
+
+
+def _parse_date(text):
+    return time.mktime(datetime.strptime(text, '%Y-%m-%d').timetuple()) if text else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the TemPyScan run catalogue.")
+    parser.add_argument("--db", default=None, help="catalogue file (default: ~/.tempyscan/runs.sqlite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_hot = sub.add_parser("hottest", help="rank runs by max temperature of one channel")
+    p_hot.add_argument("channel", type=int)
+    p_runs = sub.add_parser("runs", help="list runs")
+    p_runs.add_argument("--model")
+    p_runs.add_argument("--sample")
+    for p in (p_hot, p_runs):
+        p.add_argument("--since", help="YYYY-MM-DD")
+        p.add_argument("--until", help="YYYY-MM-DD")
+        p.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = RunCatalog(args.db)
+    if args.command == "hottest":
+        rows = catalog.hottest(args.channel, _parse_date(args.since), _parse_date(args.until), limit=args.limit)
+    else:
+        rows = catalog.find_runs(args.model, args.sample, _parse_date(args.since), _parse_date(args.until),
+                                 limit=args.limit)
+    for r in rows:
+        print(r)
+    catalog.close()
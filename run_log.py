@@ -0,0 +1,301 @@
+# run_log.py
+
+import hashlib
+import json
+import os
+import re
+import struct
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+import segment_codec
+from channel_config import read_config_file
+
+RUN_EXT = ".tprun"
+# 运行日志按块编码 (每块为一个 segment_codec 压缩段)，打开时逐块解码后一次写入历史
+RUN_BLOCK_ROWS = 4096
+
+# 文件头: 标识, 版本, 元数据 JSON 长度；之后为元数据和若干 (uint32 长度 + 压缩段)
+_MAGIC = b'TPRN'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBxxxI')
+_BLOCK_LEN = struct.Struct('<I')
+
+# 导出的 Temperature Data 工作表 (ThermoApp.get_formatted_excel_data) 的列名
+_CHANNEL_COLUMN = re.compile(r'Channel (\d+)$')
+_CHANNEL_TIME_COLUMN = re.compile(r'Channel (\d+) Time \(s\)$')
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# 导出的温度保留 4 位小数，导入缓存按该精度量化，缓存读出的数据与表格一致
+IMPORT_TEMP_QUANTUM = 1e-4
+IMPORT_CACHE_EXT = ".tpcache"
+
+
+def default_run_dir():
+    """运行日志目录，默认位于用户目录下的 .tempyscan/runs"""
+    return os.path.join(os.path.expanduser("~"), ".tempyscan", "runs")
+
+
+def _write_blocks(path, meta, n_rows, read_block, temp_quantum=segment_codec.TEMP_QUANTUM):
+    """
+    写入运行日志 (先写临时文件再替换，写入中断不会留下半个文件).
+    :param read_block: read_block(i0, i1) -> (timestamps, values, offsets)
+    :return: 写入的字节数
+    """
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(meta_bytes)))
+        f.write(meta_bytes)
+        for i0 in range(0, n_rows, RUN_BLOCK_ROWS):
+            block = segment_codec.encode_segment(*read_block(i0, min(i0 + RUN_BLOCK_ROWS, n_rows)),
+                                                 temp_quantum=temp_quantum)
+            f.write(_BLOCK_LEN.pack(len(block)))
+            f.write(block)
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+def write_run_log(path, history, meta):
+    """
+    把整个测试历史写入运行日志.
+    :param history: HistoryStore，磁盘段中的数据按块读取，不会一次读入内存
+    :param meta: 可 JSON 序列化的测试信息 (开始/结束时间、热电偶类型、通道配置、报告表头等)
+    :return: 写入的字节数
+    """
+    return _write_blocks(path, meta, len(history), lambda i0, i1: (
+        history.timestamps[i0:i1], history.read_values(i0, i1), history.read_offsets(i0, i1)))
+
+
+def write_run_arrays(path, meta, timestamps, values, offsets=None, temp_quantum=segment_codec.TEMP_QUANTUM):
+    """把已在内存中的数据 (load_run 的返回格式) 写入运行日志"""
+    return _write_blocks(path, meta, len(timestamps), lambda i0, i1: (
+        timestamps[i0:i1], values[i0:i1], None if offsets is None else offsets[i0:i1]), temp_quantum)
+
+
+def iter_run_log(path):
+    """
+    逐块读取运行日志，每次只解码一块 (RUN_BLOCK_ROWS 行).
+    :return: (meta, blocks)；blocks 为 (timestamps, values, offsets) 的生成器
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{os.path.basename(path)} 不是有效的运行日志")
+        magic, version, meta_len = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{os.path.basename(path)} 不是有效的运行日志")
+        meta = json.loads(f.read(meta_len).decode('utf-8'))
+        data_pos = f.tell()
+    # JSON 的键为字符串，通道配置恢复为 {通道索引: 字段}
+    meta['channels'] = {int(k): v for k, v in meta.get('channels', {}).items()}
+
+    def blocks():
+        with open(path, 'rb') as f:
+            f.seek(data_pos)
+            while True:
+                length = f.read(_BLOCK_LEN.size)
+                if len(length) < _BLOCK_LEN.size:
+                    return
+                (block_len,) = _BLOCK_LEN.unpack(length)
+                yield segment_codec.decode_segment(f.read(block_len))
+
+    return meta, blocks()
+
+
+def read_run_log(path):
+    """
+    读取整个运行日志.
+    :return: (meta, timestamps, values, offsets)，offsets 在测试没有记录仪器时间戳时为 None
+    """
+    meta, blocks = iter_run_log(path)
+    blocks = list(blocks)
+    if not blocks:
+        return meta, np.empty(0), np.empty((0, meta.get('n_channels', 160))), None
+    timestamps = np.concatenate([b[0] for b in blocks])
+    values = np.concatenate([b[1] for b in blocks])
+    offsets = None
+    if any(b[2] is not None for b in blocks):
+        offsets = np.concatenate([b[2] if b[2] is not None else np.zeros(b[1].shape, dtype=np.float32)
+                                  for b in blocks])
+    return meta, timestamps, values, offsets
+
+
+def _date_timestamp(cell):
+    if isinstance(cell, datetime):
+        return cell.timestamp()
+    return datetime.strptime(str(cell).strip(), _DATE_FORMAT).timestamp()
+
+
+def _float_columns(rows, columns):
+    """取出若干列转换为浮点矩阵 (空单元格为 NaN)"""
+    return np.array([[row[j] if j < len(row) and row[j] not in (None, '') else np.nan for j in columns]
+                     for row in rows], dtype=float)
+
+
+def _assemble_table(headers, column, date_cells, n_channels):
+    """
+    由导出的温度数据表 (Date, Time (s), Channel N [, Channel N Time (s)] ...) 组装历史数据.
+    Time (s) 相对导出时选择的起点，Date 只精确到秒；起点的绝对时间取前 100 行的 max(Date - Time (s))，
+    误差小于 1 秒。起点作为测试开始时间，Time (s) 与导出时一致。
+    :param column: column(列号) -> 该列数据行的浮点数组 (空为 NaN)
+    :param date_cells: 前若干数据行的 Date 单元格
+    :return: (meta, timestamps, values, offsets)
+    """
+    if 'Time (s)' not in headers or 'Date' not in headers:
+        raise ValueError("缺少 'Date' 或 'Time (s)' 列，不是导出的温度数据表")
+    value_columns, time_columns = {}, {}
+    for j, header in enumerate(headers):
+        match = _CHANNEL_COLUMN.match(header)
+        if match:
+            value_columns[int(match.group(1)) - 1] = j
+            continue
+        match = _CHANNEL_TIME_COLUMN.match(header)
+        if match:
+            time_columns[int(match.group(1)) - 1] = j
+    channels = [ch for ch in sorted(value_columns) if 0 <= ch < n_channels]
+    if not channels:
+        raise ValueError("表中没有 'Channel N' 列")
+    elapsed = column(headers.index('Time (s)'))
+    origin = max((_date_timestamp(cell) - t for cell, t in zip(date_cells, elapsed)
+                  if cell not in (None, '') and not np.isnan(t)), default=None)
+    if origin is None:
+        raise ValueError("前 100 行中没有有效的 Date 和 Time (s)")
+    # 没有时间的行 (空行) 不导入
+    keep = ~np.isnan(elapsed)
+    elapsed = elapsed[keep]
+    timestamps = origin + elapsed
+    values = np.full((len(elapsed), n_channels), np.nan)
+    values[:, channels] = np.column_stack([column(value_columns[ch])[keep] for ch in channels])
+    offsets = None
+    timed = [ch for ch in channels if ch in time_columns]
+    if timed:
+        offsets = np.zeros((len(elapsed), n_channels), dtype=np.float32)
+        channel_times = np.column_stack([column(time_columns[ch])[keep] for ch in timed])
+        offsets[:, timed] = np.nan_to_num(channel_times - elapsed[:, None])
+    meta = {'start_timestamp': float(origin), 'stop_timestamp': float(timestamps[-1])}
+    return meta, timestamps, values, offsets
+
+
+def parse_exported_table(rows, n_channels=160):
+    """解析导出的温度数据表 (二维列表，第一行为表头)，见 _assemble_table"""
+    rows = [row for row in rows if row and any(c not in (None, '') for c in row)]
+    if len(rows) < 2:
+        raise ValueError("表中没有温度数据")
+    headers = [str(c or '').strip() for c in rows[0]]
+    body = rows[1:]
+    date_cells = [row[headers.index('Date')] for row in body[:100]] if 'Date' in headers else []
+    return _assemble_table(headers, lambda j: _float_columns(body, [j])[:, 0], date_cells, n_channels)
+
+
+def _summary_configs(headers, rows):
+    """Summary 工作表的行 (文本) 转换为通道位置和限值 (ChannelConfigModel.replace_all 的格式)"""
+    if not {'Channel', 'Location', 'Limit (°C)'} <= set(headers):
+        return {}
+    ch_col, loc_col, limit_col = headers.index('Channel'), headers.index('Location'), headers.index('Limit (°C)')
+    configs = {}
+    for row in rows:
+        try:
+            index = int(float(row.get(ch_col))) - 1
+        except (TypeError, ValueError):
+            continue
+        limit = row.get(limit_col)
+        if isinstance(limit, (int, float)):
+            limit = f"{limit:g}"
+        configs[index] = {'location': str(row.get(loc_col) or '').strip(),
+                          'threshold': '' if limit in (None, '-') else str(limit).strip()}
+    return configs
+
+
+def read_summary_configs(path):
+    """用 openpyxl 读取导出工作簿的 Summary 工作表 (快速导入失败时使用)"""
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if "Summary" not in wb.sheetnames: return {}
+        rows = [list(row) for row in wb["Summary"].iter_rows(values_only=True)]
+    finally:
+        wb.close()
+    if not rows: return {}
+    headers = [str(c or '').strip() for c in rows[0]]
+    return _summary_configs(headers, [dict(enumerate(row)) for row in rows[1:]])
+
+
+def _import_cache_paths(path):
+    """导入缓存的位置: 与工作簿同目录的旁路文件；目录不可写时使用用户目录下的 .tempyscan/import_cache"""
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return [path + IMPORT_CACHE_EXT,
+            os.path.join(os.path.expanduser("~"), ".tempyscan", "import_cache", digest + IMPORT_CACHE_EXT)]
+
+
+def import_workbook(path, n_channels=160):
+    """
+    快速导入导出的 .xlsx 工作簿 (Temperature Data + Summary 工作表).
+    工作表 XML 由 xlsx_reader 直接解析，结果以运行日志格式写入旁路缓存 (记录工作簿的大小和修改时间)；
+    再次打开未修改的同一工作簿时直接逐块读取缓存，不再解析 XML。
+    :return: (meta, blocks)，见 load_run
+    """
+    stat = os.stat(path)
+    source = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    cache_paths = _import_cache_paths(path)
+    for cache_path in cache_paths:
+        if not os.path.exists(cache_path):
+            continue
+        try:
+            cached = iter_run_log(cache_path)
+        except (OSError, ValueError) as e:
+            print(f"导入缓存 {cache_path} 无效，重新导入: {e}")
+            continue
+        if cached[0].get('source') == source:
+            return cached
+
+    from xlsx_reader import XlsxSheetReader
+    with XlsxSheetReader(path) as reader:
+        sheet = "Temperature Data" if "Temperature Data" in reader.sheets else None
+        headers, table, texts = reader.read_table(sheet)
+        date_col = headers.index('Date') if 'Date' in headers else None
+        date_cells = [row.get(date_col) for row in texts] if date_col is not None else []
+        meta, timestamps, values, offsets = _assemble_table(
+            headers, lambda j: table[:, j] if j < table.shape[1] else np.full(len(table), np.nan),
+            date_cells, n_channels)
+        channels = {}
+        if "Summary" in reader.sheets:
+            summary_headers, _, summary_rows = reader.read_table("Summary", text_rows=None)
+            channels = _summary_configs(summary_headers, summary_rows)
+    meta['channels'] = channels
+    meta['source'] = source
+
+    cache_meta = dict(meta, channels={str(i): f for i, f in channels.items()})
+    for cache_path in cache_paths:
+        try:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            write_run_arrays(cache_path, cache_meta, timestamps, values, offsets, IMPORT_TEMP_QUANTUM)
+            break
+        except OSError as e:
+            print(f"无法写入导入缓存 {cache_path}: {e}")
+    return meta, [(timestamps, values, offsets)]
+
+
+def load_run(path, n_channels=160):
+    """
+    打开已记录的测试: 运行日志 (.tprun)，或导出的 .xlsx/.csv 温度数据表.
+    运行日志和导入缓存逐块解码，调用方可以边读边写入历史，整个测试不必同时留在内存中；
+    新解析的表格本身已在内存中，作为一块返回。
+    :return: (meta, blocks)；blocks 为 (timestamps, values, offsets) 的可迭代对象，
+             offsets 在没有记录仪器时间戳时为 None
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (RUN_EXT, IMPORT_CACHE_EXT):
+        return iter_run_log(path)
+    if ext in ('.xlsx', '.xlsm'):
+        try:
+            return import_workbook(path, n_channels)
+        except (KeyError, ValueError, zipfile.BadZipFile) as e:
+            # 不是本程序导出的格式 (例如 Excel 另存时改变了结构)，退回 openpyxl 逐行读取
+            print(f"快速导入 {path} 失败，改用 openpyxl: {e}")
+    meta, timestamps, values, offsets = parse_exported_table(read_config_file(path), n_channels)
+    if ext in ('.xlsx', '.xlsm'):
+        meta['channels'] = read_summary_configs(path)
+    return meta, [(timestamps, values, offsets)]
@@ -0,0 +1,119 @@
+# scan_speed.py
+
+import re
+
+from channel_map import compress_channels
+
+# 扫描速度预设: NPLC (积分时间, 电源周期数)、自动调零、数字滤波 (重复平均次数)
+SPEED_PROFILES = {
+    'fast': {'nplc': 0.1, 'autozero': False, 'filter': 0},
+    'balanced': {'nplc': 1.0, 'autozero': True, 'filter': 0},
+    'precise': {'nplc': 5.0, 'autozero': True, 'filter': 0},
+}
+DEFAULT_PROFILE = 'balanced'
+# custom: 以 balanced 为基础，自动调零单独设置，NPLC/滤波由分组覆盖给出 (例如 "all: nplc=2")
+PROFILE_NAMES = list(SPEED_PROFILES) + ['custom']
+
+# 扫描时间估算: 每通道继电器切换与热电偶测量的固定开销 (秒)，每次扫描的触发与数据传输开销 (秒)
+CHANNEL_OVERHEAD_S = 0.006
+SCAN_OVERHEAD_S = 0.05
+
+NPLC_RANGE = (0.01, 50.0)
+# 重复滤波的平均次数 (SENS:TEMP:AVER:COUN 接受 1-100)；0 和 1 表示关闭滤波
+FILTER_RANGE = (0, 100)
+_OVERRIDE_KEYS = {'nplc': float, 'filter': int}
+
+
+def parse_overrides(text):
+    """
+    解析自定义的分组设置，分号分隔，每组为 "通道选择: 参数=值 ...".
+      "1-5: nplc=0.1 filter=0; 20-40: nplc=5 filter=10"
+    通道选择使用 channel_selection 的语法 (不含温度条件)。
+    :return: (groups, errors)，groups 为 [(通道选择字符串, {参数: 值})]
+    """
+    groups, errors = [], []
+    for part in (text or '').split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        if ':' not in part:
+            errors.append(f"'{part}' 缺少 ':'")
+            continue
+        selection, _, params_text = part.rpartition(':')
+        params = {}
+        for key, value in re.findall(r'(\w+)\s*=\s*([^\s,]+)', params_text):
+            key = key.lower()
+            if key not in _OVERRIDE_KEYS:
+                errors.append(f"未知参数 '{key}' (可用: {', '.join(_OVERRIDE_KEYS)})")
+                continue
+            try:
+                params[key] = _OVERRIDE_KEYS[key](value)
+            except ValueError:
+                errors.append(f"参数 {key} 的值 '{value}' 无效")
+                continue
+            if key == 'nplc' and not NPLC_RANGE[0] <= params[key] <= NPLC_RANGE[1]:
+                errors.append(f"NPLC {value} 超出范围 {NPLC_RANGE[0]}-{NPLC_RANGE[1]}")
+                del params[key]
+            elif key == 'filter' and not FILTER_RANGE[0] <= params[key] <= FILTER_RANGE[1]:
+                errors.append(f"滤波次数 {value} 超出范围 {FILTER_RANGE[0]}-{FILTER_RANGE[1]}")
+                del params[key]
+        if params:
+            groups.append((selection.strip(), params))
+    return groups, errors
+
+
+class ScanSpeed:
+    """
+    扫描速度设置: 一个预设加上按通道分组的覆盖 (NPLC、滤波).
+    自动调零是主机的全局设置 (SYST:AZER)，只由预设决定。
+    """
+
+    def __init__(self, profile=DEFAULT_PROFILE, overrides=None, autozero=None):
+        """
+        :param profile: PROFILE_NAMES 中的名称
+        :param overrides: {全局通道索引: {'nplc', 'filter'}}，由界面把 parse_overrides 的通道选择展开后传入
+        :param autozero: 覆盖预设的自动调零设置，None 表示使用预设值
+        """
+        self.profile = profile if profile in PROFILE_NAMES else DEFAULT_PROFILE
+        self.base = dict(SPEED_PROFILES.get(self.profile, SPEED_PROFILES[DEFAULT_PROFILE]))
+        if autozero is not None:
+            self.base['autozero'] = bool(autozero)
+        self.overrides = overrides or {}
+
+    def channel_settings(self, global_index):
+        settings = dict(self.base)
+        settings.update(self.overrides.get(global_index, {}))
+        return settings
+
+    def groups(self, channel_map, channel_offset=0):
+        """扫描通道按 (NPLC, 滤波) 分组: {(nplc, filter): [仪器通道号]}"""
+        def key(global_index):
+            settings = self.channel_settings(global_index)
+            return settings['nplc'], settings['filter']
+        return channel_map.group_by(key, channel_offset)
+
+    def commands(self, channel_map, channel_offset=0):
+        """生成 SCPI 指令: 每组一条 NPLC 指令和滤波指令，通道列表压缩为区间"""
+        commands = [f"SYST:AZER:STAT {'ON' if self.base['autozero'] else 'OFF'}"]
+        for (nplc, filter_count), channels in sorted(self.groups(channel_map, channel_offset).items()):
+            channel_list = compress_channels(channels)
+            commands.append(f"SENS:TEMP:NPLC {nplc:g}, {channel_list}")
+            if filter_count > 1:
+                commands.append(f"SENS:TEMP:AVER:TCON REP, {channel_list}")
+                commands.append(f"SENS:TEMP:AVER:COUN {filter_count}, {channel_list}")
+                commands.append(f"SENS:TEMP:AVER:STAT ON, {channel_list}")
+            else:
+                commands.append(f"SENS:TEMP:AVER:STAT OFF, {channel_list}")
+        return commands
+
+    def predict_scan_time(self, channel_map, channel_offset=0, line_frequency=50.0):
+        """
+        估算一次扫描的耗时 (秒).
+        每个读数积分 NPLC/电源频率，自动调零时加倍，重复滤波时乘以平均次数，另加每通道固定开销。
+        """
+        total = SCAN_OVERHEAD_S
+        autozero = 2 if self.base['autozero'] else 1
+        for (nplc, filter_count), channels in self.groups(channel_map, channel_offset).items():
+            per_reading = nplc / line_frequency * autozero
+            total += len(channels) * (per_reading * max(filter_count, 1) + CHANNEL_OVERHEAD_S)
+        return total
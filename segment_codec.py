@@ -0,0 +1,164 @@
+# segment_codec.py
+
+import struct
+import zlib
+
+import numpy as np
+
+# 块压缩: 优先使用 zstd，其次 lz4，都没有安装时使用标准库的 zlib
+CODEC_ZLIB, CODEC_ZSTD, CODEC_LZ4 = 0, 1, 2
+_CODEC_NAMES = {CODEC_ZLIB: 'zlib', CODEC_ZSTD: 'zstd', CODEC_LZ4: 'lz4'}
+_COMPRESSORS = {
+    CODEC_ZLIB: (lambda data: zlib.compress(data, 3), zlib.decompress),
+}
+try:
+    import zstandard
+    _COMPRESSORS[CODEC_ZSTD] = (lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+                                lambda data: zstandard.ZstdDecompressor().decompress(data))
+except ImportError:
+    pass
+try:
+    import lz4.frame
+    _COMPRESSORS[CODEC_LZ4] = (lz4.frame.compress, lz4.frame.decompress)
+except ImportError:
+    pass
+DEFAULT_CODEC = next(c for c in (CODEC_ZSTD, CODEC_LZ4, CODEC_ZLIB) if c in _COMPRESSORS)
+
+SEGMENT_EXT = ".tpseg"
+# 温度量化步长 (°C，与仪器显示分辨率一致)；时间戳和时间偏移量化为微秒
+TEMP_QUANTUM = 0.01
+TIME_QUANTUM = 1e-6
+# 绝对值不小于该值的读数 (如仪器的溢出值 ±9.9e37) 和 inf 视为无数据，避免量化时超出 int64
+MAX_ABS_VALUE = 1e6
+
+# 文件头: 标识, 版本, 压缩方式, 是否有时间偏移, 时间戳/温度/偏移差分的整数字节数, 行数, 通道数, 温度量化步长, 时间量化步长
+_MAGIC = b'TPSG'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBBBBBBxxIIdd')
+
+
+def codec_name(codec=DEFAULT_CODEC):
+    return _CODEC_NAMES[codec]
+
+
+def _narrow(a):
+    """整数数组转换为能容纳其取值范围的最窄类型 (int16/int32/int64)"""
+    if a.size == 0:
+        return a.astype(np.int16)
+    lo, hi = int(a.min()), int(a.max())
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return a.astype(dtype)
+    return a.astype(np.int64)
+
+
+def _encode_columns(values, quantum):
+    """
+    二维数组按列量化并沿时间差分.
+    NaN、inf 和超出 MAX_ABS_VALUE 的值记为无效 (解码为 NaN)，并用该列前一个有效值填充，差分在数据缺失处仍保持很小。
+    :return: (有效位图 bytes, 首行 int64, 差分 (列优先, 最窄整数类型))
+    """
+    n_rows, n_cols = values.shape
+    with np.errstate(invalid='ignore'):
+        valid = np.abs(values) < MAX_ABS_VALUE
+    q = np.where(valid, np.rint(np.where(valid, values, 0.0) / quantum), 0.0).astype(np.int64)
+    # 向前填充: 每个位置取该列最近一个有效行的行号
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(n_rows)[:, None], 0), axis=0)
+    q = np.take_along_axis(q, last_valid, axis=0)
+    deltas = _narrow(np.diff(q, axis=0).T)
+    return np.packbits(valid).tobytes(), q[0] if n_rows else np.zeros(n_cols, dtype=np.int64), deltas
+
+
+def _decode_columns(buffer, pos, n_rows, n_cols, itemsize, quantum, dtype):
+    """_encode_columns 的逆过程 (一次 cumsum 还原所有列)，返回 (数组, 新的读取位置)"""
+    n_mask = (n_rows * n_cols + 7) // 8
+    valid = np.unpackbits(np.frombuffer(buffer, np.uint8, n_mask, pos), count=n_rows * n_cols)
+    pos += n_mask
+    first = np.frombuffer(buffer, np.int64, n_cols, pos)
+    pos += 8 * n_cols
+    n_deltas = (n_rows - 1) * n_cols
+    deltas = np.frombuffer(buffer, np.dtype(f'<i{itemsize}'), n_deltas, pos).reshape(n_cols, n_rows - 1)
+    pos += itemsize * n_deltas
+    q = np.empty((n_rows, n_cols), dtype=np.int64)
+    q[0] = first
+    q[1:] = deltas.T
+    np.cumsum(q, axis=0, out=q)
+    values = (q * quantum).astype(dtype)
+    values[valid.reshape(n_rows, n_cols) == 0] = np.nan
+    return values, pos
+
+
+def encode_segment(timestamps, values, offsets=None, codec=DEFAULT_CODEC, temp_quantum=TEMP_QUANTUM):
+    """
+    把一段历史 (n 行) 编码为压缩块.
+    时间戳量化为微秒后存二阶差分 (等间隔扫描时几乎全为 0)；温度按 temp_quantum 量化后逐列存一阶差分，
+    时间偏移 (可选) 按 TIME_QUANTUM 同样处理；整个负载再用 codec 块压缩。
+    :param temp_quantum: 温度量化步长，记录在文件头中 (导入的表格保留其 4 位小数时使用 1e-4)
+    :return: bytes
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    values = np.asarray(values, dtype=float)
+    n_rows, n_cols = values.shape
+    if n_rows == 0:
+        raise ValueError("空的历史段无法编码")
+    t = np.rint(timestamps / TIME_QUANTUM).astype(np.int64)
+    # t0, 第一个间隔, 之后的二阶差分
+    dd = _narrow(np.diff(t, n=2))
+    head = np.array([t[0], t[1] - t[0] if n_rows > 1 else 0], dtype=np.int64)
+    parts = [head.tobytes(), dd.tobytes()]
+    mask, first, deltas = _encode_columns(values, temp_quantum)
+    parts += [mask, first.tobytes(), deltas.tobytes()]
+    offset_size = 0
+    if offsets is not None:
+        mask, first, offset_deltas = _encode_columns(np.asarray(offsets, dtype=float), TIME_QUANTUM)
+        parts += [mask, first.tobytes(), offset_deltas.tobytes()]
+        offset_size = offset_deltas.itemsize
+    header = _HEADER.pack(_MAGIC, _VERSION, codec, offsets is not None, dd.itemsize, deltas.itemsize,
+                          offset_size, n_rows, n_cols, temp_quantum, TIME_QUANTUM)
+    compress = _COMPRESSORS[codec][0]
+    return header + compress(b''.join(parts))
+
+
+def decode_segment(data):
+    """
+    解码 encode_segment 的结果.
+    :return: (timestamps, values, offsets)，values 为 float64 (NaN 表示无数据)，offsets 为 float32 或 None
+    """
+    magic, version, codec, has_offsets, ts_size, value_size, offset_size, n_rows, n_cols, temp_q, time_q = \
+        _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("不是有效的历史段文件")
+    if codec not in _COMPRESSORS:
+        raise ValueError(f"历史段使用 {_CODEC_NAMES.get(codec, codec)} 压缩，当前环境未安装该模块")
+    buffer = _COMPRESSORS[codec][1](data[_HEADER.size:])
+    head = np.frombuffer(buffer, np.int64, 2)
+    pos = 16
+    n_dd = max(n_rows - 2, 0)
+    steps = np.empty(n_rows, dtype=np.int64)
+    steps[0] = head[0]
+    if n_rows > 1:
+        steps[1] = head[1]
+        steps[2:] = np.frombuffer(buffer, np.dtype(f'<i{ts_size}'), n_dd, pos)
+        # 二阶差分 -> 间隔 -> 时间戳
+        np.cumsum(steps[1:], out=steps[1:])
+    pos += ts_size * n_dd
+    timestamps = np.cumsum(steps) * time_q
+    values, pos = _decode_columns(buffer, pos, n_rows, n_cols, value_size, temp_q, np.float64)
+    offsets = None
+    if has_offsets:
+        offsets, pos = _decode_columns(buffer, pos, n_rows, n_cols, offset_size, time_q, np.float32)
+    return timestamps, values, offsets
+
+
+def write_segment(path, timestamps, values, offsets=None, codec=DEFAULT_CODEC, temp_quantum=TEMP_QUANTUM):
+    """编码并写入文件，返回写入的字节数"""
+    data = encode_segment(timestamps, values, offsets, codec, temp_quantum)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def read_segment(path):
+    with open(path, 'rb') as f:
+        return decode_segment(f.read())
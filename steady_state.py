@@ -0,0 +1,93 @@
+# steady_state.py
+
+from collections import deque
+
+import numpy as np
+
+from report_stats import STEADY_WINDOW_S, STEADY_RATE_K_PER_H
+
+
+class SteadyStateDetector:
+    """
+    采集过程中在线判定各通道是否达到热稳定.
+    对滑动窗口 (默认 1 小时) 维护每通道的回归累加量 Σw, Σt, Σy, Σt², Σty，
+    新扫描进入窗口时加上、移出窗口时减去，每次扫描每通道 O(1) 即可得到最小二乘斜率 (K/h)。
+    判据与 report_stats.compute_channel_stats 一致: 窗口已被数据覆盖且 |斜率| < rate。
+    """
+    # 每移出多少次扫描，就用窗口内数据重新求一次累加量，消除加减带来的浮点误差累积
+    RESUM_EVERY = 4096
+
+    def __init__(self, n_channels=160, window_s=STEADY_WINDOW_S, rate_k_per_h=STEADY_RATE_K_PER_H):
+        self.n_channels = n_channels
+        self.window_s = float(window_s)
+        self.rate = float(rate_k_per_h)
+        self.reset()
+
+    def reset(self, origin=None, window_s=None, rate_k_per_h=None):
+        """开始新的测试，可同时修改判据"""
+        if window_s is not None:
+            self.window_s = float(window_s)
+        if rate_k_per_h is not None:
+            self.rate = float(rate_k_per_h)
+        self.origin = origin
+        self.first_t = None
+        self._window = deque()  # (相对原点的小时数, 温度行)
+        self._sums = np.zeros((5, self.n_channels))  # n, t, y, tt, ty
+        self._evicted = 0
+        self.covered = False  # 测试时长是否已达到一个窗口
+        self.slopes = np.full(self.n_channels, np.nan)
+        self.stable = np.zeros(self.n_channels, dtype=bool)
+        self.stable_since = np.full(self.n_channels, np.nan)
+
+    @staticmethod
+    def _terms(t, temps):
+        valid = ~np.isnan(temps)
+        w = valid.astype(float)
+        y = np.where(valid, temps, 0.0)
+        return np.stack((w, w * t, y, w * t * t, y * t))
+
+    def _resum(self):
+        self._sums[:] = 0.0
+        for t, temps in self._window:
+            self._sums += self._terms(t, temps)
+
+    def add(self, ts, temps):
+        """加入一次扫描 (长度 n_channels 的数组，NaN 表示无数据)"""
+        if self.origin is None:
+            self.origin = ts
+        t = (ts - self.origin) / 3600.0
+        if self.first_t is None:
+            self.first_t = t
+        temps = np.array(temps, dtype=float)
+        self._window.append((t, temps))
+        self._sums += self._terms(t, temps)
+        window_h = self.window_s / 3600.0
+        while self._window[0][0] < t - window_h:
+            old_t, old_temps = self._window.popleft()
+            self._sums -= self._terms(old_t, old_temps)
+            self._evicted += 1
+        if self._evicted >= self.RESUM_EVERY:
+            self._evicted = 0
+            self._resum()
+        self._update(ts, t - self.first_t >= window_h)
+
+    def add_block(self, timestamps, values):
+        for ts, temps in zip(timestamps, values):
+            self.add(ts, temps)
+
+    def _update(self, ts, covered):
+        self.covered = covered
+        n, st, sy, stt, sty = self._sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.slopes = (n * sty - st * sy) / (n * stt - st * st)
+            stable = covered & (n >= 3) & (np.abs(self.slopes) < self.rate)
+        # 稳定窗口的起点: 首次满足判据的时刻减去窗口长度；判据被打破后清除
+        newly = stable & ~self.stable
+        self.stable_since[newly] = ts - self.window_s
+        self.stable_since[~stable] = np.nan
+        self.stable = stable
+
+    def all_stable(self, channels):
+        """给定通道是否全部已稳定 (通道列表为空时返回 False)"""
+        channels = list(channels)
+        return bool(channels) and bool(self.stable[channels].all())
@@ -0,0 +1,83 @@
+# tools/bench_report_table.py
+"""
+PDF 数据表生成耗时基准.
+
+对比两种数据表构建方式在 160 / 640 通道下的 doc.build 耗时:
+  - single: 所有行放在一个 Table 中 (原来的做法)
+  - long: RunReport 的数据表 (一个 LongTable, 每页顶部重复表头, 整行判定着色)
+
+    python tools/bench_report_table.py
+    python tools/bench_report_table.py --channels 160 640 1280 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table
+
+from report_generator import DATA_TABLE_HEADERS, DATA_TABLE_COL_WIDTHS, DATA_TABLE_STYLE, RunReport
+
+
+def make_rows(n_channels, fail_ratio=0.1, seed=0):
+    """生成与 ThermoApp.format_stats_rows 格式相同的随机数据行"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_channels):
+        max_temp = rng.uniform(30, 120)
+        status = "F" if rng.random() < fail_ratio else "P"
+        rows.append([str(i + 1), f"Location {i + 1}", str(i + 1), f"{max_temp:.2f}", f"{rng.uniform(0, 300):.2f}",
+                     f"{max_temp - 5:.2f}", f"{max_temp - 1:.2f}", f"{max_temp - 25:.2f}", "-", "100", status])
+    return rows
+
+
+def build_single(path, rows):
+    table = Table([DATA_TABLE_HEADERS] + rows, colWidths=DATA_TABLE_COL_WIDTHS)
+    table.setStyle(DATA_TABLE_STYLE)
+    SimpleDocTemplate(path, pagesize=A4, leftMargin=inch / 2, rightMargin=inch / 2).build([table])
+
+
+def build_long(path, rows):
+    # 只计入数据表部分 (与 single 可比)，不含表头章节和曲线图
+    tables = RunReport._build_data_section(rows, [row[-1] for row in rows])
+    SimpleDocTemplate(path, pagesize=A4, leftMargin=inch / 2, rightMargin=inch / 2).build(tables)
+
+
+def bench(builder, rows, repeat):
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            builder(path, rows)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times)
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF data table generation.")
+    parser.add_argument("--channels", type=int, nargs="+", default=[160, 640])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'channels':>8} {'single (ms)':>12} {'long (ms)':>13} {'speed-up':>9}")
+    for n in args.channels:
+        rows = make_rows(n)
+        single = bench(build_single, rows, args.repeat)
+        long_table = bench(build_long, rows, args.repeat)
+        print(f"{n:>8} {single * 1000:>12.0f} {long_table * 1000:>13.0f} {single / long_table:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# tools/startup_check.py
+"""
+打包后程序的启动耗时回归检查.
+
+在 Xvfb 虚拟显示上多次冷启动打包好的程序 (或 python main_app.py)，程序显示出连接界面后
+通过 TEMPYSCAN_STARTUP_PROBE 指定的文件报告耗时并退出。取中位数与预算比较，超出预算时返回 1。
+
+    python tools/startup_check.py dist/TemPyScan/TemPyScan --budget-ms 2500
+    python tools/startup_check.py --python main_app.py
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROBE_ENV = "TEMPYSCAN_STARTUP_PROBE"
+
+
+def start_xvfb(display=":99"):
+    """DISPLAY 未设置时启动 Xvfb，返回进程对象 (已有显示时返回 None)"""
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        sys.exit("No DISPLAY and Xvfb not found; install xvfb to run the headless startup check.")
+    proc = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(0.5)  # 等待 Xvfb 就绪
+    return proc
+
+
+def run_once(command, timeout):
+    """启动一次程序，返回 (进程启动到退出的墙钟耗时 ms, 程序自报的首帧耗时 ms)"""
+    fd, probe_path = tempfile.mkstemp(prefix="tempyscan_probe_", suffix=".txt")
+    os.close(fd)
+    os.remove(probe_path)
+    env = dict(os.environ, **{PROBE_ENV: probe_path})
+    start = time.perf_counter()
+    try:
+        subprocess.run(command, env=env, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wall_ms = (time.perf_counter() - start) * 1000
+        with open(probe_path) as f:
+            reported_ms = float(f.read().strip())
+    finally:
+        if os.path.exists(probe_path):
+            os.remove(probe_path)
+    return wall_ms, reported_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless cold-start time check for TemPyScan.")
+    parser.add_argument("executable", nargs="?", default=os.path.join("dist", "TemPyScan", "TemPyScan"),
+                        help="frozen executable (default: %(default)s)")
+    parser.add_argument("--python", metavar="SCRIPT", help="run SCRIPT with this interpreter instead of a frozen app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=3000.0,
+                        help="maximum median launch-to-first-frame wall time (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    command = [sys.executable, args.python] if args.python else [args.executable]
+    xvfb = start_xvfb()
+    try:
+        results = []
+        for i in range(args.runs):
+            try:
+                wall_ms, reported_ms = run_once(command, args.timeout)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                sys.exit(f"Run {i + 1} failed: {e}")
+            results.append(wall_ms)
+            print(f"run {i + 1}: launch-to-exit {wall_ms:7.0f} ms, first frame (in-process) {reported_ms:7.0f} ms")
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    median_ms = statistics.median(results)
+    print(f"median {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    return 0 if median_ms <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# xlsx_reader.py
+
+import html
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# 不依赖 openpyxl 的 .xlsx 数据表读取: 直接按块解析工作表 XML，单元格用正则一次取出，
+# 行号/列号/数值的转换全部向量化。只读取单元格的值 (不处理样式、公式计算、合并单元格)。
+_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+       'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'}
+_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+# <c r="B12" s="1" t="s"><v>5</v></c>、<c r="B12" t="inlineStr"><is><t>25.1</t></is></c>、<c r="B12"/>
+_CELL = re.compile(rb'<c r="([A-Z]+)(\d+)"([^>]*?)(?:/>|>(?:<f[^>]*?(?:/>|>[^<]*</f>))?'
+                   rb'(?:<v>([^<]*)</v>|<is><t[^>]*>([^<]*)</t></is>)?</c>)')
+_SHARED_STRING = re.compile(rb'<si><t[^>]*>([^<]*)</t></si>|<si><t[^>]*/></si>')
+_CHUNK_BYTES = 8 * 1024 * 1024
+_NUMERIC_START = np.frombuffer(b'0123456789+-.', np.uint8)
+
+
+def _column_index(letters):
+    """列字母转换为 0 起始的列号: A -> 0, AA -> 26"""
+    index = 0
+    for ch in letters:
+        index = index * 26 + ch - 64
+    return index - 1
+
+
+def to_float(strings):
+    """
+    字节串数组转换为浮点数，空或非数值为 NaN.
+    先按首字符和空格/冒号向量化地挑出数值形式的字符串一次转换，只有格式异常时才逐个转换。
+    """
+    strings = np.asarray(strings, dtype=bytes)
+    out = np.full(len(strings), np.nan)
+    if len(strings) == 0 or strings.itemsize == 0:
+        return out
+    first = np.frombuffer(strings.tobytes(), np.uint8)[::strings.itemsize]
+    numeric = np.isin(first, _NUMERIC_START) & (np.char.find(strings, b' ') < 0) & (np.char.find(strings, b':') < 0)
+    try:
+        out[numeric] = strings[numeric].astype(float)
+    except ValueError:
+        for i in np.flatnonzero(numeric):
+            try:
+                out[i] = float(strings[i])
+            except ValueError:
+                pass
+    return out
+
+
+def _unescape(value):
+    return html.unescape(value.decode('utf-8')) if b'&' in value else value.decode('utf-8')
+
+
+class XlsxSheetReader:
+    """读取 .xlsx 中的工作表 (zipfile + 按块正则解析)，工作表名和共享字符串在打开时读取"""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.sheets = self._sheet_members()
+        self._shared = self._read_shared_strings()
+        self._shared_float = to_float(self._shared)
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _sheet_members(self):
+        """工作表名 -> 压缩包内的 XML 路径 (按工作簿中的顺序)"""
+        workbook = ET.fromstring(self._zip.read('xl/workbook.xml'))
+        rels = ET.fromstring(self._zip.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(_REL_NS + 'Relationship')}
+        sheets = {}
+        for sheet in workbook.iterfind('m:sheets/m:sheet', _NS):
+            target = targets.get(sheet.get(f"{{{_NS['r']}}}id"), '')
+            # Target 可能是绝对路径 (/xl/worksheets/sheet1.xml) 或相对 xl/ 的路径
+            sheets[sheet.get('name')] = target.lstrip('/') if target.startswith('/') else \
+                posixpath.normpath(posixpath.join('xl', target))
+        return sheets
+
+    def _read_shared_strings(self):
+        if 'xl/sharedStrings.xml' not in self._zip.namelist():
+            return np.empty(0, dtype=bytes)
+        data = self._zip.read('xl/sharedStrings.xml')
+        strings = _SHARED_STRING.findall(data)
+        if len(strings) != data.count(b'<si>') + data.count(b'<si/>'):
+            # 带格式的文本 (<r> 分段) 等，退回逐项解析
+            root = ET.fromstring(data)
+            strings = [''.join(t.text or '' for t in si.iter(f"{{{_NS['m']}}}t")).encode('utf-8')
+                       for si in root.iterfind('m:si', _NS)]
+        return np.array(strings, dtype=bytes)
+
+    def _iter_chunks(self, member):
+        """按 </row> 边界切分的 XML 块，每块只包含完整的行"""
+        with self._zip.open(member) as f:
+            tail = b''
+            while True:
+                data = f.read(_CHUNK_BYTES)
+                if not data:
+                    break
+                data = tail + data
+                end = data.rfind(b'</row>')
+                if end < 0:
+                    tail = data
+                    continue
+                end += len(b'</row>')
+                yield data[:end]
+                tail = data[end:]
+            if tail:
+                yield tail
+
+    def read_table(self, sheet=None, text_rows=100):
+        """
+        读取工作表: 第一行为表头，之后为数据行.
+        :param sheet: 工作表名，None 时为第一个工作表
+        :param text_rows: 保留文本的数据行数 (用于日期、位置等非数值列)，None 表示全部
+        :return: (headers, numbers, texts)；headers 为表头文本列表，numbers 为 (数据行数, 列数) 浮点矩阵
+                 (空或非数值为 NaN)，texts 为前 text_rows 个数据行的 {列号: 文本}
+        """
+        member = self.sheets[sheet] if sheet is not None else next(iter(self.sheets.values()))
+        header_cells, texts = {}, []
+        blocks = []  # (起始行号, 稠密浮点块)
+        n_cols = 0
+        for chunk in self._iter_chunks(member):
+            cells = _CELL.findall(chunk)
+            if not cells:
+                continue
+            letters, row_numbers, attrs, v, inline = (np.array(part) for part in zip(*cells))
+            rows = row_numbers.astype(np.int64)
+            unique_letters, inverse = np.unique(letters, return_inverse=True)
+            cols = np.array([_column_index(u) for u in unique_letters], dtype=np.int64)[inverse]
+            shared = np.char.find(attrs, b't="s"') >= 0
+            values = np.where(np.char.str_len(inline) > 0, inline, v)
+            numbers = to_float(values)
+            if shared.any():
+                index = values[shared].astype(np.int64)
+                numbers[shared] = self._shared_float[index]
+            # 表头和前 text_rows 个数据行保留文本
+            keep_text = rows <= 1 + (text_rows if text_rows is not None else rows.max())
+            for i in np.flatnonzero(keep_text):
+                text = self._shared[int(values[i])] if shared[i] else values[i]
+                text = _unescape(text)
+                if rows[i] == 1:
+                    header_cells[int(cols[i])] = text
+                else:
+                    row = int(rows[i]) - 2
+                    texts.extend({} for _ in range(row + 1 - len(texts)))
+                    texts[row][int(cols[i])] = text
+            data = rows > 1
+            if not data.any():
+                continue
+            first_row = int(rows[data].min())
+            block = np.full((int(rows[data].max()) - first_row + 1, int(cols.max()) + 1), np.nan)
+            block[rows[data] - first_row, cols[data]] = numbers[data]
+            blocks.append((first_row, block))
+            n_cols = max(n_cols, block.shape[1])
+        n_cols = max(n_cols, max(header_cells, default=-1) + 1)
+        headers = [header_cells.get(j, '') for j in range(n_cols)]
+        n_rows = max((first + len(block) - 1 for first, block in blocks), default=1) - 1
+        table = np.full((n_rows, n_cols), np.nan)
+        for first, block in blocks:
+            table[first - 2:first - 2 + len(block), :block.shape[1]] = block
+        return headers, table, texts